@@ -0,0 +1,216 @@
+"""Banco em memória que responde às consultas dos models, para benchmarks.
+
+Não interpreta SQL: reconhece as formas de consulta usadas por
+`produto_model`, `usuario_model` e `log_model` e gera as linhas de
+`produtos`/`usuarios` sob demanda a partir do id, então simular 1 milhão de
+registros não ocupa memória. Escritas sempre afetam uma linha.
+
+`PoolContado` envolve qualquer pool (este ou o `ConnectionPool` real) e soma
+as idas ao banco de cada conexão devolvida.
+"""
+import re
+import threading
+from datetime import datetime
+from decimal import Decimal
+
+from benchmarks.transacoes_escrita import ConexaoContada
+
+DATA_FIXA = datetime(2024, 1, 1, 12, 0, 0)
+HASH_SENHA = "$2b$12$C6UzMDM.H6dfI/f/IKxGhu8Dr6oKcM0Vzar3sHXCsUH8y6bW6GZCO"
+
+_RE_TABELA = re.compile(r"\bFROM\s+(produtos|usuarios|logs)\b", re.IGNORECASE)
+
+
+def linha_produto(id):
+    return {
+        "id": id,
+        "nome": f"Produto {id}",
+        "descricao": f"Descrição do produto {id}",
+        "preco": Decimal("19.90"),
+        "estoque": id % 500,
+        "created_at": DATA_FIXA,
+        "updated_at": DATA_FIXA,
+    }
+
+
+def linha_usuario(id):
+    return {
+        "id": id,
+        "nome": f"Usuário {id:07d}",
+        "email": f"usuario{id}@exemplo.com",
+        "senha": HASH_SENHA,
+        "data_criacao": DATA_FIXA,
+        "data_atualizacao": DATA_FIXA,
+    }
+
+
+GERADORES = {"produtos": linha_produto, "usuarios": linha_usuario}
+
+
+class BancoSimulado:
+    def __init__(self, produtos=1000, usuarios=1000):
+        self.totais = {"produtos": produtos, "usuarios": usuarios, "logs": 0}
+        self._lock = threading.Lock()
+
+    def proximo_id(self, tabela):
+        with self._lock:
+            self.totais[tabela] += 1
+            return self.totais[tabela]
+
+    def consultar(self, sql, params):
+        """Retorna um iterável com as linhas da consulta (dicts)."""
+        params = tuple(params or ())
+        tabela = _RE_TABELA.search(sql)
+        if tabela is None or tabela.group(1) == "logs":
+            return iter(())
+        tabela = tabela.group(1)
+        gerar = GERADORES[tabela]
+        total = self.totais[tabela]
+        extra = {"relevancia": 1.0} if "relevancia" in sql else {}
+
+        if " IN (" in sql:
+            return iter([dict(gerar(id), **extra) for id in params if 0 < id <= total])
+        if re.search(r"WHERE\s+id\s*=", sql):
+            id = params[0]
+            return iter([gerar(id)] if 0 < id <= total else [])
+        if "WHERE email" in sql:
+            return iter(())
+        if "LIMIT" in sql:
+            # O último parâmetro é o limite; o anterior, quando existe, é o
+            # id da chave do cursor (keyset).
+            limite = params[-1]
+            inicio = params[-2] + 1 if len(params) >= 2 and isinstance(params[-2], int) else 1
+            fim = min(total, inicio + limite - 1)
+            return iter([dict(gerar(id), **extra) for id in range(inicio, fim + 1)])
+        return (gerar(id) for id in range(1, total + 1))
+
+
+class CursorSimulado:
+    def __init__(self, banco, dictionary=False, **kwargs):
+        self._banco = banco
+        self._dicionario = dictionary
+        self._linhas = iter(())
+        self.rowcount = 0
+        self.lastrowid = None
+        self.column_names = ()
+
+    def _formatar(self, linha):
+        return linha if self._dicionario else tuple(linha.values())
+
+    def execute(self, sql, params=()):
+        comando = sql.lstrip()[:6].upper()
+        if comando == "SELECT":
+            self._linhas = self._banco.consultar(sql, params)
+            self.rowcount = -1
+            return
+        self._linhas = iter(())
+        self.rowcount = 1
+        if comando == "INSERT":
+            tabela = re.search(r"INTO\s+(\w+)", sql, re.IGNORECASE).group(1)
+            self.lastrowid = self._banco.proximo_id(tabela) if tabela in self._banco.totais else 1
+
+    def executemany(self, sql, seq):
+        seq = list(seq)
+        primeiro = None
+        for _ in seq:
+            self.execute(sql)
+            primeiro = primeiro or self.lastrowid
+        self.lastrowid = primeiro
+        self.rowcount = len(seq)
+
+    def fetchone(self):
+        linha = next(self._linhas, None)
+        return None if linha is None else self._formatar(linha)
+
+    def fetchmany(self, quantidade=1):
+        linhas = []
+        for linha in self._linhas:
+            linhas.append(self._formatar(linha))
+            if len(linhas) >= quantidade:
+                break
+        return linhas
+
+    def fetchall(self):
+        return [self._formatar(linha) for linha in self._linhas]
+
+    def __iter__(self):
+        return iter(self.fetchall())
+
+    def close(self):
+        pass
+
+
+class ConexaoSimulada:
+    unread_result = False
+    in_transaction = False
+
+    def __init__(self, banco):
+        self._banco = banco
+
+    def cursor(self, *args, **kwargs):
+        return CursorSimulado(self._banco, **kwargs)
+
+    def start_transaction(self, *args, **kwargs):
+        pass
+
+    def commit(self):
+        pass
+
+    def rollback(self):
+        pass
+
+    def consume_results(self):
+        pass
+
+    def is_connected(self):
+        return True
+
+    def ping(self, *args, **kwargs):
+        pass
+
+
+class PoolSimulado:
+    def __init__(self, banco):
+        self._banco = banco
+
+    def obter(self):
+        return ConexaoSimulada(self._banco)
+
+    def devolver(self, conn):
+        pass
+
+    def fechar(self):
+        pass
+
+    def estatisticas(self):
+        return {"backend": "simulado"}
+
+
+class PoolContado:
+    """Pool que conta as idas ao banco de cada conexão emprestada."""
+
+    def __init__(self, pool, latencia=0.0):
+        self._pool = pool
+        self.latencia = latencia
+        self._lock = threading.Lock()
+        self.idas = 0
+        self.commits = 0
+
+    def zerar(self):
+        with self._lock:
+            self.idas = self.commits = 0
+
+    def obter(self):
+        return ConexaoContada(self._pool.obter(), self.latencia)
+
+    def devolver(self, conexao):
+        with self._lock:
+            self.idas += conexao.idas
+            self.commits += conexao.commits
+        self._pool.devolver(conexao._conexao)
+
+    def fechar(self):
+        self._pool.fechar()
+
+    def estatisticas(self):
+        return self._pool.estatisticas()
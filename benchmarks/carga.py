@@ -0,0 +1,447 @@
+"""Teste de carga das rotas de produtos e usuários.
+
+Sobe a aplicação no próprio processo e envia as requisições direto pela
+interface ASGI: não há um cliente HTTP separado disputando CPU com o
+servidor. Cada cenário (uma rota) roda em níveis fixos de concorrência e
+informa latência p50/p95/p99, vazão, idas ao banco por requisição e o pico
+de memória (RSS) do processo.
+
+Por padrão o banco é `BancoSimulado` (em memória, com latência configurável
+por ida); com `--mysql` usa o banco do .env e com `--sqlite ARQUIVO` o backend
+SQLite nesse arquivo, semeando registros `bench ...` até os volumes pedidos.
+
+    python -m benchmarks.carga --produtos 100000 --usuarios 100000 --saida atual.json
+    python -m benchmarks.carga --mysql --concorrencia 1,16,64 --cenarios produtos_
+    python -m benchmarks.carga --sqlite bench.sqlite3 --saida sqlite.json
+    python -m benchmarks.carga --comparar base.json atual.json
+    python -m benchmarks.carga --mysql --limpar
+"""
+import argparse
+import asyncio
+import json
+import os
+import platform
+import random
+import resource
+import subprocess
+import sys
+import time
+import uuid
+from datetime import datetime
+from urllib.parse import urlencode
+
+LOTE_SEMEADURA = 5000
+PREFIXO = "bench "
+
+
+def configurar_ambiente(mysql, sqlite=None):
+    """Ajusta o .env antes de importar a aplicação."""
+    if sqlite:
+        os.environ["DB_BACKEND"] = "sqlite"
+        os.environ["DB_SQLITE_CAMINHO"] = sqlite
+    elif mysql:
+        os.environ["DB_BACKEND"] = "mysql"
+    else:
+        # Nada pode tentar abrir conexões MySQL reais no modo simulado.
+        os.environ["DB_MIGRAR_NA_INICIALIZACAO"] = "false"
+        os.environ["AUDIT_ASSINCRONO"] = "false"
+        os.environ["LOG_RETENCAO_ATIVA"] = "false"
+        os.environ["BUSCA_BACKEND"] = "mysql"
+
+
+# --- Banco ---------------------------------------------------------------
+
+def _intervalo_ids(db, tabela, coluna):
+    cursor = db.cursor()
+    cursor.execute(f"SELECT MIN(id), MAX(id), COUNT(*) FROM {tabela} WHERE {coluna} LIKE %s", (PREFIXO + "%",))
+    minimo, maximo, total = cursor.fetchone()
+    cursor.close()
+    return minimo, maximo, total
+
+
+def _inserir(db, sql, valores):
+    cursor = db.cursor()
+    for i in range(0, len(valores), LOTE_SEMEADURA):
+        cursor.executemany(sql, valores[i:i + LOTE_SEMEADURA])
+        db.commit()
+    cursor.close()
+
+
+def inserir_produtos(db, inicio, quantidade):
+    valores = [(f"{PREFIXO}produto {i}", f"Descrição {i}", 19.9, 100) for i in range(inicio, inicio + quantidade)]
+    _inserir(db, "INSERT INTO produtos (nome, descricao, preco, estoque) VALUES (%s, %s, %s, %s)", valores)
+
+
+def inserir_usuarios(db, marcador, quantidade, hash_senha):
+    valores = [(f"{PREFIXO}usuario {i}", f"bench-{marcador}-{i}@bench.local", hash_senha) for i in range(quantidade)]
+    _inserir(db, "INSERT INTO usuarios (nome, email, senha) VALUES (%s, %s, %s)", valores)
+
+
+def semear(db, produtos, usuarios):
+    """Completa os registros `bench` até os volumes pedidos; retorna os ids."""
+    from models.senha import gerar_hash
+
+    _, _, total = _intervalo_ids(db, "produtos", "nome")
+    if total < produtos:
+        print(f"Semeando {produtos - total} produtos...", file=sys.stderr)
+        inserir_produtos(db, total, produtos - total)
+    _, _, total = _intervalo_ids(db, "usuarios", "nome")
+    if total < usuarios:
+        print(f"Semeando {usuarios - total} usuários...", file=sys.stderr)
+        inserir_usuarios(db, uuid.uuid4().hex[:8], usuarios - total, gerar_hash("bench", 4))
+    return _ids(db)
+
+
+def _ids(db):
+    ids = {}
+    for tabela in ("produtos", "usuarios"):
+        minimo, maximo, _ = _intervalo_ids(db, tabela, "nome")
+        ids[tabela] = (minimo or 1, maximo or 1)
+    return ids
+
+
+def limpar(db):
+    from models.database import get_backend
+
+    cursor = db.cursor()
+    for tabela in ("produtos", "usuarios"):
+        if get_backend() == "sqlite":
+            # O SQLite padrão não aceita LIMIT em DELETE
+            sql = (f"DELETE FROM {tabela} WHERE id IN "
+                   f"(SELECT id FROM {tabela} WHERE nome LIKE %s LIMIT {LOTE_SEMEADURA})")
+        else:
+            sql = f"DELETE FROM {tabela} WHERE nome LIKE %s LIMIT {LOTE_SEMEADURA}"
+        while True:
+            cursor.execute(sql, (PREFIXO + "%",))
+            db.commit()
+            if cursor.rowcount < LOTE_SEMEADURA:
+                break
+    cursor.close()
+
+
+class Contexto:
+    """Ids usados pelos cenários; exclusões consomem ids reservados."""
+
+    def __init__(self, ids, reservar):
+        self.ids = ids
+        self._reservar = reservar
+        self._descartaveis = {"produtos": [], "usuarios": []}
+        self._sequencia = 0
+        self.marcador = uuid.uuid4().hex[:8]
+
+    def id_aleatorio(self, tabela):
+        return random.randint(*self.ids[tabela])
+
+    def descartavel(self, tabela):
+        return self._descartaveis[tabela].pop()
+
+    def preparar_exclusoes(self, tabela, quantidade):
+        self._descartaveis[tabela] = self._reservar(tabela, quantidade)
+
+    def sequencia(self):
+        self._sequencia += 1
+        return self._sequencia
+
+
+# --- Cenários ------------------------------------------------------------
+
+def _form(**campos):
+    return "application/x-www-form-urlencoded", urlencode(campos).encode()
+
+
+def _csv_importacao(ctx, linhas=100):
+    n = ctx.sequencia()
+    conteudo = "nome,descricao,preco,estoque\n" + "".join(
+        f"{PREFIXO}importado {n}-{i},Importado,9.90,10\n" for i in range(linhas))
+    limite = "----bench" + uuid.uuid4().hex
+    corpo = (
+        f"--{limite}\r\n"
+        'Content-Disposition: form-data; name="arquivo"; filename="produtos.csv"\r\n'
+        "Content-Type: text/csv\r\n\r\n"
+        f"{conteudo}\r\n"
+        f"--{limite}--\r\n"
+    ).encode()
+    return f"multipart/form-data; boundary={limite}", corpo
+
+
+def _produto(ctx):
+    return _form(nome=f"{PREFIXO}produto novo {ctx.sequencia()}", descricao="Carga", preco="10.50", estoque="5")
+
+
+def _usuario(ctx):
+    n = ctx.sequencia()
+    return _form(nome=f"{PREFIXO}usuario novo {n}", email=f"bench-{ctx.marcador}-n{n}@bench.local", senha="senha-bench")
+
+
+# nome: (método, caminho(ctx), corpo(ctx) ou None, tabela cujas linhas a rota exclui)
+CENARIOS = {
+    "produtos_listar": ("GET", lambda ctx: "/produtos/", None, None),
+    "produtos_listar_stream": ("GET", lambda ctx: "/produtos/?stream=true", None, None),
+    "produtos_exportar": ("GET", lambda ctx: "/produtos/export?formato=csv", None, None),
+    "produtos_buscar": ("GET", lambda ctx: "/produtos/busca?q=produto", None, None),
+    "produtos_form_importar": ("GET", lambda ctx: "/produtos/importar", None, None),
+    "produtos_importar": ("POST", lambda ctx: "/produtos/importar", _csv_importacao, None),
+    "produtos_form_cadastrar": ("GET", lambda ctx: "/produtos/cadastrar", None, None),
+    "produtos_cadastrar": ("POST", lambda ctx: "/produtos/cadastrar", _produto, None),
+    "produtos_detalhes": ("GET", lambda ctx: f"/produtos/{ctx.id_aleatorio('produtos')}", None, None),
+    "produtos_form_editar": ("GET", lambda ctx: f"/produtos/{ctx.id_aleatorio('produtos')}/editar", None, None),
+    "produtos_editar": ("POST", lambda ctx: f"/produtos/{ctx.id_aleatorio('produtos')}/editar", _produto, None),
+    "produtos_estoque": ("POST", lambda ctx: f"/produtos/{ctx.id_aleatorio('produtos')}/estoque",
+                         lambda ctx: _form(quantidade=random.choice(["1", "-1"])), None),
+    "produtos_deletar": ("POST", lambda ctx: f"/produtos/{ctx.descartavel('produtos')}/deletar", None, "produtos"),
+    "usuarios_listar": ("GET", lambda ctx: "/usuarios/", None, None),
+    "usuarios_listar_stream": ("GET", lambda ctx: "/usuarios/?stream=true", None, None),
+    "usuarios_exportar": ("GET", lambda ctx: "/usuarios/export?formato=csv", None, None),
+    "usuarios_form_cadastrar": ("GET", lambda ctx: "/usuarios/cadastrar", None, None),
+    "usuarios_cadastrar": ("POST", lambda ctx: "/usuarios/cadastrar", _usuario, None),
+    "usuarios_detalhes": ("GET", lambda ctx: f"/usuarios/{ctx.id_aleatorio('usuarios')}", None, None),
+    "usuarios_form_editar": ("GET", lambda ctx: f"/usuarios/{ctx.id_aleatorio('usuarios')}/editar", None, None),
+    "usuarios_editar": ("POST", lambda ctx: f"/usuarios/{ctx.id_aleatorio('usuarios')}/editar",
+                        lambda ctx: _form(nome=f"{PREFIXO}usuario editado", email=f"bench-{ctx.marcador}-e{ctx.sequencia()}@bench.local", senha=""),
+                        None),
+    "usuarios_deletar": ("POST", lambda ctx: f"/usuarios/{ctx.descartavel('usuarios')}/deletar", None, "usuarios"),
+}
+
+
+# --- Cliente ASGI --------------------------------------------------------
+
+async def requisitar(app, metodo, caminho, corpo=None):
+    """Envia uma requisição à aplicação e consome a resposta inteira."""
+    caminho, _, consulta = caminho.partition("?")
+    cabecalhos = [(b"host", b"bench")]
+    dados = b""
+    if corpo is not None:
+        tipo, dados = corpo
+        cabecalhos += [(b"content-type", tipo.encode()), (b"content-length", str(len(dados)).encode())]
+    scope = {
+        "type": "http", "asgi": {"version": "3.0"}, "http_version": "1.1",
+        "method": metodo, "scheme": "http", "path": caminho, "raw_path": caminho.encode(),
+        "query_string": consulta.encode(), "root_path": "", "headers": cabecalhos,
+        "client": ("127.0.0.1", 50000), "server": ("bench", 80),
+    }
+    enviado = False
+    status = None
+
+    async def receive():
+        nonlocal enviado
+        if not enviado:
+            enviado = True
+            return {"type": "http.request", "body": dados, "more_body": False}
+        await asyncio.Event().wait()
+
+    async def send(message):
+        nonlocal status
+        if message["type"] == "http.response.start":
+            status = message["status"]
+
+    await app(scope, receive, send)
+    return status
+
+
+def percentil(ordenados, p):
+    if not ordenados:
+        return None
+    indice = min(len(ordenados) - 1, max(0, int(round(p / 100 * len(ordenados))) - 1))
+    return ordenados[indice]
+
+
+def rss_pico_mb():
+    pico = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux informa em KiB; macOS, em bytes.
+    return round(pico / (1024 * 1024 if sys.platform == "darwin" else 1024), 1)
+
+
+async def executar_cenario(app, pool, ctx, nome, concorrencia, requisicoes, aquecimento):
+    metodo, caminho, corpo, exclui = CENARIOS[nome]
+    if exclui:
+        ctx.preparar_exclusoes(exclui, requisicoes + aquecimento)
+
+    async def uma():
+        return await requisitar(app, metodo, caminho(ctx), corpo(ctx) if corpo else None)
+
+    for _ in range(aquecimento):
+        await uma()
+
+    pool.zerar()
+    latencias = []
+    status = {}
+    erros = 0
+    restantes = requisicoes
+
+    async def trabalhador():
+        nonlocal restantes, erros
+        while restantes > 0:
+            restantes -= 1
+            inicio = time.perf_counter()
+            try:
+                codigo = await uma()
+            except Exception as e:
+                codigo = type(e).__name__
+            latencias.append(time.perf_counter() - inicio)
+            status[str(codigo)] = status.get(str(codigo), 0) + 1
+            if not isinstance(codigo, int) or codigo >= 500:
+                erros += 1
+
+    inicio = time.perf_counter()
+    await asyncio.gather(*(trabalhador() for _ in range(concorrencia)))
+    total = time.perf_counter() - inicio
+
+    latencias.sort()
+    return {
+        "cenario": nome,
+        "concorrencia": concorrencia,
+        "requisicoes": requisicoes,
+        "erros": erros,
+        "status": status,
+        "p50_ms": round(percentil(latencias, 50) * 1000, 3),
+        "p95_ms": round(percentil(latencias, 95) * 1000, 3),
+        "p99_ms": round(percentil(latencias, 99) * 1000, 3),
+        "req_por_s": round(requisicoes / total, 1),
+        "idas_por_requisicao": round(pool.idas / requisicoes, 2),
+        "commits_por_requisicao": round(pool.commits / requisicoes, 2),
+        "rss_pico_mb": rss_pico_mb(),
+    }
+
+
+# --- Execução ------------------------------------------------------------
+
+def _commit_atual():
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True,
+                              text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+async def executar(args):
+    from models import database
+    from benchmarks.banco_simulado import BancoSimulado, PoolSimulado, PoolContado
+    import main
+
+    banco = "sqlite" if args.sqlite else "mysql" if args.mysql else "simulado"
+    if args.mysql or args.sqlite:
+        if args.sqlite:
+            # O pool precisa existir para semear; as migrações normalmente
+            # rodam só no startup da aplicação.
+            from database.migrations import aplicar_migracoes
+            aplicar_migracoes()
+        with database.get_connection() as db:
+            if args.limpar:
+                limpar(db)
+                return None
+            ids = semear(db, args.produtos, args.usuarios)
+
+        def reservar(tabela, quantidade):
+            with database.get_connection() as db:
+                _, maximo, _ = _intervalo_ids(db, tabela, "nome")
+                if tabela == "produtos":
+                    inserir_produtos(db, 0, quantidade)
+                else:
+                    inserir_usuarios(db, uuid.uuid4().hex[:8], quantidade, "x")
+                cursor = db.cursor()
+                cursor.execute(f"SELECT id FROM {tabela} WHERE id > %s AND nome LIKE %s", (maximo or 0, PREFIXO + "%"))
+                reservados = [linha[0] for linha in cursor.fetchall()]
+                cursor.close()
+            return reservados
+
+        pool = PoolContado(database.init_pool())
+    else:
+        banco = BancoSimulado(args.produtos, args.usuarios)
+        ids = {"produtos": (1, args.produtos), "usuarios": (1, args.usuarios)}
+
+        def reservar(tabela, quantidade):
+            return list(range(1, quantidade + 1))
+
+        pool = PoolContado(PoolSimulado(banco), args.latencia / 1000)
+
+    database._pool = pool
+    ctx = Contexto(ids, reservar)
+    nomes = [nome for nome in CENARIOS if any(nome.startswith(f) for f in args.cenarios.split(","))]
+    niveis = [int(n) for n in args.concorrencia.split(",")]
+
+    resultados = []
+    await main.app.router.startup()
+    try:
+        for nome in nomes:
+            for concorrencia in niveis:
+                r = await executar_cenario(main.app, pool, ctx, nome, concorrencia, args.requisicoes, args.aquecimento)
+                resultados.append(r)
+                print(f"{nome:<26} c={concorrencia:<4} p50={r['p50_ms']:>8.2f}ms p95={r['p95_ms']:>8.2f}ms "
+                      f"p99={r['p99_ms']:>8.2f}ms {r['req_por_s']:>8.1f} req/s "
+                      f"idas={r['idas_por_requisicao']:<5} rss={r['rss_pico_mb']}MB erros={r['erros']}")
+    finally:
+        await main.app.router.shutdown()
+
+    return {
+        "metadados": {
+            "commit": _commit_atual(),
+            "data": datetime.now().isoformat(timespec="seconds"),
+            "python": platform.python_version(),
+            "plataforma": platform.platform(),
+            "banco": banco,
+            "latencia_simulada_ms": None if banco != "simulado" else args.latencia,
+            "produtos": args.produtos,
+            "usuarios": args.usuarios,
+            "requisicoes": args.requisicoes,
+            "aquecimento": args.aquecimento,
+        },
+        "resultados": resultados,
+    }
+
+
+def comparar(base, atual):
+    """Imprime a variação de cada métrica entre dois arquivos de resultado."""
+    with open(base, encoding="utf-8") as f:
+        antes = {(r["cenario"], r["concorrencia"]): r for r in json.load(f)["resultados"]}
+    with open(atual, encoding="utf-8") as f:
+        depois = json.load(f)["resultados"]
+
+    def variacao(a, b):
+        return f"{(b - a) / a * 100:+.1f}%" if a else "n/a"
+
+    for r in depois:
+        a = antes.get((r["cenario"], r["concorrencia"]))
+        if a is None:
+            continue
+        print(f"{r['cenario']:<26} c={r['concorrencia']:<4} "
+              f"p50 {variacao(a['p50_ms'], r['p50_ms']):>8} "
+              f"p99 {variacao(a['p99_ms'], r['p99_ms']):>8} "
+              f"req/s {variacao(a['req_por_s'], r['req_por_s']):>8} "
+              f"idas {a['idas_por_requisicao']}->{r['idas_por_requisicao']}")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    reais = parser.add_mutually_exclusive_group()
+    reais.add_argument("--mysql", action="store_true", help="usa o banco do .env em vez do simulado")
+    reais.add_argument("--sqlite", metavar="ARQUIVO", help="usa o backend SQLite neste arquivo")
+    parser.add_argument("--produtos", type=int, default=1000)
+    parser.add_argument("--usuarios", type=int, default=1000)
+    parser.add_argument("--concorrencia", default="1,8,32", help="níveis separados por vírgula")
+    parser.add_argument("--requisicoes", type=int, default=200, help="por cenário e nível")
+    parser.add_argument("--aquecimento", type=int, default=10)
+    parser.add_argument("--cenarios", default="", help="prefixos dos cenários, separados por vírgula")
+    parser.add_argument("--latencia", type=float, default=0.2,
+                        help="latência simulada por ida ao banco, em ms (somente no simulado)")
+    parser.add_argument("--saida", help="grava os resultados neste arquivo JSON")
+    parser.add_argument("--comparar", nargs=2, metavar=("BASE", "ATUAL"),
+                        help="compara dois arquivos de resultado, sem executar")
+    parser.add_argument("--limpar", action="store_true", help="remove os registros bench do banco")
+    args = parser.parse_args(argv)
+
+    if args.comparar:
+        comparar(*args.comparar)
+        return 0
+
+    configurar_ambiente(args.mysql, args.sqlite)
+    resultado = asyncio.run(executar(args))
+    if resultado is None:
+        return 0
+    if args.saida:
+        with open(args.saida, "w", encoding="utf-8") as f:
+            json.dump(resultado, f, ensure_ascii=False, indent=2)
+    return 1 if any(r["erros"] for r in resultado["resultados"]) else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,82 @@
+"""Mede o bloqueio do event loop causado por consultas lentas.
+
+Dispara N consultas lentas em paralelo enquanto uma tarefa "sonda" tenta
+acordar a cada 10 ms; o atraso da sonda é o tempo que o loop ficou travado.
+Compara a chamada direta (bloqueante) com `run_db` (executor dedicado).
+
+    python -m benchmarks.head_of_line             # consulta simulada (time.sleep)
+    python -m benchmarks.head_of_line --mysql     # SELECT SLEEP() no banco configurado
+"""
+import argparse
+import asyncio
+import time
+
+from models.database import get_connection, run_db, init_executor, close_executor, close_pool
+
+
+def consulta_simulada(duracao):
+    time.sleep(duracao)
+
+
+def consulta_mysql(duracao):
+    with get_connection() as conn:
+        cursor = conn.cursor()
+        cursor.execute("SELECT SLEEP(%s)", (duracao,))
+        cursor.fetchall()
+        cursor.close()
+
+
+async def sonda(parar, atrasos, intervalo=0.01):
+    while not parar.is_set():
+        inicio = time.perf_counter()
+        await asyncio.sleep(intervalo)
+        atrasos.append(time.perf_counter() - inicio - intervalo)
+
+
+async def cenario(consulta, duracao, concorrencia, assincrono):
+    parar = asyncio.Event()
+    atrasos = []
+    tarefa_sonda = asyncio.create_task(sonda(parar, atrasos))
+    await asyncio.sleep(0.05)
+
+    async def executar():
+        if assincrono:
+            await run_db(consulta, duracao)
+        else:
+            consulta(duracao)
+
+    inicio = time.perf_counter()
+    await asyncio.gather(*(executar() for _ in range(concorrencia)))
+    total = time.perf_counter() - inicio
+
+    parar.set()
+    await tarefa_sonda
+    atrasos.sort()
+    return {
+        "total_s": total,
+        "atraso_p50_ms": atrasos[len(atrasos) // 2] * 1000 if atrasos else 0.0,
+        "atraso_max_ms": atrasos[-1] * 1000 if atrasos else 0.0,
+    }
+
+
+async def main(args):
+    consulta = consulta_mysql if args.mysql else consulta_simulada
+    init_executor()
+    try:
+        for nome, assincrono in (("direto", False), ("run_db", True)):
+            r = await cenario(consulta, args.duracao, args.concorrencia, assincrono)
+            print(f"{nome:<8} total={r['total_s']:.2f}s "
+                  f"atraso_loop_p50={r['atraso_p50_ms']:.1f}ms "
+                  f"atraso_loop_max={r['atraso_max_ms']:.1f}ms")
+    finally:
+        close_executor()
+        if args.mysql:
+            close_pool()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--duracao", type=float, default=0.2)
+    parser.add_argument("--concorrencia", type=int, default=10)
+    parser.add_argument("--mysql", action="store_true")
+    asyncio.run(main(parser.parse_args()))
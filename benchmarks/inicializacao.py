@@ -0,0 +1,142 @@
+"""Tempo de inicialização, latência da primeira requisição e memória por worker.
+
+Cada execução é um processo novo, como um worker recém-iniciado: importa
+`main`, roda os eventos de startup e faz a primeira requisição a cada página
+HTML, seguida de uma segunda para comparação. Usa o backend SQLite em um
+diretório temporário, onde também fica o cache de bytecode dos templates: a
+primeira execução o encontra vazio e as seguintes, preenchido.
+
+    python -m benchmarks.inicializacao --execucoes 5
+    python -m benchmarks.inicializacao --saida atual.json
+"""
+import argparse
+import asyncio
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+from benchmarks.carga import configurar_ambiente, requisitar, rss_pico_mb
+
+PAGINAS = [
+    "/", "/login", "/produtos/", "/produtos/1", "/produtos/1/editar", "/produtos/cadastrar",
+    "/produtos/busca?q=bench", "/usuarios/", "/usuarios/1", "/usuarios/cadastrar", "/logs/",
+]
+
+
+def _rss_atual_mb():
+    with open("/proc/self/status", encoding="ascii") as status:
+        for linha in status:
+            if linha.startswith("VmRSS:"):
+                return round(int(linha.split()[1]) / 1024, 1)
+    return None
+
+
+def _semear():
+    from models.database import get_connection
+
+    with get_connection() as db:
+        cursor = db.cursor()
+        cursor.execute("SELECT COUNT(*) FROM produtos")
+        if cursor.fetchone()[0] == 0:
+            cursor.execute("INSERT INTO produtos (nome, descricao, preco, estoque) "
+                           "VALUES ('bench produto', 'bench', 10, 5)")
+            cursor.execute("INSERT INTO usuarios (nome, email, senha) "
+                           "VALUES ('bench usuario', 'bench@bench.local', 'x')")
+            db.commit()
+        cursor.close()
+
+
+async def _medir_worker():
+    inicio = time.perf_counter()
+    import main
+    importacao = time.perf_counter() - inicio
+
+    inicio = time.perf_counter()
+    await main.app.router.startup()
+    startup = time.perf_counter() - inicio
+    _semear()
+
+    paginas = {}
+    for caminho in PAGINAS:
+        tempos = []
+        for _ in range(2):
+            inicio = time.perf_counter()
+            status = await requisitar(main.app, "GET", caminho)
+            tempos.append((time.perf_counter() - inicio) * 1000)
+        paginas[caminho] = {"status": status, "primeira_ms": tempos[0], "segunda_ms": tempos[1]}
+    rss = _rss_atual_mb()
+    await main.app.router.shutdown()
+    return {
+        "importacao_ms": importacao * 1000,
+        "startup_ms": startup * 1000,
+        "primeiras_ms": sum(p["primeira_ms"] for p in paginas.values()),
+        "segundas_ms": sum(p["segunda_ms"] for p in paginas.values()),
+        "rss_mb": rss,
+        "rss_pico_mb": rss_pico_mb(),
+        "paginas": paginas,
+    }
+
+
+def _executar_worker(diretorio):
+    ambiente = dict(os.environ, DB_SQLITE_CAMINHO=os.path.join(diretorio, "bench.sqlite3"),
+                    TEMPLATES_BYTECODE_CACHE=os.path.join(diretorio, "bytecode"),
+                    CONSULTAS_LENTAS_ARQUIVO=os.path.join(diretorio, "consultas_lentas.ndjson"))
+    saida = subprocess.run([sys.executable, "-m", "benchmarks.inicializacao", "--worker"],
+                           env=ambiente, capture_output=True, text=True, check=True)
+    return json.loads(saida.stdout.strip().splitlines()[-1])
+
+
+TOTAIS = ("importacao_ms", "startup_ms", "primeiras_ms", "segundas_ms", "rss_mb", "rss_pico_mb")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--execucoes", type=int, default=5)
+    parser.add_argument("--saida", help="grava os resultados neste arquivo JSON")
+    parser.add_argument("--worker", action="store_true", help=argparse.SUPPRESS)
+    args = parser.parse_args(argv)
+
+    if args.worker:
+        configurar_ambiente(mysql=False, sqlite=os.environ["DB_SQLITE_CAMINHO"])
+        print(json.dumps(asyncio.run(_medir_worker())))
+        return 0
+
+    with tempfile.TemporaryDirectory(prefix="bench-inicializacao-") as diretorio:
+        execucoes = [_executar_worker(diretorio) for _ in range(args.execucoes)]
+
+    fria, quentes = execucoes[0], execucoes[1:] or execucoes
+    resultado = {
+        "fria": {chave: fria[chave] for chave in TOTAIS},
+        "quente": {chave: statistics.median(e[chave] for e in quentes) for chave in TOTAIS},
+        "paginas": {
+            caminho: {
+                "primeira_ms": statistics.median(e["paginas"][caminho]["primeira_ms"] for e in quentes),
+                "segunda_ms": statistics.median(e["paginas"][caminho]["segunda_ms"] for e in quentes),
+            }
+            for caminho in PAGINAS
+        },
+    }
+    erros = sorted({c for e in execucoes for c, p in e["paginas"].items() if p["status"] != 200})
+
+    print(f"{'':<8}{'import':>10}{'startup':>10}{'1as req.':>10}{'2as req.':>10}{'RSS':>9}{'pico':>9}")
+    for nome in ("fria", "quente"):
+        r = resultado[nome]
+        print(f"{nome:<8}{r['importacao_ms']:>8.1f}ms{r['startup_ms']:>8.1f}ms{r['primeiras_ms']:>8.1f}ms"
+              f"{r['segundas_ms']:>8.1f}ms{r['rss_mb']:>7.1f}MB{r['rss_pico_mb']:>7.1f}MB")
+    print()
+    for caminho, p in resultado["paginas"].items():
+        print(f"{caminho:<24} primeira={p['primeira_ms']:7.2f}ms segunda={p['segunda_ms']:6.2f}ms")
+    if erros:
+        print(f"páginas sem 200: {', '.join(erros)}")
+    if args.saida:
+        with open(args.saida, "w", encoding="utf-8") as f:
+            json.dump(resultado, f, ensure_ascii=False, indent=2)
+    return 1 if erros else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
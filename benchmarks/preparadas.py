@@ -0,0 +1,120 @@
+"""Custo por chamada das consultas pontuais e escritas, com e sem instrução preparada.
+
+Roda no banco configurado no .env (ou no SQLite com `--sqlite`), com uma
+conexão crua do pool, e compara para cada instrução dos models:
+
+- texto: cursor novo e SQL enviado e analisado a cada chamada (fluxo anterior)
+- preparada: `executar`/`consultar_todos` de `models.database`, com a
+  instrução preparada uma vez por conexão e reaproveitada
+- preparada sem cache: cursor preparado novo a cada chamada (prepara,
+  executa e fecha), o que o cache por conexão evita
+
+As escritas são desfeitas com rollback logo depois, igual nos três modos. No
+SQLite o `sqlite3` já guarda as instruções compiladas por conexão, então os
+três modos devem ficar próximos.
+
+    python -m benchmarks.preparadas --repeticoes 2000
+    python -m benchmarks.preparadas --sqlite bench.sqlite3
+"""
+import argparse
+import os
+import time
+
+from benchmarks.carga import configurar_ambiente
+
+
+def texto(db, sql, params, escrita):
+    cursor = db.cursor(dictionary=not escrita)
+    cursor.execute(sql, params)
+    if not escrita:
+        cursor.fetchall()
+    cursor.close()
+
+
+def preparada(db, sql, params, escrita):
+    from models.database import executar, consultar_todos
+
+    if escrita:
+        executar(db, sql, params)
+    else:
+        consultar_todos(db, sql, params)
+
+
+def preparada_sem_cache(db, sql, params, escrita):
+    cursor = db.cursor(prepared=True, dictionary=not escrita)
+    cursor.execute(sql, params)
+    if not escrita:
+        cursor.fetchall()
+    cursor.close()
+
+
+MODOS = [("texto", texto), ("preparada", preparada), ("preparada sem cache", preparada_sem_cache)]
+
+
+def medir(db, modo, sql, params, escrita, repeticoes, aquecimento):
+    for _ in range(aquecimento):
+        modo(db, sql, params, escrita)
+        if escrita:
+            db.rollback()
+    inicio = time.perf_counter()
+    for _ in range(repeticoes):
+        modo(db, sql, params, escrita)
+        if escrita:
+            db.rollback()
+    return (time.perf_counter() - inicio) / repeticoes * 1_000_000
+
+
+def main(args):
+    configurar_ambiente(mysql=not args.sqlite, sqlite=args.sqlite)
+    from database.migrations import aplicar_migracoes
+    from models import produto_model, usuario_model
+    from models.database import executar, get_pool, get_backend, close_pool
+
+    if args.sqlite:
+        aplicar_migracoes()
+    pool = get_pool()
+    db = pool.obter()
+    try:
+        id_produto = executar(db, produto_model.SQL_INSERIR_PRODUTO,
+                              ("bench preparadas", "", 10, 5)).lastrowid
+        email = f"bench.preparadas.{os.getpid()}@exemplo.com"
+        id_usuario = executar(db, usuario_model.SQL_INSERIR_USUARIO,
+                              ("bench preparadas", email, "x")).lastrowid
+        db.commit()
+
+        instrucoes = [
+            ("produto por id", produto_model.SQL_PRODUTO_POR_ID, (id_produto,), False),
+            ("usuario por id", usuario_model.SQL_USUARIO_POR_ID, (id_usuario,), False),
+            ("usuario por email", usuario_model.SQL_USUARIO_PARA_LOGIN, (email,), False),
+            ("ajustar estoque", produto_model.SQL_REPOR_ESTOQUE, (1, id_produto), True),
+            ("atualizar produto", produto_model.SQL_ATUALIZAR_PRODUTO,
+             ("bench preparadas", "", 11, 5, id_produto), True),
+            ("atualizar usuario", usuario_model.SQL_ATUALIZAR_USUARIO[frozenset({"nome", "email"})],
+             ["bench preparadas", email, id_usuario], True),
+        ]
+
+        print(f"backend={get_backend()} repeticoes={args.repeticoes}")
+        for nome, sql, params, escrita in instrucoes:
+            tempos = {
+                modo: medir(db, funcao, sql, params, escrita, args.repeticoes, args.aquecimento)
+                for modo, funcao in MODOS
+            }
+            base = tempos["texto"]
+            colunas = "  ".join(
+                f"{modo}={us:8.1f}us ({(us - base) / base * 100:+5.1f}%)" for modo, us in tempos.items())
+            print(f"{nome:<18} {colunas}")
+    finally:
+        db.rollback()
+        executar(db, "DELETE FROM produtos WHERE nome = %s", ("bench preparadas",))
+        executar(db, "DELETE FROM usuarios WHERE nome = %s", ("bench preparadas",))
+        db.commit()
+        pool.devolver(db)
+        close_pool()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--repeticoes", type=int, default=1000)
+    parser.add_argument("--aquecimento", type=int, default=50)
+    parser.add_argument("--sqlite", metavar="ARQUIVO", help="usa o backend SQLite neste arquivo")
+    main(parser.parse_args())
@@ -0,0 +1,182 @@
+"""Conta idas ao banco e commits por escrita auditada, antes e depois.
+
+"antes" reproduz o fluxo anterior de `editar_produto`/`deletar_produto`:
+`SELECT` para capturar o estado anterior, escrita + commit e o log gravado
+em seguida com outro commit (gravação síncrona, sem o writer em lote).
+"depois" é o fluxo atual: `SELECT ... FOR UPDATE`, escrita e log em uma
+única transação. O cache de leitura é desativado para que o `SELECT` do
+fluxo anterior sempre vá ao banco.
+
+    python -m benchmarks.transacoes_escrita            # banco simulado (latência fixa)
+    python -m benchmarks.transacoes_escrita --mysql    # banco configurado no .env
+"""
+import argparse
+import time
+
+from models import cache
+from models.database import get_connection, close_pool
+from models.log_model import registrar_log
+from models.produto_model import ProdutoCreate, create_produto, update_produto, delete_produto
+
+
+class CursorContado:
+    def __init__(self, conexao, cursor):
+        self._conexao = conexao
+        self._cursor = cursor
+
+    def execute(self, *args, **kwargs):
+        self._conexao.ida()
+        return self._cursor.execute(*args, **kwargs)
+
+    def executemany(self, *args, **kwargs):
+        self._conexao.ida()
+        return self._cursor.executemany(*args, **kwargs)
+
+    def __getattr__(self, nome):
+        return getattr(self._cursor, nome)
+
+
+class ConexaoContada:
+    """Envolve uma conexão contando cada instrução e cada commit."""
+
+    def __init__(self, conexao, latencia=0.0, latencia_commit=0.0):
+        self._conexao = conexao
+        self.latencia = latencia
+        self.latencia_commit = latencia_commit
+        self.idas = 0
+        self.commits = 0
+
+    def ida(self, latencia=None):
+        self.idas += 1
+        time.sleep(self.latencia if latencia is None else latencia)
+
+    def cursor(self, *args, **kwargs):
+        return CursorContado(self, self._conexao.cursor(*args, **kwargs))
+
+    def envolver_cursor(self, cursor):
+        return CursorContado(self, cursor)
+
+    def commit(self):
+        self.commits += 1
+        self.ida(self.latencia + self.latencia_commit)
+        return self._conexao.commit()
+
+    def rollback(self):
+        self.ida()
+        return self._conexao.rollback()
+
+    def __getattr__(self, nome):
+        return getattr(self._conexao, nome)
+
+
+class CursorSimulado:
+    rowcount = 1
+    lastrowid = 1
+
+    def execute(self, sql, params=()):
+        self._sql = sql
+
+    def fetchone(self):
+        if self._sql.lstrip().startswith("SELECT"):
+            return {"nome": "Produto", "descricao": "", "preco": 10, "estoque": 5, "updated_at": None}
+        return None
+
+    def fetchall(self):
+        linha = self.fetchone()
+        return [linha] if linha is not None else []
+
+    def close(self):
+        pass
+
+
+class ConexaoSimulada:
+    def cursor(self, *args, **kwargs):
+        return CursorSimulado()
+
+    def commit(self):
+        pass
+
+    def rollback(self):
+        pass
+
+
+def editar_antes(db, id, produto):
+    cursor = db.cursor(dictionary=True)
+    cursor.execute("SELECT * FROM produtos WHERE id = %s", (id,))
+    anterior = cursor.fetchone()
+    cursor.execute(
+        "UPDATE produtos SET nome=%s, descricao=%s, preco=%s, estoque=%s WHERE id=%s",
+        (produto.nome, produto.descricao, produto.preco, produto.estoque, id),
+    )
+    db.commit()
+    cursor.close()
+    registrar_log("UPDATE", "produtos", id, {"nome": anterior["nome"]}, produto.dict(), db=db)
+
+
+def deletar_antes(db, id):
+    cursor = db.cursor(dictionary=True)
+    cursor.execute("SELECT * FROM produtos WHERE id = %s", (id,))
+    anterior = cursor.fetchone()
+    cursor.execute("DELETE FROM produtos WHERE id = %s", (id,))
+    db.commit()
+    cursor.close()
+    registrar_log("DELETE", "produtos", id, {"nome": anterior["nome"]}, db=db)
+
+
+def medir(conexao, operacao, repeticoes):
+    idas, commits = conexao.idas, conexao.commits
+    inicio = time.perf_counter()
+    for i in range(repeticoes):
+        operacao(i)
+    total = time.perf_counter() - inicio
+    return {
+        "idas": (conexao.idas - idas) / repeticoes,
+        "commits": (conexao.commits - commits) / repeticoes,
+        "ms": total / repeticoes * 1000,
+    }
+
+
+def executar(db, args):
+    conexao = ConexaoContada(db, args.latencia / 1000, args.latencia_commit / 1000)
+    produto = ProdutoCreate(nome="Produto benchmark", descricao="", preco=10, estoque=5)
+
+    if args.mysql:
+        ids = [create_produto(produto, db) for _ in range(args.repeticoes * 2)]
+    else:
+        ids = [1] * (args.repeticoes * 2)
+    ids_antes, ids_depois = ids[:args.repeticoes], ids[args.repeticoes:]
+
+    resultados = [
+        ("editar antes", medir(conexao, lambda i: editar_antes(conexao, ids_antes[i], produto), args.repeticoes)),
+        ("editar depois", medir(conexao, lambda i: update_produto(ids_depois[i], produto, conexao), args.repeticoes)),
+        ("deletar antes", medir(conexao, lambda i: deletar_antes(conexao, ids_antes[i]), args.repeticoes)),
+        ("deletar depois", medir(conexao, lambda i: delete_produto(ids_depois[i], conexao), args.repeticoes)),
+    ]
+    for nome, r in resultados:
+        print(f"{nome:<15} idas={r['idas']:.1f} commits={r['commits']:.1f} tempo={r['ms']:.2f}ms/op")
+
+
+def main(args):
+    cache._cache = cache.SemCache()
+    if not args.mysql:
+        executar(ConexaoSimulada(), args)
+        return
+    try:
+        with get_connection() as db:
+            executar(db, args)
+    finally:
+        close_pool()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--repeticoes", type=int, default=50)
+    parser.add_argument("--latencia", type=float, default=0.5,
+                        help="latência simulada por ida ao banco, em ms (somente sem --mysql)")
+    parser.add_argument("--latencia-commit", type=float, default=2.0,
+                        help="custo simulado do fsync de cada commit, em ms (somente sem --mysql)")
+    parser.add_argument("--mysql", action="store_true")
+    args = parser.parse_args()
+    if args.mysql:
+        args.latencia = args.latencia_commit = 0.0
+    main(args)
@@ -0,0 +1,143 @@
+"""API JSON versionada (`/api/v1`) sobre as mesmas funções dos models.
+
+As respostas são serializadas com orjson. Cada recurso e cada página têm um
+ETag derivado do `id` e da data de atualização das linhas; quando o cliente
+envia o mesmo valor em `If-None-Match` a resposta é um 304 montado antes de
+qualquer serialização.
+"""
+from decimal import Decimal
+from typing import List, Optional
+
+from fastapi import HTTPException, Request, Response
+from pydantic import BaseModel
+
+from models.produto_model import (
+    Produto, AjusteEstoque, EstoqueInsuficienteError, get_produto_by_id, listar_produtos_paginado,
+    ajustar_estoque_lote,
+)
+from models.usuario_model import Usuario, get_usuario_by_id, listar_usuarios_paginado
+from models.database import run_db
+from models.log_model import obter_ip_origem
+from controllers.auth_controller import autenticar, iniciar_sessao
+from controllers.cache_http import calcular_etag, nao_modificado
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+    import json
+
+
+class LoteAjusteEstoque(BaseModel):
+    ajustes: List[AjusteEstoque]
+
+
+class Credenciais(BaseModel):
+    email: str
+    senha: str
+
+
+CAMPOS_PRODUTO = list(Produto.__fields__)
+CAMPOS_USUARIO = [campo for campo in Usuario.__fields__ if campo != "senha"]
+
+
+def _padrao(valor):
+    if isinstance(valor, Decimal):
+        return float(valor)
+    if orjson is None and hasattr(valor, "isoformat"):
+        return valor.isoformat()
+    raise TypeError(f"Tipo não serializável: {type(valor).__name__}")
+
+
+class RespostaJSON(Response):
+    media_type = "application/json"
+
+    def render(self, content) -> bytes:
+        if orjson is not None:
+            return orjson.dumps(content, default=_padrao)
+        return json.dumps(content, default=_padrao, ensure_ascii=False, separators=(",", ":")).encode()
+
+
+def selecionar_campos(campos: Optional[str], permitidos):
+    if not campos:
+        return permitidos
+    selecionados = [c.strip() for c in campos.split(",") if c.strip()]
+    invalidos = [c for c in selecionados if c not in permitidos]
+    if invalidos:
+        raise HTTPException(status_code=400, detail=f"Campos inválidos: {', '.join(invalidos)}")
+    return selecionados
+
+
+def responder(request: Request, conteudo, linhas, coluna_atualizacao):
+    etag = calcular_etag(request, linhas, coluna_atualizacao)
+    cabecalhos = {"ETag": etag, "Cache-Control": "private, no-cache"}
+    if nao_modificado(request, etag):
+        return Response(status_code=304, headers=cabecalhos)
+    return RespostaJSON(conteudo(), headers=cabecalhos)
+
+
+def _pagina(pagina, campos):
+    return {
+        "itens": [{c: linha[c] for c in campos} for linha in pagina["itens"]],
+        "limite": pagina["limite"],
+        "proximo": pagina["proximo"],
+        "anterior": pagina["anterior"],
+    }
+
+
+async def listar_produtos(request: Request, db, limite, apos, antes, ordem, direcao, campos):
+    campos = selecionar_campos(campos, CAMPOS_PRODUTO)
+    try:
+        pagina = await run_db(listar_produtos_paginado, db, limite, apos, antes, ordem, direcao == "desc")
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    return responder(request, lambda: _pagina(pagina, campos), pagina["itens"], "updated_at")
+
+
+async def obter_produto(request: Request, id: int, db, campos):
+    campos = selecionar_campos(campos, CAMPOS_PRODUTO)
+    produto = await run_db(get_produto_by_id, id, db)
+    if not produto:
+        raise HTTPException(status_code=404, detail="Produto não encontrado")
+    return responder(request, lambda: {c: produto[c] for c in campos}, [produto], "updated_at")
+
+
+async def ajustar_estoque(request: Request, lote: LoteAjusteEstoque, db):
+    if not lote.ajustes:
+        raise HTTPException(status_code=400, detail="Nenhum ajuste informado")
+    try:
+        totais = await run_db(ajustar_estoque_lote, lote.ajustes, db,
+                              request.session.get("usuario_id"), obter_ip_origem(request))
+    except EstoqueInsuficienteError as e:
+        raise HTTPException(status_code=409, detail={"mensagem": str(e), "id": e.id})
+    return RespostaJSON({"ajustados": len(totais)})
+
+
+async def listar_usuarios(request: Request, db, limite, apos, antes, ordem, direcao, campos):
+    campos = selecionar_campos(campos, CAMPOS_USUARIO)
+    try:
+        pagina = await run_db(listar_usuarios_paginado, db, limite, apos, antes, ordem, direcao == "desc")
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    return responder(request, lambda: _pagina(pagina, campos), pagina["itens"], "data_atualizacao")
+
+
+async def obter_usuario(request: Request, id: int, db, campos):
+    campos = selecionar_campos(campos, CAMPOS_USUARIO)
+    try:
+        usuario = await run_db(get_usuario_by_id, id, db)
+    except ValueError as e:
+        raise HTTPException(status_code=500, detail=str(e))
+    if not usuario:
+        raise HTTPException(status_code=404, detail="Usuário não encontrado")
+    return responder(request, lambda: {c: usuario[c] for c in campos}, [usuario], "data_atualizacao")
+
+
+async def login(request: Request, credenciais: Credenciais, db):
+    """Autentica e cria a sessão, como o `/login` das páginas: o cookie da
+    sessão vem na resposta, junto com o usuário."""
+    usuario = await autenticar(credenciais.email, credenciais.senha, db, obter_ip_origem(request))
+    if usuario is None:
+        raise HTTPException(status_code=401, detail="E-mail ou senha inválidos")
+    await iniciar_sessao(request, usuario, db)
+    return RespostaJSON(usuario)
@@ -0,0 +1,150 @@
+from fastapi import HTTPException, Request, status
+from fastapi.responses import RedirectResponse
+from models.usuario_model import get_usuario_para_login, atualizar_hash_senha, get_usuario_by_id
+from models.senha import verificar_senha, FilaSenhasCheiaError
+from models.database import run_db
+from models.log_model import registrar_log, obter_ip_origem
+from models.sessao import renovar_sessao
+from models.tentativas_login import get_limite_tentativas
+from controllers.templates import templates
+from database.config import get_sessao_config, get_diagnostico_config
+import mysql.connector
+import math
+import time
+
+
+async def autenticar(email: str, senha: str, db: mysql.connector.MySQLConnection, ip_origem=None):
+    """Retorna o usuário (sem a senha) se as credenciais conferem, senão None.
+
+    Se o hash foi gerado com outro custo do bcrypt, ele é refeito e gravado.
+    Depois de `LOGIN_MAX_TENTATIVAS` falhas do mesmo e-mail e IP responde 429.
+    """
+    limite = get_limite_tentativas()
+    chave = (email.strip().lower(), ip_origem)
+    if limite is not None:
+        espera = limite.espera(chave)
+        if espera:
+            raise HTTPException(
+                status_code=status.HTTP_429_TOO_MANY_REQUESTS,
+                detail="Muitas tentativas de login; tente novamente mais tarde",
+                headers={"Retry-After": str(math.ceil(espera))},
+            )
+    usuario = await run_db(get_usuario_para_login, email, db)
+    try:
+        confere, novo_hash = await verificar_senha(senha, usuario["senha"] if usuario else None)
+    except FilaSenhasCheiaError as e:
+        raise HTTPException(status_code=503, detail=str(e))
+    if not confere:
+        if limite is not None:
+            limite.falhou(chave)
+        return None
+    if limite is not None:
+        limite.liberar(chave)
+    if novo_hash:
+        await run_db(atualizar_hash_senha, usuario["id"], novo_hash, db)
+    return {"id": usuario["id"], "nome": usuario["nome"], "email": usuario["email"]}
+
+
+def form_login(request: Request):
+    return templates.TemplateResponse("login.html", {"request": request, "errors": [], "email": ""})
+
+
+async def iniciar_sessao(request: Request, usuario: dict, db: mysql.connector.MySQLConnection):
+    """Cria a sessão do usuário autenticado (novo id de sessão) e registra o login."""
+    renovar_sessao(request)
+    request.session["usuario_id"] = usuario["id"]
+    guardar_perfil(request, usuario)
+    await run_db(
+        registrar_log,
+        tipo_operacao="LOGIN",
+        tabela_afetada="usuarios",
+        id_registro=usuario["id"],
+        id_usuario=usuario["id"],
+        request=request,
+        db=db
+    )
+
+
+async def login(request: Request, email: str, senha: str, db: mysql.connector.MySQLConnection):
+    try:
+        usuario = await autenticar(email, senha, db, obter_ip_origem(request))
+    except HTTPException as e:
+        if e.status_code != status.HTTP_429_TOO_MANY_REQUESTS:
+            raise
+        return templates.TemplateResponse(
+            "login.html",
+            {"request": request, "errors": [e.detail], "email": email},
+            status_code=e.status_code,
+            headers=e.headers,
+        )
+    if usuario is None:
+        return templates.TemplateResponse(
+            "login.html",
+            {"request": request, "errors": ["E-mail ou senha inválidos"], "email": email},
+            status_code=status.HTTP_401_UNAUTHORIZED,
+        )
+    await iniciar_sessao(request, usuario, db)
+    return RedirectResponse(url="/", status_code=status.HTTP_303_SEE_OTHER)
+
+
+def logout(request: Request):
+    request.session.clear()
+    return RedirectResponse(url="/login", status_code=status.HTTP_303_SEE_OTHER)
+
+
+def exigir_login(request: Request):
+    """Dependência que recusa com 401 requisições sem usuário logado."""
+    if request.session.get("usuario_id") is None:
+        raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Login necessário")
+
+
+def exigir_diagnostico(request: Request):
+    """Dependência das rotas de diagnóstico: só e-mails listados em `DIAGNOSTICO_EMAILS`.
+
+    Sem lista configurada as rotas não existem (404); sem sessão respondem 401
+    e para os demais usuários, 403.
+    """
+    emails = get_diagnostico_config()['emails']
+    if not emails:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Not Found")
+    exigir_login(request)
+    perfil = request.session.get("perfil") or {}
+    if (perfil.get("email") or "").lower() not in emails:
+        raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Acesso restrito")
+
+
+def guardar_perfil(request: Request, usuario: dict):
+    request.session["perfil"] = {
+        "id": usuario["id"],
+        "nome": usuario["nome"],
+        "email": usuario["email"],
+        "carregado_em": time.time(),
+    }
+
+
+async def usuario_logado(request: Request, db: mysql.connector.MySQLConnection):
+    """Perfil do usuário da sessão, ou None se ninguém estiver logado.
+
+    O perfil fica na própria sessão e só é relido de `usuarios` depois de
+    `SESSAO_PERFIL_TTL` segundos, para refletir alterações feitas em outras
+    sessões.
+    """
+    usuario_id = request.session.get("usuario_id")
+    if usuario_id is None:
+        return None
+    perfil = request.session.get("perfil")
+    if perfil and time.time() - perfil["carregado_em"] < get_sessao_config()['perfil_ttl']:
+        return perfil
+    usuario = await run_db(get_usuario_by_id, usuario_id, db)
+    if not usuario:
+        request.session.clear()
+        return None
+    guardar_perfil(request, usuario)
+    return request.session["perfil"]
+
+
+async def perfil(request: Request, db: mysql.connector.MySQLConnection):
+    usuario = await usuario_logado(request, db)
+    if usuario is None:
+        return RedirectResponse(url="/login", status_code=status.HTTP_303_SEE_OTHER)
+    return templates.TemplateResponse("perfil.html", {"request": request, "usuario": usuario})
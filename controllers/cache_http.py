@@ -0,0 +1,146 @@
+"""Requisições condicionais e cache de fragmentos para as páginas HTML.
+
+O validador é o mesmo da API JSON: `id` e data de atualização das linhas
+mostradas (o próprio registro nas páginas de detalhe, as linhas da página nas
+listas) mais a URL. Com `If-None-Match` igual ao ETag, ou `If-Modified-Since`
+não anterior à data de atualização do registro, a resposta é um 304 montado
+antes de renderizar o template.
+
+O layout varia com a sessão (menu com o usuário logado), então o ETag das
+páginas inclui essa variante e a resposta leva `Cache-Control: private,
+no-cache` e `Vary: Cookie`. Páginas com mensagens (flash) são sempre
+renderizadas, sem validadores.
+
+Com `CACHE_FRAGMENTOS_ATIVO=true` o bloco `content` renderizado fica em um LRU
+em memória, por processo, chaveado pela URL e pelas mesmas linhas. Ele não
+depende da sessão e serve a todos os usuários; só o layout é renderizado de
+novo.
+"""
+import hashlib
+import time
+from datetime import timezone
+from email.utils import format_datetime, parsedate_to_datetime
+from functools import lru_cache
+
+from fastapi import Request, Response
+from fastapi.responses import HTMLResponse
+
+from database.config import get_cache_http_config
+from models.cache import LRUCache
+from models.metricas import observar_render
+
+
+def calcular_etag(request: Request, linhas, coluna_atualizacao, *variantes):
+    # A URL entra no hash porque campos, página e ordenação mudam o corpo.
+    h = hashlib.sha1(str(request.url.path).encode())
+    h.update(str(request.url.query).encode())
+    for linha in linhas:
+        h.update(f"|{linha['id']}:{linha[coluna_atualizacao]}".encode())
+    for variante in variantes:
+        h.update(f"|{variante}".encode())
+    return f'W/"{h.hexdigest()}"'
+
+
+def _em_utc(data):
+    # As datas do banco vêm sem fuso, no horário local do servidor
+    return data.astimezone(timezone.utc)
+
+
+def nao_modificado(request: Request, etag: str, ultima_modificacao=None):
+    cabecalho = request.headers.get("if-none-match")
+    if cabecalho:
+        # If-None-Match tem precedência sobre If-Modified-Since (RFC 9110)
+        enviados = [valor.strip() for valor in cabecalho.split(",")]
+        return "*" in enviados or etag in enviados or etag[2:] in enviados
+    desde = request.headers.get("if-modified-since")
+    if not desde or ultima_modificacao is None:
+        return False
+    try:
+        desde = parsedate_to_datetime(desde)
+    except (TypeError, ValueError):
+        return False
+    if desde.tzinfo is None:
+        desde = desde.replace(tzinfo=timezone.utc)
+    # Last-Modified tem resolução de segundos
+    return _em_utc(ultima_modificacao).replace(microsecond=0) <= desde
+
+
+@lru_cache(maxsize=None)
+def _config():
+    return get_cache_http_config()
+
+
+@lru_cache(maxsize=None)
+def get_cache_fragmentos():
+    config = _config()
+    if not config['fragmentos']:
+        return None
+    return LRUCache(config['fragmentos_max_itens'], config['fragmentos_ttl'])
+
+
+def get_fragmentos_stats():
+    fragmentos = get_cache_fragmentos()
+    if fragmentos is None:
+        return {"backend": "desativado"}
+    return fragmentos.estatisticas()
+
+
+def _renderizar(templates, nome, contexto, chave):
+    """Renderiza o template reaproveitando o bloco `content` guardado em `chave`."""
+    fragmentos = get_cache_fragmentos()
+    template = templates.get_template(nome)
+    ctx = template.new_context(contexto)
+    conteudo = fragmentos.obter(chave)
+    if conteudo is None:
+        bloco = ctx.blocks["content"][0]
+        partes = []
+
+        def capturar(contexto_bloco):
+            for parte in bloco(contexto_bloco):
+                partes.append(parte)
+                yield parte
+
+        ctx.blocks["content"][0] = capturar
+    else:
+        ctx.blocks["content"][0] = lambda contexto_bloco: iter((conteudo,))
+
+    inicio = time.perf_counter()
+    try:
+        html = template.environment.concat(template.root_render_func(ctx))
+    except Exception:
+        template.environment.handle_exception()
+    finally:
+        observar_render(template, time.perf_counter() - inicio)
+    if conteudo is None:
+        fragmentos.gravar(chave, "".join(partes))
+    return html
+
+
+def pagina_condicional(request: Request, templates, nome: str, contexto: dict,
+                       linhas, coluna_atualizacao, *variantes, ultima_modificacao=None):
+    """Responde 304 se o cliente já tem a página; senão renderiza `nome` com os validadores.
+
+    `linhas` e `variantes` devem cobrir tudo o que o bloco `content` mostra
+    além da URL (por exemplo os cursores da paginação).
+    """
+    if not _config()['ativo'] or contexto.get("messages"):
+        return templates.TemplateResponse(nome, contexto)
+
+    perfil = request.session.get("perfil") or {}
+    etag = calcular_etag(request, linhas, coluna_atualizacao, nome, *variantes,
+                         request.session.get("usuario_id"), perfil.get("nome"))
+    cabecalhos = {"ETag": etag, "Cache-Control": "private, no-cache", "Vary": "Cookie"}
+    if ultima_modificacao is not None:
+        cabecalhos["Last-Modified"] = format_datetime(_em_utc(ultima_modificacao), usegmt=True)
+    if nao_modificado(request, etag, ultima_modificacao):
+        return Response(status_code=304, headers=cabecalhos)
+
+    if get_cache_fragmentos() is None:
+        resposta = templates.TemplateResponse(nome, contexto)
+        resposta.headers.update(cabecalhos)
+        return resposta
+    # Sem a sessão: o bloco é o mesmo para todos os usuários. A URL completa
+    # entra porque os links do bloco são absolutos (`url_for`).
+    chave = (nome, str(request.url),
+             tuple((linha["id"], linha[coluna_atualizacao]) for linha in linhas), variantes)
+    return HTMLResponse(_renderizar(templates, nome, contexto, chave), headers=cabecalhos)
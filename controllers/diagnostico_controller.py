@@ -0,0 +1,12 @@
+from fastapi import Request
+from models.consultas_lentas import get_registro_consultas
+from controllers.templates import templates
+
+
+async def consultas_lentas(request: Request, limite: int):
+    registro = get_registro_consultas()
+    return templates.TemplateResponse("diagnostico/consultas_lentas.html", {
+        "request": request,
+        "consultas": registro.mais_lentas(limite) if registro is not None else [],
+        "estatisticas": registro.estatisticas() if registro is not None else None,
+    })
@@ -0,0 +1,85 @@
+"""Respostas de exportação em CSV ou NDJSON geradas em streaming.
+
+As linhas vêm de um gerador (normalmente `iterar_consulta`, com cursor não
+bufferizado) e são serializadas e enviadas em blocos, opcionalmente
+comprimidos com gzip à medida que são gerados; a memória usada não depende
+do número de linhas exportadas.
+"""
+import csv
+import io
+import json
+import zlib
+from decimal import Decimal
+
+from fastapi import HTTPException
+from fastapi.responses import StreamingResponse
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+FORMATOS = ("csv", "ndjson")
+TAMANHO_BLOCO = 64 * 1024
+
+
+def _padrao(valor):
+    if isinstance(valor, Decimal):
+        return float(valor)
+    return str(valor)
+
+
+def _gerar_csv(linhas, colunas):
+    buffer = io.StringIO()
+    escritor = csv.writer(buffer)
+    escritor.writerow(colunas)
+    for linha in linhas:
+        escritor.writerow([linha.get(c) for c in colunas])
+        if buffer.tell() >= TAMANHO_BLOCO:
+            yield buffer.getvalue().encode("utf-8")
+            buffer.seek(0)
+            buffer.truncate()
+    if buffer.tell():
+        yield buffer.getvalue().encode("utf-8")
+
+
+def _gerar_ndjson(linhas, colunas):
+    bloco = bytearray()
+    for linha in linhas:
+        registro = {c: linha.get(c) for c in colunas}
+        if orjson is not None:
+            bloco += orjson.dumps(registro, default=_padrao, option=orjson.OPT_APPEND_NEWLINE)
+        else:
+            bloco += (json.dumps(registro, default=_padrao, ensure_ascii=False) + "\n").encode("utf-8")
+        if len(bloco) >= TAMANHO_BLOCO:
+            yield bytes(bloco)
+            bloco.clear()
+    if bloco:
+        yield bytes(bloco)
+
+
+def _comprimir(blocos):
+    compressor = zlib.compressobj(6, zlib.DEFLATED, 31)  # wbits 31: formato gzip
+    for bloco in blocos:
+        comprimido = compressor.compress(bloco)
+        if comprimido:
+            yield comprimido
+    yield compressor.flush()
+
+
+def resposta_exportacao(linhas, colunas, nome: str, formato: str = "csv", gzip: bool = False):
+    """Monta a `StreamingResponse` que baixa `linhas` como `nome.csv` / `nome.ndjson`."""
+    if formato not in FORMATOS:
+        raise HTTPException(status_code=400, detail=f"Formato inválido: {formato}")
+    if formato == "csv":
+        blocos, tipo = _gerar_csv(linhas, colunas), "text/csv"
+    else:
+        blocos, tipo = _gerar_ndjson(linhas, colunas), "application/x-ndjson"
+    arquivo = f"{nome}.{formato}"
+    if gzip:
+        blocos, tipo, arquivo = _comprimir(blocos), "application/gzip", arquivo + ".gz"
+    return StreamingResponse(
+        blocos,
+        media_type=tipo,
+        headers={"Content-Disposition": f'attachment; filename="{arquivo}"'},
+    )
@@ -0,0 +1,48 @@
+from fastapi import Depends, HTTPException, Request
+from models.log_model import FiltrosLog, consultar_logs, iterar_logs, obter_log_by_id
+from controllers.exportacao import resposta_exportacao
+from models.database import get_db, run_db
+from models.paginacao import LIMITE_PADRAO, LIMITE_MAXIMO
+from controllers.templates import templates
+import mysql.connector
+from typing import Optional
+from datetime import datetime
+
+
+TIPOS_OPERACAO = ["CREATE", "UPDATE", "DELETE", "IMPORT", "LOGIN"]
+TABELAS = ["produtos", "usuarios"]
+
+
+async def listar_logs(request: Request, filtros: FiltrosLog, db: mysql.connector.MySQLConnection = Depends(get_db),
+                      limite: int = LIMITE_PADRAO, apos: Optional[str] = None, antes: Optional[str] = None):
+    try:
+        pagina = await run_db(consultar_logs, db, filtros, limite, apos, antes)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    return templates.TemplateResponse("logs/lista.html", {
+        "request": request,
+        "logs": pagina["itens"],
+        "pagina": pagina,
+        "filtros": filtros.ativos(),
+        "limites": [20, 50, LIMITE_MAXIMO],
+        "tipos_operacao": TIPOS_OPERACAO,
+        "tabelas": TABELAS,
+    })
+
+
+COLUNAS_EXPORTACAO_LOG = [
+    "id", "tipo_operacao", "tabela_afetada", "id_registro", "dados_anteriores",
+    "dados_novos", "id_usuario", "ip_origem", "data_operacao",
+]
+
+
+def exportar_logs(filtros: FiltrosLog, db: mysql.connector.MySQLConnection, formato: str = "csv", gzip: bool = False):
+    return resposta_exportacao(iterar_logs(db, filtros), COLUNAS_EXPORTACAO_LOG, "logs", formato, gzip)
+
+
+async def detalhes_log(request: Request, id: int, data: Optional[datetime] = None,
+                       db: mysql.connector.MySQLConnection = Depends(get_db)):
+    log = await run_db(obter_log_by_id, id, db, data)
+    if not log:
+        raise HTTPException(status_code=404, detail="Log não encontrado")
+    return templates.TemplateResponse("logs/_detalhes.html", {"request": request, "log": log})
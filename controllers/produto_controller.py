@@ -1,35 +1,109 @@
-from fastapi import APIRouter, Depends, HTTPException, Form, Request
+from fastapi import APIRouter, Depends, HTTPException, Form, Request, UploadFile
 from fastapi.responses import HTMLResponse, RedirectResponse
-from fastapi.templating import Jinja2Templates
 from pydantic import BaseModel
 from typing import Optional
-from models.produto_model import ProdutoCreate, get_all_produtos, get_produto_by_id, create_produto, update_produto, delete_produto
-from models.database import get_db
-from models.log_model import registrar_log
+from datetime import datetime
+from models.produto_model import ProdutoCreate, ajustar_estoque, EstoqueInsuficienteError, ConflitoVersaoError, get_all_produtos, listar_produtos_paginado, iterar_produtos, buscar_produtos, get_produto_by_id, create_produto, update_produto, delete_produto
+from models.paginacao import LIMITE_PADRAO, LIMITE_MAXIMO
+from controllers.streaming import template_stream_response
+from controllers.cache_http import pagina_condicional
+from controllers.exportacao import resposta_exportacao
+from models.database import get_db, run_db
+from models.log_model import registrar_log, obter_ip_origem
+from models.importacao import importar_produtos as importar_arquivo, detectar_formato
+from controllers.templates import templates
 import mysql.connector
 
-templates = Jinja2Templates(directory="templates")
-
 class ProdutoSchema(BaseModel):
     nome: str
     descricao: Optional[str] = ""
     preco: float
     estoque: int
 
-def listar_produtos(request: Request, db: mysql.connector.MySQLConnection = Depends(get_db)):
-    produtos = get_all_produtos(db)
-    return templates.TemplateResponse("produtos/lista.html", {"request": request, "produtos": produtos})
+async def listar_produtos(request: Request, db: mysql.connector.MySQLConnection = Depends(get_db),
+                          limite: int = LIMITE_PADRAO, apos: Optional[str] = None, antes: Optional[str] = None,
+                          ordem: str = "id", direcao: str = "asc", stream: bool = False):
+    contexto = {
+        "request": request,
+        "ordem": ordem,
+        "direcao": direcao,
+        "limites": [10, 20, 50, LIMITE_MAXIMO],
+        "stream": stream,
+    }
+    if stream:
+        try:
+            produtos = iterar_produtos(db, ordem, direcao == "desc")
+        except ValueError as e:
+            raise HTTPException(status_code=400, detail=str(e))
+        contexto.update({
+            "produtos": produtos,
+            "pagina": {"limite": limite, "proximo": None, "anterior": None},
+        })
+        return template_stream_response(templates, "produtos/lista.html", contexto)
+
+    try:
+        pagina = await run_db(listar_produtos_paginado, db, limite, apos, antes, ordem, direcao == "desc")
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    contexto.update({"produtos": pagina["itens"], "pagina": pagina})
+    return pagina_condicional(request, templates, "produtos/lista.html", contexto,
+                              pagina["itens"], "updated_at", pagina["anterior"], pagina["proximo"])
+
+async def buscar(request: Request, q: str, db: mysql.connector.MySQLConnection = Depends(get_db),
+                 limite: int = LIMITE_PADRAO, apos: Optional[str] = None, antes: Optional[str] = None):
+    pagina = {"itens": [], "limite": limite, "proximo": None, "anterior": None}
+    if q.strip():
+        try:
+            pagina = await run_db(buscar_produtos, db, q, limite, apos, antes)
+        except ValueError as e:
+            raise HTTPException(status_code=400, detail=str(e))
+    return templates.TemplateResponse("produtos/busca.html", {
+        "request": request,
+        "q": q,
+        "produtos": pagina["itens"],
+        "pagina": pagina,
+        "filtros": {"q": q},
+        "limites": [10, 20, 50, LIMITE_MAXIMO],
+    })
+
+def exportar_produtos(db: mysql.connector.MySQLConnection, formato: str = "csv", gzip: bool = False,
+                      ordem: str = "id", direcao: str = "asc"):
+    try:
+        produtos = iterar_produtos(db, ordem, direcao == "desc", lote=1000)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    return resposta_exportacao(produtos, ["id", "nome", "descricao", "preco", "estoque"], "produtos", formato, gzip)
+
+def form_importar_produtos(request: Request):
+    return templates.TemplateResponse("produtos/importar.html", {"request": request})
+
+async def importar_produtos(request: Request, arquivo: UploadFile, formato: Optional[str],
+                            db: mysql.connector.MySQLConnection = Depends(get_db)):
+    try:
+        formato = detectar_formato(arquivo.filename, formato)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    resultado = await run_db(
+        importar_arquivo, arquivo.file, db, formato,
+        id_usuario=request.session.get("usuario_id"), ip_origem=obter_ip_origem(request),
+    )
+    return templates.TemplateResponse("produtos/importar.html", {
+        "request": request,
+        "arquivo": arquivo.filename,
+        "resultado": resultado,
+    })
 
 def form_cadastrar_produto(request: Request):
     return templates.TemplateResponse("produtos/cadastro.html", {"request": request})
 
-def cadastrar_produto(request: Request, nome, descricao, preco, estoque, db: mysql.connector.MySQLConnection = Depends(get_db)):
+async def cadastrar_produto(request: Request, nome, descricao, preco, estoque, db: mysql.connector.MySQLConnection = Depends(get_db)):
     produto_data = ProdutoCreate(
         nome=nome, descricao=descricao, preco=preco, estoque=estoque)
-    produto_id = create_produto(produto_data, db)
+    produto_id = await run_db(create_produto, produto_data, db)
 
     if produto_id:
-        registrar_log(
+        await run_db(
+            registrar_log,
             tipo_operacao="CREATE",
             tabela_afetada="produtos",
             id_registro=produto_id,
@@ -44,65 +118,55 @@ def cadastrar_produto(request: Request, nome, descricao, preco, estoque, db: mys
         "errors": ["Erro ao cadastrar produto"]
     })
 
-def obter_produto(request: Request, id: int, db: mysql.connector.MySQLConnection = Depends(get_db)):
-    produto = get_produto_by_id(id, db)
+async def obter_produto(request: Request, id: int, db: mysql.connector.MySQLConnection = Depends(get_db)):
+    produto = await run_db(get_produto_by_id, id, db)
     if produto:
-        return templates.TemplateResponse("produtos/detalhes.html", {"request": request, "produto": produto})
+        return pagina_condicional(request, templates, "produtos/detalhes.html",
+                                  {"request": request, "produto": produto}, [produto], "updated_at",
+                                  ultima_modificacao=produto["updated_at"])
     raise HTTPException(status_code=404, detail="Produto não encontrado")
 
-def form_editar_produto(request: Request, id: int, db: mysql.connector.MySQLConnection = Depends(get_db)):
-    produto = get_produto_by_id(id, db)
+async def form_editar_produto(request: Request, id: int, db: mysql.connector.MySQLConnection = Depends(get_db)):
+    produto = await run_db(get_produto_by_id, id, db)
     if not produto:
         raise HTTPException(status_code=404, detail="Produto não encontrado")
     return templates.TemplateResponse("produtos/editar.html", {"request": request, "produto": produto})
 
-def editar_produto(request: Request, id: int, nome: str, descricao: str, preco: float, estoque: int, db: mysql.connector.MySQLConnection = Depends(get_db)):
-    produto_atual = get_produto_by_id(id, db)
+async def editar_produto(request: Request, id: int, nome: str, descricao: str, preco: float, estoque: int, db: mysql.connector.MySQLConnection = Depends(get_db),
+                         versao: Optional[str] = None):
+    try:
+        versao = datetime.fromisoformat(versao) if versao else None
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Versão do produto inválida")
 
     produto_data = ProdutoCreate(
         nome=nome, descricao=descricao, preco=preco, estoque=estoque)
-    affected_rows = update_produto(id, produto_data, db)
-
-    if affected_rows > 0:
-        registrar_log(
-            tipo_operacao="UPDATE",
-            tabela_afetada="produtos",
-            id_registro=id,
-            dados_anteriores={
-                "nome": produto_atual["nome"],
-                "descricao": produto_atual["descricao"],
-                "preco": float(produto_atual["preco"]),
-                "estoque": produto_atual["estoque"]
-            },
-            dados_novos=produto_data.dict(),
-            request=request,
-            db=db
-        )
-
-        return RedirectResponse(url="/produtos", status_code=303)
-    elif affected_rows == 0:
-        return RedirectResponse(url="/produtos", status_code=303)
-
-    raise HTTPException(
-        status_code=400, detail="Nenhum produto foi atualizado")
-
-def deletar_produto(request: Request, id: int, db: mysql.connector.MySQLConnection = Depends(get_db)):
-    produto = get_produto_by_id(id, db)
-
-    affected_rows = delete_produto(id, db)
+    try:
+        affected_rows = await run_db(update_produto, id, produto_data, db, versao, obter_ip_origem(request))
+    except ConflitoVersaoError as e:
+        produto = await run_db(get_produto_by_id, id, db)
+        return templates.TemplateResponse("produtos/editar.html", {
+            "request": request,
+            "produto": produto,
+            "errors": [str(e)],
+        }, status_code=409)
+
+    if affected_rows == 0:
+        raise HTTPException(status_code=404, detail="Produto não encontrado")
+    return RedirectResponse(url="/produtos", status_code=303)
+
+async def ajustar_estoque_produto(request: Request, id: int, quantidade: int, db: mysql.connector.MySQLConnection = Depends(get_db)):
+    if quantidade == 0:
+        raise HTTPException(status_code=400, detail="A quantidade do ajuste não pode ser zero")
+    try:
+        await run_db(ajustar_estoque, id, quantidade, db,
+                     request.session.get("usuario_id"), obter_ip_origem(request))
+    except EstoqueInsuficienteError as e:
+        raise HTTPException(status_code=409, detail=str(e))
+    return RedirectResponse(url=f"/produtos/{id}", status_code=303)
+
+async def deletar_produto(request: Request, id: int, db: mysql.connector.MySQLConnection = Depends(get_db)):
+    affected_rows = await run_db(delete_produto, id, db, obter_ip_origem(request))
     if affected_rows > 0:
-        registrar_log(
-            tipo_operacao="DELETE",
-            tabela_afetada="produtos",
-            id_registro=id,
-            dados_anteriores={
-                "nome": produto["nome"],
-                "descricao": produto["descricao"],
-                "preco": float(produto["preco"]),
-                "estoque": produto["estoque"]
-            },
-            request=request,
-            db=db
-        )
         return RedirectResponse(url="/produtos", status_code=303)
     raise HTTPException(status_code=404, detail="Produto não encontrado")
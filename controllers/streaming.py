@@ -0,0 +1,31 @@
+from fastapi.responses import StreamingResponse
+
+TAMANHO_BLOCO = 2048
+
+
+def _agrupar(fragmentos, tamanho_bloco):
+    buffer = []
+    acumulado = 0
+    for fragmento in fragmentos:
+        buffer.append(fragmento)
+        acumulado += len(fragmento)
+        if acumulado >= tamanho_bloco:
+            yield "".join(buffer).encode("utf-8")
+            buffer = []
+            acumulado = 0
+    if buffer:
+        yield "".join(buffer).encode("utf-8")
+
+
+def template_stream_response(templates, nome: str, contexto: dict, tamanho_bloco: int = TAMANHO_BLOCO):
+    """Renderiza o template com `Template.generate()` e envia em streaming.
+
+    Os fragmentos gerados pelo Jinja são agrupados em blocos pequenos para que
+    o cabeçalho da página saia antes de a consulta começar a ser consumida.
+    Geradores no contexto são percorridos sob demanda, durante o envio.
+    """
+    template = templates.get_template(nome)
+    return StreamingResponse(
+        _agrupar(template.generate(contexto), tamanho_bloco),
+        media_type="text/html"
+    )
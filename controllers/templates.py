@@ -0,0 +1,43 @@
+"""Ambiente Jinja único da aplicação, usado pelo `main` e por todos os controllers.
+
+Cada template é compilado uma vez por processo (e não uma vez por instância
+de `Jinja2Templates`). O bytecode compilado fica em `TEMPLATES_BYTECODE_CACHE`
+e é reaproveitado pelos outros workers e nas próximas inicializações; o Jinja
+o invalida sozinho quando o arquivo do template muda. `precompilar_templates`
+roda na inicialização, de modo que a primeira requisição já encontra tudo
+carregado.
+
+Com `TEMPLATES_AUTO_RELOAD=false` (padrão) o Jinja não confere a data de
+modificação dos arquivos a cada renderização; alterações nos templates valem
+a partir do próximo restart. Em desenvolvimento use `true`.
+"""
+import os
+
+from fastapi.templating import Jinja2Templates
+from jinja2 import FileSystemBytecodeCache
+
+from database.config import get_templates_config
+from models.estaticos import registrar_url_estatico
+from models.metricas import instrumentar_templates
+
+DIRETORIO = "templates"
+
+
+def _criar_templates():
+    config = get_templates_config()
+    opcoes = {"auto_reload": config['auto_reload']}
+    if config['bytecode_cache']:
+        os.makedirs(config['bytecode_cache'], exist_ok=True)
+        opcoes["bytecode_cache"] = FileSystemBytecodeCache(config['bytecode_cache'])
+    return registrar_url_estatico(instrumentar_templates(Jinja2Templates(directory=DIRETORIO, **opcoes)))
+
+
+templates = _criar_templates()
+
+
+def precompilar_templates():
+    """Carrega todos os templates no ambiente; retorna quantos foram carregados."""
+    nomes = templates.env.list_templates(extensions=["html"])
+    for nome in nomes:
+        templates.env.get_template(nome)
+    return len(nomes)
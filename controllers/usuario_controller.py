@@ -1,55 +1,102 @@
 from fastapi import APIRouter, Depends, HTTPException, Form, Request, status
 from fastapi.responses import HTMLResponse, RedirectResponse
-from fastapi.templating import Jinja2Templates
 from models.usuario_model import (
     UsuarioCreate, 
     get_all_usuarios, 
+    listar_usuarios_paginado, 
+    iterar_usuarios, 
     get_usuario_by_id, 
     create_usuario, 
     delete_usuario, 
     update_usuario
 )
-from models.database import get_db
-from models.log_model import registrar_log
+from models.database import get_db, run_db, ErroBanco, ER_DUP_ENTRY
+from models.log_model import registrar_log, obter_ip_origem
+from models.senha import hash_senha, FilaSenhasCheiaError
+from models.paginacao import LIMITE_PADRAO, LIMITE_MAXIMO
+from controllers.streaming import template_stream_response
+from controllers.cache_http import pagina_condicional
+from controllers.exportacao import resposta_exportacao
+from controllers.auth_controller import guardar_perfil
+from controllers.templates import templates
 import mysql.connector
 from typing import Optional
 import logging
 
-#logging.basicConfig(level=logging.INFO)
-#logger = logging.getLogger(__name__)
+logger = logging.getLogger(__name__)
 
-templates = Jinja2Templates(directory="templates")
 
 def set_flash(request: Request, message: str, category: str = "success"):
     """Define uma mensagem flash na sessão."""
-    if not hasattr(request.state, 'session'):
-        request.state.session = {}
-    request.state.session['flash'] = {'message': message, 'category': category}
+    request.session['flash'] = {'message': message, 'category': category}
 
 def get_flash(request: Request):
     """Obtém e remove a mensagem flash da sessão."""
-    if hasattr(request.state, 'session') and 'flash' in request.state.session:
-        flash = request.state.session.pop('flash')
-        return flash
-    return None
+    return request.session.pop('flash', None)
 
-def get_all_users_controllers(request: Request, db: mysql.connector.MySQLConnection = Depends(get_db)):
+async def get_all_users_controllers(request: Request, db: mysql.connector.MySQLConnection = Depends(get_db),
+                                    limite: int = LIMITE_PADRAO, apos: Optional[str] = None,
+                                    antes: Optional[str] = None, ordem: str = "nome", direcao: str = "asc",
+                                    stream: bool = False):
     try:
-        usuarios = get_all_usuarios(db)
+        if stream:
+            flash = get_flash(request)
+            return template_stream_response(
+                templates,
+                "usuarios/lista.html",
+                {
+                    "request": request,
+                    "usuarios": iterar_usuarios(db, ordem, direcao == "desc"),
+                    "pagina": {"limite": limite, "proximo": None, "anterior": None},
+                    "ordem": ordem,
+                    "direcao": direcao,
+                    "stream": True,
+                    "messages": [flash] if flash else []
+                }
+            )
+
+        pagina = await run_db(listar_usuarios_paginado, db, limite, apos, antes, ordem, direcao == "desc")
         flash = get_flash(request)
         messages = [flash] if flash else []
-        return templates.TemplateResponse(
+        return pagina_condicional(
+            request,
+            templates,
             "usuarios/lista.html",
-            {"request": request, "usuarios": usuarios, "messages": messages}
+            {
+                "request": request,
+                "usuarios": pagina["itens"],
+                "pagina": pagina,
+                "ordem": ordem,
+                "direcao": direcao,
+                "limites": [10, 20, 50, LIMITE_MAXIMO],
+                "messages": messages
+            },
+            pagina["itens"], "data_atualizacao", pagina["anterior"], pagina["proximo"]
         )
     except Exception as e:
-        print(f"Erro ao listar usuários: {str(e)}")
+        logger.exception(f"Erro ao listar usuários: {str(e)}")
         return templates.TemplateResponse(
             "usuarios/lista.html",
-            {"request": request, "usuarios": [], "messages": [{"message": "Erro ao carregar usuários", "category": "danger"}]}
+            {
+                "request": request,
+                "usuarios": [],
+                "pagina": {"itens": [], "limite": limite, "proximo": None, "anterior": None},
+                "ordem": ordem,
+                "direcao": direcao,
+                "limites": [10, 20, 50, LIMITE_MAXIMO],
+                "messages": [{"message": "Erro ao carregar usuários", "category": "danger"}]
+            }
         )
 
 
+def exportar_usuarios(db: mysql.connector.MySQLConnection, formato: str = "csv", gzip: bool = False,
+                      ordem: str = "nome", direcao: str = "asc"):
+    try:
+        usuarios = iterar_usuarios(db, ordem, direcao == "desc", lote=1000)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    return resposta_exportacao(usuarios, ["id", "nome", "email"], "usuarios", formato, gzip)
+
 def form_cadastrar_usuario(request:Request):
     return templates.TemplateResponse(
         "usuarios/cadastro.html",
@@ -58,8 +105,8 @@ def form_cadastrar_usuario(request:Request):
 
 async def cadastrar_usuario(request:Request, nome , email,senha, db: mysql.connector.MySQLConnection = Depends(get_db)):
     try:
-        usuario_data = UsuarioCreate(nome=nome, email=email, senha=senha)
-        usuario_id = create_usuario(usuario_data, db)
+        usuario_data = UsuarioCreate(nome=nome, email=email, senha=await hash_senha(senha))
+        usuario_id = await run_db(create_usuario, usuario_data, db)
         
         if not usuario_id:
             raise ValueError("Não foi possível criar o usuário")
@@ -69,8 +116,10 @@ async def cadastrar_usuario(request:Request, nome , email,senha, db: mysql.conne
             url=request.url_for("listar_usuarios"),
             status_code=status.HTTP_303_SEE_OTHER
         )
-    except mysql.connector.Error as e:
-        print(e.errno, "aqui")
+    except FilaSenhasCheiaError as e:
+        raise HTTPException(status_code=503, detail=str(e))
+    except ErroBanco as e:
+        logger.error(f"Erro de banco ao cadastrar usuário: {str(e)}")
         return templates.TemplateResponse(
             "usuarios/cadastro.html",
             {
@@ -80,9 +129,7 @@ async def cadastrar_usuario(request:Request, nome , email,senha, db: mysql.conne
             }
         )
     except Exception as e:
-        print(f"Erro ao cadastrar usuário: {str(e)}")
-        print(e)
-        print("oi")
+        logger.exception(f"Erro ao cadastrar usuário: {str(e)}")
         return templates.TemplateResponse(
             "usuarios/cadastro.html",
             {
@@ -94,16 +141,21 @@ async def cadastrar_usuario(request:Request, nome , email,senha, db: mysql.conne
 
 async def obter_usuario(request:Request, id=int, db: mysql.connector.MySQLConnection = Depends(get_db)):
     try:
-        usuario = get_usuario_by_id(id, db)
+        usuario = await run_db(get_usuario_by_id, id, db)
         if not usuario:
             raise HTTPException(status_code=404, detail="Usuário não encontrado")
         
-        return templates.TemplateResponse(
+        flash = get_flash(request)
+        return pagina_condicional(
+            request,
+            templates,
             "usuarios/detalhes.html",
-            {"request": request, "usuario": usuario}
+            {"request": request, "usuario": usuario, "messages": [flash] if flash else []},
+            [usuario], "data_atualizacao",
+            ultima_modificacao=usuario["data_atualizacao"]
         )
     except Exception as e:
-        print(f"Erro ao obter usuário {id}: {str(e)}")
+        logger.exception(f"Erro ao obter usuário {id}: {str(e)}")
         raise HTTPException(
             status_code=500,
             detail="Erro ao carregar usuário"
@@ -111,7 +163,7 @@ async def obter_usuario(request:Request, id=int, db: mysql.connector.MySQLConnec
         
 async def form_editar_usuario(request:Request, id: int, db:mysql.connector.MySQLConnection = Depends(get_db)):
     try:
-        usuario = get_usuario_by_id(id, db)
+        usuario = await run_db(get_usuario_by_id, id, db)
         if not usuario:
             raise HTTPException(status_code=404, detail="Usuário não encontrado")
         
@@ -120,7 +172,7 @@ async def form_editar_usuario(request:Request, id: int, db:mysql.connector.MySQL
             {"request": request, "usuario": usuario, "errors": []}
         )
     except Exception as e:
-        print(f"Erro ao carregar formulário de edição para usuário {id}: {str(e)}")
+        logger.exception(f"Erro ao carregar formulário de edição para usuário {id}: {str(e)}")
         raise HTTPException(
             status_code=500,
             detail="Erro ao carregar formulário de edição"
@@ -128,40 +180,29 @@ async def form_editar_usuario(request:Request, id: int, db:mysql.connector.MySQL
 
 async def processar_edicao_usuario(request:Request, id:int, nome: str, email: str, senha: Optional[str], db: mysql.connector.MySQLConnection = Depends(get_db)):
     try:
-        usuario_atual = get_usuario_by_id(id, db)
-        
         update_data = {"nome": nome, "email": email}
         if senha and senha.strip():
-            update_data["senha"] = senha
+            update_data["senha"] = await hash_senha(senha)
         
-        rows_updated = update_usuario(id, update_data, db)
+        rows_updated = await run_db(update_usuario, id, update_data, db, obter_ip_origem(request))
         if rows_updated == 0:
             raise ValueError("Nenhum usuário foi atualizado")
         
-        registrar_log(
-            tipo_operacao="UPDATE",
-            tabela_afetada="usuarios",
-            id_registro=id,
-            dados_anteriores={
-                "nome": usuario_atual["nome"],
-                "email": usuario_atual["email"]
-            },
-            dados_novos=update_data,
-            request=request,
-            db=db
-        )
-        
+        if request.session.get("usuario_id") == id:
+            guardar_perfil(request, {"id": id, "nome": nome, "email": email})
         set_flash(request, "Usuário atualizado com sucesso!")
         return RedirectResponse(
             url=request.url_for("obter_usuario", id=id),
             status_code=status.HTTP_303_SEE_OTHER
         )
-    except mysql.connector.Error as e:
-        if e.errno == 1062: 
+    except FilaSenhasCheiaError as e:
+        raise HTTPException(status_code=503, detail=str(e))
+    except ErroBanco as e:
+        if e.errno == ER_DUP_ENTRY: 
             error_msg = "Este e-mail já está cadastrado"
         else:
             error_msg = f"Erro no banco de dados: {str(e)}"
-        usuario = get_usuario_by_id(id, db)
+        usuario = await run_db(get_usuario_by_id, id, db)
         return templates.TemplateResponse(
             "usuarios/editar.html",
             {
@@ -171,8 +212,8 @@ async def processar_edicao_usuario(request:Request, id:int, nome: str, email: st
             }
         )
     except Exception as e:
-        print(f"Erro ao editar usuário {id}: {str(e)}")
-        usuario = get_usuario_by_id(id, db)
+        logger.exception(f"Erro ao editar usuário {id}: {str(e)}")
+        usuario = await run_db(get_usuario_by_id, id, db)
         return templates.TemplateResponse(
             "usuarios/editar.html",
             {
@@ -184,31 +225,21 @@ async def processar_edicao_usuario(request:Request, id:int, nome: str, email: st
         
 async def deletar_usuario(request:Request, id:int, db:mysql.connector.MySQLConnection = Depends(get_db)):
     try:
-        usuario = get_usuario_by_id(id, db)
-        
-        affected_rows = delete_usuario(id, db)
+        affected_rows = await run_db(delete_usuario, id, db, obter_ip_origem(request))
         if affected_rows == 0:
             raise HTTPException(status_code=404, detail="Usuário não encontrado")
         
-        registrar_log(
-            tipo_operacao="DELETE",
-            tabela_afetada="usuarios",
-            id_registro=id,
-            dados_anteriores={
-                "nome": usuario["nome"],
-                "email": usuario["email"]
-            },
-            request=request,
-            db=db
-        )
-        
+        if request.session.get("usuario_id") == id:
+            request.session.clear()
         set_flash(request, "Usuário excluído com sucesso!")
         return RedirectResponse(
             url=request.url_for("listar_usuarios"),
             status_code=status.HTTP_303_SEE_OTHER
         )
+    except HTTPException:
+        raise
     except Exception as e:
-        print(f"Erro ao deletar usuário {id}: {str(e)}")
+        logger.exception(f"Erro ao deletar usuário {id}: {str(e)}")
         raise HTTPException(
             status_code=500,
             detail="Erro ao deletar usuário"
@@ -1,11 +1,24 @@
+import logging
 import os
+import secrets
 from dotenv import load_dotenv
 
 load_dotenv()
 
+logger = logging.getLogger(__name__)
+
 
 def get_db_config():
+    backend = os.getenv('DB_BACKEND', 'mysql').lower()
+    if backend == 'sqlite':
+        return {
+            'backend': 'sqlite',
+            'caminho': os.getenv('DB_SQLITE_CAMINHO', 'dados.sqlite3')
+        }
+    if backend != 'mysql':
+        raise ValueError("DB_BACKEND deve ser mysql ou sqlite")
     config = {
+        'backend': 'mysql',
         'host': os.getenv('DB_HOST', 'localhost'),
         'user': os.getenv('DB_USER'),
         'password': os.getenv('DB_PASSWORD'),
@@ -16,3 +29,227 @@ def get_db_config():
         raise ValueError(
             "Variáveis de ambiente do banco de dados não configuradas corretamente")
     return config
+
+
+def get_pool_config():
+    config = {
+        'tamanho': int(os.getenv('DB_POOL_SIZE', '5')),
+        'max_overflow': int(os.getenv('DB_POOL_MAX_OVERFLOW', '10')),
+        'timeout': float(os.getenv('DB_POOL_TIMEOUT', '30')),
+        'validar_apos': float(os.getenv('DB_POOL_VALIDAR_APOS', '30')),
+        'max_preparadas': int(os.getenv('DB_MAX_PREPARADAS', '64'))
+    }
+    if (config['tamanho'] < 1 or config['max_overflow'] < 0 or config['timeout'] <= 0
+            or config['max_preparadas'] < 0):
+        raise ValueError(
+            "Configuração do pool de conexões inválida")
+    return config
+
+
+def get_migracao_config():
+    return {
+        'na_inicializacao': os.getenv('DB_MIGRAR_NA_INICIALIZACAO', 'true').lower() in ('1', 'true', 'sim'),
+        'lock_timeout': int(os.getenv('DB_MIGRACAO_LOCK_TIMEOUT', '60'))
+    }
+
+
+def get_executor_config():
+    pool = get_pool_config()
+    padrao = pool['tamanho'] + pool['max_overflow']
+    workers = int(os.getenv('DB_EXECUTOR_WORKERS', str(padrao)))
+    if workers < 1:
+        raise ValueError("DB_EXECUTOR_WORKERS deve ser maior que zero")
+    return {'max_workers': workers}
+
+
+def get_auditoria_config():
+    config = {
+        'assincrono': os.getenv('AUDIT_ASSINCRONO', 'true').lower() in ('1', 'true', 'sim'),
+        'tamanho_fila': int(os.getenv('AUDIT_FILA_TAMANHO', '10000')),
+        'tamanho_lote': int(os.getenv('AUDIT_LOTE', '200')),
+        'intervalo': float(os.getenv('AUDIT_INTERVALO', '1.0')),
+        'politica': os.getenv('AUDIT_POLITICA', 'block').lower(),
+        'timeout_bloqueio': float(os.getenv('AUDIT_BLOQUEIO_TIMEOUT', '0.5')),
+        'arquivo_spill': os.getenv('AUDIT_ARQUIVO_SPILL', 'audit_spill.ndjson')
+    }
+    if config['politica'] not in ('block', 'drop', 'spill'):
+        raise ValueError("AUDIT_POLITICA deve ser block, drop ou spill")
+    if config['tamanho_fila'] < 1 or config['tamanho_lote'] < 1:
+        raise ValueError("Configuração da fila de auditoria inválida")
+    return config
+
+
+def get_retencao_config():
+    config = {
+        'ativa': os.getenv('LOG_RETENCAO_ATIVA', 'true').lower() in ('1', 'true', 'sim'),
+        'meses': int(os.getenv('LOG_RETENCAO_MESES', '12')),
+        'particoes_adiante': int(os.getenv('LOG_PARTICOES_ADIANTE', '3')),
+        'diretorio_arquivo': os.getenv('LOG_ARQUIVO_DIR', 'arquivo_logs'),
+        'intervalo': float(os.getenv('LOG_RETENCAO_INTERVALO', '86400'))
+    }
+    if config['meses'] < 1 or config['particoes_adiante'] < 1:
+        raise ValueError("Configuração de retenção de logs inválida")
+    return config
+
+
+def get_cache_config():
+    config = {
+        'backend': os.getenv('CACHE_BACKEND', 'memoria').lower(),
+        'max_itens': int(os.getenv('CACHE_MAX_ITENS', '10000')),
+        'ttl': float(os.getenv('CACHE_TTL', '60')),
+        'redis_url': os.getenv('CACHE_REDIS_URL', 'redis://localhost:6379/0')
+    }
+    if config['backend'] not in ('memoria', 'redis', 'desativado'):
+        raise ValueError("CACHE_BACKEND deve ser memoria, redis ou desativado")
+    return config
+
+
+def get_cache_http_config():
+    config = {
+        'ativo': os.getenv('CACHE_HTTP_ATIVO', 'true').lower() in ('1', 'true', 'sim'),
+        'fragmentos': os.getenv('CACHE_FRAGMENTOS_ATIVO', 'false').lower() in ('1', 'true', 'sim'),
+        'fragmentos_max_itens': int(os.getenv('CACHE_FRAGMENTOS_MAX_ITENS', '1000')),
+        'fragmentos_ttl': float(os.getenv('CACHE_FRAGMENTOS_TTL', '300'))
+    }
+    if config['fragmentos_max_itens'] < 1 or config['fragmentos_ttl'] <= 0:
+        raise ValueError("Configuração do cache de fragmentos inválida")
+    return config
+
+
+def get_busca_config():
+    config = {
+        'backend': os.getenv('BUSCA_BACKEND', 'mysql').lower(),
+        'lote_carga': int(os.getenv('BUSCA_LOTE_CARGA', '5000'))
+    }
+    if config['backend'] not in ('mysql', 'memoria'):
+        raise ValueError("BUSCA_BACKEND deve ser mysql ou memoria")
+    return config
+
+
+def get_importacao_config():
+    config = {
+        'tamanho_lote': int(os.getenv('IMPORTACAO_TAMANHO_LOTE', '1000'))
+    }
+    if config['tamanho_lote'] < 1:
+        raise ValueError("IMPORTACAO_TAMANHO_LOTE deve ser maior que zero")
+    return config
+
+
+def get_senha_config():
+    config = {
+        'custo': int(os.getenv('BCRYPT_CUSTO', '12')),
+        'tipo_pool': os.getenv('SENHA_POOL', 'thread').lower(),
+        'max_workers': int(os.getenv('SENHA_WORKERS', str(min(4, os.cpu_count() or 1)))),
+        'max_pendentes': int(os.getenv('SENHA_MAX_PENDENTES', '64'))
+    }
+    if not 4 <= config['custo'] <= 31:
+        raise ValueError("BCRYPT_CUSTO deve estar entre 4 e 31")
+    if config['tipo_pool'] not in ('thread', 'processo'):
+        raise ValueError("SENHA_POOL deve ser thread ou processo")
+    if config['max_workers'] < 1 or config['max_pendentes'] < 1:
+        raise ValueError("Configuração do pool de senhas inválida")
+    return config
+
+
+_chave_sessao_gerada = None
+
+
+def _chave_sessao(backend):
+    """`SESSAO_CHAVE_SECRETA` ou, sem ela, uma chave aleatória do processo.
+
+    A chave gerada só serve ao backend `memoria`, cujas sessões já são do
+    próprio processo e se perdem ao reiniciar; com `redis` os workers
+    precisam da mesma chave e ela é obrigatória.
+    """
+    global _chave_sessao_gerada
+    chave = os.getenv('SESSAO_CHAVE_SECRETA', '')
+    if chave:
+        return chave
+    if backend == 'redis':
+        raise ValueError("SESSAO_CHAVE_SECRETA é obrigatória com SESSAO_BACKEND=redis")
+    if _chave_sessao_gerada is None:
+        _chave_sessao_gerada = secrets.token_urlsafe(32)
+        logger.warning("SESSAO_CHAVE_SECRETA não definida; usando uma chave aleatória deste processo")
+    return _chave_sessao_gerada
+
+
+def get_sessao_config():
+    backend = os.getenv('SESSAO_BACKEND', 'memoria').lower()
+    config = {
+        'chave_secreta': _chave_sessao(backend),
+        'backend': backend,
+        'max_sessoes': int(os.getenv('SESSAO_MAX_SESSOES', '10000')),
+        'ttl': float(os.getenv('SESSAO_TTL', '1800')),
+        'redis_url': os.getenv('SESSAO_REDIS_URL', 'redis://localhost:6379/1'),
+        'nome_cookie': os.getenv('SESSAO_COOKIE', 'sessao'),
+        'cookie_seguro': os.getenv('SESSAO_COOKIE_SEGURO', 'false').lower() in ('1', 'true', 'sim'),
+        'perfil_ttl': float(os.getenv('SESSAO_PERFIL_TTL', '300'))
+    }
+    if config['backend'] not in ('memoria', 'redis'):
+        raise ValueError("SESSAO_BACKEND deve ser memoria ou redis")
+    return config
+
+
+def get_login_config():
+    config = {
+        'max_tentativas': int(os.getenv('LOGIN_MAX_TENTATIVAS', '5')),
+        'janela': float(os.getenv('LOGIN_JANELA', '900')),
+        'max_chaves': int(os.getenv('LOGIN_MAX_CHAVES', '100000'))
+    }
+    if config['max_tentativas'] < 0 or config['janela'] <= 0 or config['max_chaves'] < 1:
+        raise ValueError("Configuração do limite de tentativas de login inválida")
+    return config
+
+
+def get_metricas_config():
+    return {
+        'ativas': os.getenv('METRICAS_ATIVAS', 'true').lower() in ('1', 'true', 'sim')
+    }
+
+
+def get_consultas_lentas_config():
+    config = {
+        'ativas': os.getenv('CONSULTAS_LENTAS_ATIVAS', 'true').lower() in ('1', 'true', 'sim'),
+        'limite_ms': float(os.getenv('CONSULTAS_LENTAS_LIMITE_MS', '200')),
+        'arquivo': os.getenv('CONSULTAS_LENTAS_ARQUIVO', 'consultas_lentas.ndjson'),
+        'tamanho_max_mb': float(os.getenv('CONSULTAS_LENTAS_TAMANHO_MB', '10')),
+        'arquivos_backup': int(os.getenv('CONSULTAS_LENTAS_BACKUPS', '5')),
+        'explain': os.getenv('CONSULTAS_LENTAS_EXPLAIN', 'true').lower() in ('1', 'true', 'sim'),
+        'max_consultas': int(os.getenv('CONSULTAS_LENTAS_MAX', '500'))
+    }
+    if config['limite_ms'] < 0 or config['tamanho_max_mb'] <= 0 or config['max_consultas'] < 1:
+        raise ValueError("Configuração do log de consultas lentas inválida")
+    return config
+
+
+def get_diagnostico_config():
+    return {
+        'emails': {email.strip().lower() for email in os.getenv('DIAGNOSTICO_EMAILS', '').split(',')
+                   if email.strip()}
+    }
+
+
+def get_compressao_config():
+    config = {
+        'ativa': os.getenv('COMPRESSAO_ATIVA', 'true').lower() in ('1', 'true', 'sim'),
+        'minimo_bytes': int(os.getenv('COMPRESSAO_MINIMO_BYTES', '1024')),
+        'nivel_gzip': int(os.getenv('COMPRESSAO_NIVEL_GZIP', '6')),
+        'nivel_brotli': int(os.getenv('COMPRESSAO_NIVEL_BROTLI', '4'))
+    }
+    if config['minimo_bytes'] < 0 or not 1 <= config['nivel_gzip'] <= 9 or not 0 <= config['nivel_brotli'] <= 11:
+        raise ValueError("Configuração de compressão inválida")
+    return config
+
+
+def get_estaticos_config():
+    return {
+        'gerar_na_inicializacao': os.getenv('ESTATICOS_GERAR_NA_INICIALIZACAO', 'true').lower() in ('1', 'true', 'sim')
+    }
+
+
+def get_templates_config():
+    return {
+        'auto_reload': os.getenv('TEMPLATES_AUTO_RELOAD', 'false').lower() in ('1', 'true', 'sim'),
+        'bytecode_cache': os.getenv('TEMPLATES_BYTECODE_CACHE', '.cache_templates'),
+        'precompilar': os.getenv('TEMPLATES_PRECOMPILAR', 'true').lower() in ('1', 'true', 'sim')
+    }
@@ -0,0 +1,372 @@
+"""Migrações versionadas do schema.
+
+Executadas uma única vez na inicialização da aplicação (ou manualmente com
+`python -m database.migrations`). As versões aplicadas ficam registradas na
+tabela `schema_migrations`; o caminho das requisições não executa DDL.
+
+No MySQL cada DDL faz commit implícito: se uma versão falhar no meio, os
+comandos já executados ficam valendo sem a versão ser registrada. Por isso,
+antes de cada comando que não pode ser repetido (`CREATE INDEX`, `DROP INDEX`,
+troca da chave primária, `PARTITION BY`), `_ja_aplicado` consulta o
+`information_schema` e pula o que já está no schema; os demais são
+idempotentes por si (`CREATE TABLE IF NOT EXISTS`, `MODIFY`). Rodar de novo
+retoma a versão de onde parou.
+
+Com `DB_BACKEND=sqlite` vale `MIGRACOES_SQLITE`, com as mesmas versões
+traduzidas para o SQLite: partições não existem, a busca usa uma tabela FTS5
+e as datas de atualização são mantidas por triggers.
+"""
+import re
+import sqlite3
+import sys
+
+import mysql.connector
+from database.config import get_db_config, get_migracao_config, get_retencao_config
+from models.banco_sqlite import FORMATO_AGORA
+
+
+MIGRACOES = [
+    (1, "cria tabela produtos", [
+        """
+        CREATE TABLE IF NOT EXISTS produtos (
+            id INT AUTO_INCREMENT PRIMARY KEY,
+            nome VARCHAR(100) NOT NULL,
+            descricao TEXT,
+            preco DECIMAL(10, 2) NOT NULL,
+            estoque INT NOT NULL,
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP
+        )
+        """,
+    ]),
+    (2, "cria tabela usuarios", [
+        """
+        CREATE TABLE IF NOT EXISTS usuarios (
+            id INT AUTO_INCREMENT PRIMARY KEY,
+            nome VARCHAR(50) NOT NULL,
+            email VARCHAR(100) UNIQUE NOT NULL,
+            senha VARCHAR(255) NOT NULL,
+            data_criacao TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            data_atualizacao TIMESTAMP DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP
+        )
+        """,
+    ]),
+    (3, "cria tabela logs", [
+        """
+        CREATE TABLE IF NOT EXISTS logs (
+            id INT AUTO_INCREMENT PRIMARY KEY,
+            tipo_operacao VARCHAR(20) NOT NULL,
+            tabela_afetada VARCHAR(50) NOT NULL,
+            id_registro INT NULL,
+            dados_anteriores TEXT,
+            dados_novos TEXT,
+            id_usuario INT NULL,
+            ip_origem VARCHAR(45) NULL,
+            data_operacao TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        )
+        """,
+        "CREATE INDEX idx_logs_data_operacao ON logs (data_operacao)",
+        "CREATE INDEX idx_logs_tabela_registro ON logs (tabela_afetada, id_registro)",
+    ]),
+    (4, "índices de ordenação para paginação por chave", [
+        "CREATE INDEX idx_produtos_nome_id ON produtos (nome, id)",
+        "CREATE INDEX idx_produtos_preco_id ON produtos (preco, id)",
+        "CREATE INDEX idx_produtos_estoque_id ON produtos (estoque, id)",
+        "CREATE INDEX idx_usuarios_nome_id ON usuarios (nome, id)",
+    ]),
+    (5, "índices compostos para consulta de logs", [
+        "CREATE INDEX idx_logs_data_id ON logs (data_operacao, id)",
+        "CREATE INDEX idx_logs_tabela_data ON logs (tabela_afetada, data_operacao, id)",
+        "CREATE INDEX idx_logs_registro_data ON logs (tabela_afetada, id_registro, data_operacao, id)",
+        "CREATE INDEX idx_logs_tipo_data ON logs (tipo_operacao, data_operacao, id)",
+        "CREATE INDEX idx_logs_usuario_data ON logs (id_usuario, data_operacao, id)",
+        "CREATE INDEX idx_logs_ip_data ON logs (ip_origem, data_operacao, id)",
+        "DROP INDEX idx_logs_data_operacao ON logs",
+        "DROP INDEX idx_logs_tabela_registro ON logs",
+    ]),
+    (6, "particiona logs por mês em data_operacao", [
+        "ALTER TABLE logs MODIFY data_operacao TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP",
+        "ALTER TABLE logs DROP PRIMARY KEY, ADD PRIMARY KEY (id, data_operacao)",
+        "ALTER TABLE logs PARTITION BY RANGE (UNIX_TIMESTAMP(data_operacao)) "
+        "(PARTITION pmax VALUES LESS THAN MAXVALUE)",
+        lambda conn: _particionar_logs(conn),
+    ]),
+    (7, "índice FULLTEXT para busca de produtos", [
+        "CREATE FULLTEXT INDEX ft_produtos_nome_descricao ON produtos (nome, descricao)",
+    ]),
+    (8, "data de atualização com microssegundos para ETag da API", [
+        "ALTER TABLE produtos MODIFY updated_at TIMESTAMP(6) "
+        "DEFAULT CURRENT_TIMESTAMP(6) ON UPDATE CURRENT_TIMESTAMP(6)",
+        "ALTER TABLE usuarios MODIFY data_atualizacao TIMESTAMP(6) "
+        "DEFAULT CURRENT_TIMESTAMP(6) ON UPDATE CURRENT_TIMESTAMP(6)",
+    ]),
+]
+
+
+MIGRACOES_SQLITE = [
+    (1, "cria tabela produtos", [
+        f"""
+        CREATE TABLE IF NOT EXISTS produtos (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            nome VARCHAR(100) NOT NULL,
+            descricao TEXT,
+            preco DECIMAL(10, 2) NOT NULL,
+            estoque INT NOT NULL,
+            created_at TIMESTAMP DEFAULT ({FORMATO_AGORA}),
+            updated_at TIMESTAMP DEFAULT ({FORMATO_AGORA})
+        )
+        """,
+        f"""
+        CREATE TRIGGER produtos_updated_at AFTER UPDATE ON produtos
+        FOR EACH ROW WHEN NEW.updated_at IS OLD.updated_at BEGIN
+            UPDATE produtos SET updated_at = {FORMATO_AGORA} WHERE id = NEW.id;
+        END
+        """,
+    ]),
+    (2, "cria tabela usuarios", [
+        f"""
+        CREATE TABLE IF NOT EXISTS usuarios (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            nome VARCHAR(50) NOT NULL,
+            email VARCHAR(100) UNIQUE NOT NULL COLLATE NOCASE,
+            senha VARCHAR(255) NOT NULL,
+            data_criacao TIMESTAMP DEFAULT ({FORMATO_AGORA}),
+            data_atualizacao TIMESTAMP DEFAULT ({FORMATO_AGORA})
+        )
+        """,
+        f"""
+        CREATE TRIGGER usuarios_data_atualizacao AFTER UPDATE ON usuarios
+        FOR EACH ROW WHEN NEW.data_atualizacao IS OLD.data_atualizacao BEGIN
+            UPDATE usuarios SET data_atualizacao = {FORMATO_AGORA} WHERE id = NEW.id;
+        END
+        """,
+    ]),
+    (3, "cria tabela logs", [
+        f"""
+        CREATE TABLE IF NOT EXISTS logs (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            tipo_operacao VARCHAR(20) NOT NULL,
+            tabela_afetada VARCHAR(50) NOT NULL,
+            id_registro INT NULL,
+            dados_anteriores TEXT,
+            dados_novos TEXT,
+            id_usuario INT NULL,
+            ip_origem VARCHAR(45) NULL,
+            data_operacao TIMESTAMP NOT NULL DEFAULT ({FORMATO_AGORA})
+        )
+        """,
+        "CREATE INDEX idx_logs_data_operacao ON logs (data_operacao)",
+        "CREATE INDEX idx_logs_tabela_registro ON logs (tabela_afetada, id_registro)",
+    ]),
+    (4, "índices de ordenação para paginação por chave", MIGRACOES[3][2]),
+    (5, "índices compostos para consulta de logs", [
+        *MIGRACOES[4][2][:6],
+        "DROP INDEX idx_logs_data_operacao",
+        "DROP INDEX idx_logs_tabela_registro",
+    ]),
+    # A retenção arquiva e remove os meses expirados com DELETE por intervalo
+    (6, "particiona logs por mês em data_operacao", []),
+    (7, "índice FULLTEXT para busca de produtos", [
+        """
+        CREATE VIRTUAL TABLE produtos_fts USING fts5(
+            nome, descricao, content='produtos', content_rowid='id',
+            tokenize='unicode61 remove_diacritics 2'
+        )
+        """,
+        """
+        CREATE TRIGGER produtos_fts_insert AFTER INSERT ON produtos BEGIN
+            INSERT INTO produtos_fts (rowid, nome, descricao) VALUES (NEW.id, NEW.nome, NEW.descricao);
+        END
+        """,
+        """
+        CREATE TRIGGER produtos_fts_delete AFTER DELETE ON produtos BEGIN
+            INSERT INTO produtos_fts (produtos_fts, rowid, nome, descricao)
+            VALUES ('delete', OLD.id, OLD.nome, OLD.descricao);
+        END
+        """,
+        """
+        CREATE TRIGGER produtos_fts_update AFTER UPDATE OF nome, descricao ON produtos BEGIN
+            INSERT INTO produtos_fts (produtos_fts, rowid, nome, descricao)
+            VALUES ('delete', OLD.id, OLD.nome, OLD.descricao);
+            INSERT INTO produtos_fts (rowid, nome, descricao) VALUES (NEW.id, NEW.nome, NEW.descricao);
+        END
+        """,
+        "INSERT INTO produtos_fts (produtos_fts) VALUES ('rebuild')",
+    ]),
+    # As datas já são gravadas com microssegundos desde a versão 1
+    (8, "data de atualização com microssegundos para ETag da API", []),
+]
+
+
+_RE_CRIAR_INDICE = re.compile(r"^CREATE\s+(?:FULLTEXT\s+|UNIQUE\s+)?INDEX\s+(\w+)\s+ON\s+(\w+)", re.I)
+_RE_REMOVER_INDICE = re.compile(r"^DROP\s+INDEX\s+(\w+)\s+ON\s+(\w+)", re.I)
+_RE_TROCAR_PK = re.compile(r"^ALTER\s+TABLE\s+(\w+)\s+DROP\s+PRIMARY\s+KEY,\s*ADD\s+PRIMARY\s+KEY\s*\(([^)]*)\)", re.I)
+_RE_PARTICIONAR = re.compile(r"^ALTER\s+TABLE\s+(\w+)\s+PARTITION\s+BY\b", re.I)
+
+
+def _colunas_do_indice(cursor, tabela, indice):
+    cursor.execute("""
+        SELECT COLUMN_NAME FROM information_schema.STATISTICS
+        WHERE TABLE_SCHEMA = DATABASE() AND TABLE_NAME = %s AND INDEX_NAME = %s
+        ORDER BY SEQ_IN_INDEX
+    """, (tabela, indice))
+    return [row[0] for row in cursor.fetchall()]
+
+
+def _ja_aplicado(cursor, comando):
+    """Se o efeito de `comando` já está no schema (MySQL)."""
+    comando = comando.strip()
+    encontrado = _RE_CRIAR_INDICE.match(comando)
+    if encontrado:
+        return bool(_colunas_do_indice(cursor, encontrado.group(2), encontrado.group(1)))
+    encontrado = _RE_REMOVER_INDICE.match(comando)
+    if encontrado:
+        return not _colunas_do_indice(cursor, encontrado.group(2), encontrado.group(1))
+    encontrado = _RE_TROCAR_PK.match(comando)
+    if encontrado:
+        colunas = [coluna.strip() for coluna in encontrado.group(2).split(",")]
+        return _colunas_do_indice(cursor, encontrado.group(1), "PRIMARY") == colunas
+    encontrado = _RE_PARTICIONAR.match(comando)
+    if encontrado:
+        cursor.execute("""
+            SELECT COUNT(*) FROM information_schema.PARTITIONS
+            WHERE TABLE_SCHEMA = DATABASE() AND TABLE_NAME = %s AND PARTITION_NAME IS NOT NULL
+        """, (encontrado.group(1),))
+        return cursor.fetchone()[0] > 0
+    return False
+
+
+def _particionar_logs(conn):
+    from models.log_retencao import garantir_particoes
+    garantir_particoes(conn, get_retencao_config()['particoes_adiante'])
+
+
+def _conectar_servidor(config):
+    return mysql.connector.connect(
+        host=config['host'],
+        user=config['user'],
+        password=config['password'],
+        port=config['port']
+    )
+
+
+def _versoes_aplicadas(cursor):
+    cursor.execute("""
+    CREATE TABLE IF NOT EXISTS schema_migrations (
+        versao INT PRIMARY KEY,
+        descricao VARCHAR(255) NOT NULL,
+        aplicada_em TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+    )
+    """)
+    cursor.execute("SELECT versao FROM schema_migrations")
+    return {row[0] for row in cursor.fetchall()}
+
+
+def _conectar_sqlite(config, timeout):
+    conn = sqlite3.connect(config['caminho'], timeout=timeout, isolation_level=None)
+    conn.execute("PRAGMA journal_mode=WAL")
+    return conn
+
+
+def _aplicar_migracoes_sqlite(config, lock_timeout):
+    # BEGIN IMMEDIATE reserva o arquivo para escrita: os demais workers
+    # esperam e, em seguida, encontram as versões já registradas. DDL no
+    # SQLite é transacional, então as migrações pendentes entram juntas.
+    conn = _conectar_sqlite(config, lock_timeout)
+    try:
+        cursor = conn.cursor()
+        cursor.execute("BEGIN IMMEDIATE")
+        try:
+            aplicadas = _versoes_aplicadas(cursor)
+            novas = []
+            for versao, descricao, comandos in MIGRACOES_SQLITE:
+                if versao in aplicadas:
+                    continue
+                for comando in comandos:
+                    cursor.execute(comando)
+                cursor.execute(
+                    "INSERT INTO schema_migrations (versao, descricao) VALUES (?, ?)",
+                    (versao, descricao)
+                )
+                novas.append(versao)
+            cursor.execute("COMMIT")
+            return novas
+        except Exception:
+            cursor.execute("ROLLBACK")
+            raise
+    finally:
+        conn.close()
+
+
+def aplicar_migracoes(config=None):
+    """Aplica as migrações pendentes e retorna as versões aplicadas agora.
+
+    Um lock nomeado (`GET_LOCK`) impede que vários workers iniciando ao mesmo
+    tempo apliquem a mesma migração em paralelo.
+    """
+    config = config or get_db_config()
+    lock_timeout = get_migracao_config()['lock_timeout']
+    if config.get('backend') == 'sqlite':
+        return _aplicar_migracoes_sqlite(config, lock_timeout)
+    conn = _conectar_servidor(config)
+    try:
+        cursor = conn.cursor()
+        cursor.execute(f"CREATE DATABASE IF NOT EXISTS `{config['database']}`")
+        cursor.execute(f"USE `{config['database']}`")
+
+        cursor.execute("SELECT GET_LOCK('schema_migrations', %s)", (lock_timeout,))
+        if cursor.fetchone()[0] != 1:
+            raise RuntimeError("Não foi possível obter o lock de migrações")
+        try:
+            aplicadas = _versoes_aplicadas(cursor)
+            novas = []
+            for versao, descricao, comandos in MIGRACOES:
+                if versao in aplicadas:
+                    continue
+                for comando in comandos:
+                    # Migrações que dependem do estado do banco usam funções
+                    if callable(comando):
+                        comando(conn)
+                    elif not _ja_aplicado(cursor, comando):
+                        cursor.execute(comando)
+                cursor.execute(
+                    "INSERT INTO schema_migrations (versao, descricao) VALUES (%s, %s)",
+                    (versao, descricao)
+                )
+                conn.commit()
+                novas.append(versao)
+            return novas
+        finally:
+            cursor.execute("SELECT RELEASE_LOCK('schema_migrations')")
+            cursor.fetchall()
+            cursor.close()
+    finally:
+        conn.close()
+
+
+def status_migracoes(config=None):
+    config = config or get_db_config()
+    if config.get('backend') == 'sqlite':
+        conn, migracoes = _conectar_sqlite(config, get_migracao_config()['lock_timeout']), MIGRACOES_SQLITE
+    else:
+        conexao = {chave: valor for chave, valor in config.items() if chave != 'backend'}
+        conn, migracoes = mysql.connector.connect(**conexao), MIGRACOES
+    try:
+        cursor = conn.cursor()
+        aplicadas = _versoes_aplicadas(cursor)
+        cursor.close()
+        return [(versao, descricao, versao in aplicadas) for versao, descricao, _ in migracoes]
+    finally:
+        conn.close()
+
+
+if __name__ == "__main__":
+    if "--status" in sys.argv:
+        for versao, descricao, aplicada in status_migracoes():
+            print(f"{versao:>4}  {'aplicada' if aplicada else 'pendente':<9} {descricao}")
+    else:
+        novas = aplicar_migracoes()
+        if novas:
+            print(f"Migrações aplicadas: {', '.join(map(str, novas))}")
+        else:
+            print("Schema já está atualizado")
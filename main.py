@@ -1,21 +1,94 @@
 from fastapi import FastAPI
 from fastapi.responses import HTMLResponse
-from fastapi.staticfiles import StaticFiles
-from fastapi.templating import Jinja2Templates
 from starlette.requests import Request
-from starlette.middleware.sessions import SessionMiddleware
 import uvicorn
 from routes.produtos_routes import router as produto_router
 from routes.usuario_routes import router as usuario_router
+from routes.log_routes import router as log_router
+from routes.diagnostico_routes import router as diagnostico_router
+from routes.api_routes import router as api_router
+from routes.auth_routes import router as auth_router
+from routes.metricas_routes import router as metricas_router
+from models.database import init_pool, close_pool, init_executor, close_executor
+from database.config import (get_migracao_config, get_sessao_config, get_metricas_config,
+                             get_consultas_lentas_config, get_compressao_config, get_estaticos_config,
+                             get_templates_config)
+from database.migrations import aplicar_migracoes
+from models.log_writer import iniciar_auditoria, encerrar_auditoria
+from models.log_retencao import iniciar_retencao, encerrar_retencao
+from models.indice_busca import iniciar_indice
+from models.senha import init_senhas, close_senhas
+from models.sessao import SessaoMiddleware
+from models.metricas import MetricasMiddleware, iniciar_metricas
+from controllers.templates import templates, precompilar_templates
+from models.estaticos import ArquivosEstaticos, gerar_estaticos
+from models.consultas_lentas import RotaAtualMiddleware
+from models.compressao import CompressaoMiddleware
 
 app = FastAPI(title="Sistema de Gerenciamento")
+sessao_config = get_sessao_config()
+app.add_middleware(
+    SessaoMiddleware,
+    chave_secreta=sessao_config['chave_secreta'],
+    nome_cookie=sessao_config['nome_cookie'],
+    https_only=sessao_config['cookie_seguro'],
+)
+if get_consultas_lentas_config()['ativas']:
+    app.add_middleware(RotaAtualMiddleware)
+compressao_config = get_compressao_config()
+if compressao_config['ativa']:
+    app.add_middleware(
+        CompressaoMiddleware,
+        minimo_bytes=compressao_config['minimo_bytes'],
+        nivel_gzip=compressao_config['nivel_gzip'],
+        nivel_brotli=compressao_config['nivel_brotli'],
+    )
+if get_metricas_config()['ativas']:
+    # Adicionado por último para ficar por fora e medir também a sessão
+    app.add_middleware(MetricasMiddleware)
 
 
-app.mount("/static", StaticFiles(directory="static"), name="static")
-templates = Jinja2Templates(directory="templates")
+app.mount("/static", ArquivosEstaticos(directory="static"), name="static")
 
 app.include_router(produto_router, prefix="/produtos") 
 app.include_router(usuario_router) 
+app.include_router(log_router)
+app.include_router(diagnostico_router)
+app.include_router(api_router)
+app.include_router(auth_router)
+if get_metricas_config()['ativas']:
+    app.include_router(metricas_router)
+
+
+@app.on_event("startup")
+def iniciar_banco():
+    if get_migracao_config()['na_inicializacao']:
+        try:
+            aplicar_migracoes()
+        except Exception as e:
+            print(f"Erro ao configurar banco de dados:  {e}")
+            raise
+    if get_estaticos_config()['gerar_na_inicializacao']:
+        gerar_estaticos()
+    if get_templates_config()['precompilar']:
+        precompilar_templates()
+    iniciar_metricas()
+    init_pool()
+    init_executor()
+    init_senhas()
+    iniciar_auditoria()
+    iniciar_retencao()
+    iniciar_indice()
+
+
+@app.on_event("shutdown")
+def encerrar_banco():
+    encerrar_retencao()
+    encerrar_auditoria()
+    close_senhas()
+    close_executor()
+    close_pool()
+
 
 @app.get("/", response_class=HTMLResponse)
 async def home(request: Request):
@@ -0,0 +1,296 @@
+"""Backend SQLite embarcado, para implantações pequenas sem servidor MySQL.
+
+O banco é um arquivo local em modo WAL, em que leitores não bloqueiam o
+escritor nem uns aos outros. `PoolSQLite` mantém conexões somente leitura,
+com as mesmas regras de tamanho e overflow do `ConnectionPool`, e uma única
+conexão de escrita protegida por um lock.
+
+`ConexaoSQLite` oferece aos models a mesma interface da conexão do
+`mysql.connector` (`cursor(dictionary=True)`, marcadores `%s`, `commit`,
+`rollback`, `lastrowid`). As leituras usam a conexão de leitura emprestada;
+na primeira escrita, ou em um `SELECT ... FOR UPDATE`, a conexão assume o
+escritor com `BEGIN IMMEDIATE` e o mantém até o commit ou rollback, de modo
+que a transação lê as próprias escritas e as demais esperam a vez.
+"""
+import re
+import sqlite3
+import threading
+import time
+from contextlib import contextmanager
+from datetime import datetime
+from decimal import Decimal
+from functools import lru_cache
+
+from mysql.connector.errors import PoolError
+from models.database import ConnectionPool, ER_DUP_ENTRY
+
+# Datas sempre com microssegundos: o texto gravado é comparável com os
+# valores dos cursores de paginação (ver `models.paginacao`).
+FORMATO_AGORA = "strftime('%Y-%m-%d %H:%M:%f000', 'now', 'localtime')"
+
+_RE_FOR_UPDATE = re.compile(r"\s+FOR\s+UPDATE\s*$", re.IGNORECASE)
+_LEITURAS = ("SELECT", "WITH", "EXPLAIN")
+
+sqlite3.register_adapter(datetime, lambda valor: valor.isoformat(" ", "microseconds"))
+sqlite3.register_adapter(Decimal, str)
+sqlite3.register_converter("TIMESTAMP", lambda valor: datetime.fromisoformat(valor.decode()))
+sqlite3.register_converter("DECIMAL", lambda valor: Decimal(valor.decode()))
+
+
+class ErroSQLite(sqlite3.Error):
+    """Erro do SQLite com `errno` e `msg`, como o `mysql.connector.Error`."""
+
+    def __init__(self, msg, errno=None):
+        super().__init__(msg)
+        self.msg = msg
+        self.errno = errno
+
+
+@contextmanager
+def _traduzindo_erros():
+    try:
+        yield
+    except ErroSQLite:
+        raise
+    except sqlite3.IntegrityError as e:
+        errno = ER_DUP_ENTRY if "UNIQUE" in str(e) else getattr(e, "sqlite_errorcode", None)
+        raise ErroSQLite(str(e), errno) from e
+    except sqlite3.Error as e:
+        raise ErroSQLite(str(e), getattr(e, "sqlite_errorcode", None)) from e
+
+
+@lru_cache(maxsize=512)
+def traduzir_sql(sql):
+    """Converte o SQL dos models e informa se ele precisa do escritor."""
+    sql = sql.strip()
+    sql, bloqueios = _RE_FOR_UPDATE.subn("", sql)
+    escrita = bool(bloqueios) or sql.split(None, 1)[0].upper() not in _LEITURAS
+    return sql.replace("%s", "?"), escrita
+
+
+def _linha_dict(cursor, linha):
+    return {coluna[0]: valor for coluna, valor in zip(cursor.description, linha)}
+
+
+class CursorSQLite:
+    def __init__(self, conexao, dictionary=False, **kwargs):
+        self._conexao = conexao
+        self._dicionario = dictionary
+        self._cursor = None
+        self.rowcount = -1
+        self.lastrowid = None
+
+    @property
+    def column_names(self):
+        if self._cursor is None or self._cursor.description is None:
+            return ()
+        return tuple(coluna[0] for coluna in self._cursor.description)
+
+    def _preparar(self, sql):
+        sql, escrita = traduzir_sql(sql)
+        conn = self._conexao._conexao_para(escrita)
+        if self._cursor is None or self._cursor.connection is not conn:
+            if self._cursor is not None:
+                self._cursor.close()
+            self._cursor = conn.cursor()
+            if self._dicionario:
+                self._cursor.row_factory = _linha_dict
+        return sql
+
+    def execute(self, sql, params=()):
+        with _traduzindo_erros():
+            sql = self._preparar(sql)
+            self._cursor.execute(sql, tuple(params or ()))
+        self.rowcount = self._cursor.rowcount
+        self.lastrowid = self._cursor.lastrowid
+
+    def executemany(self, sql, seq):
+        with _traduzindo_erros():
+            sql = self._preparar(sql)
+            self._cursor.executemany(sql, seq)
+            self.rowcount = self._cursor.rowcount
+            if sql[:6].upper() == "INSERT" and self.rowcount > 0:
+                # Como no MySQL, o id da primeira linha do lote. Com um único
+                # escritor os ids de um mesmo lote são consecutivos.
+                ultimo = self._cursor.connection.execute("SELECT last_insert_rowid()").fetchone()[0]
+                self.lastrowid = ultimo - self.rowcount + 1
+
+    def fetchone(self):
+        if self._cursor is None:
+            return None
+        with _traduzindo_erros():
+            return self._cursor.fetchone()
+
+    def fetchmany(self, quantidade=1):
+        if self._cursor is None:
+            return []
+        with _traduzindo_erros():
+            return self._cursor.fetchmany(quantidade)
+
+    def fetchall(self):
+        if self._cursor is None:
+            return []
+        with _traduzindo_erros():
+            return self._cursor.fetchall()
+
+    def __iter__(self):
+        return iter(self.fetchall())
+
+    def close(self):
+        if self._cursor is not None:
+            self._cursor.close()
+            self._cursor = None
+
+
+class ConexaoSQLite:
+    # Os cursores do sqlite3 não deixam resultados pendentes na conexão
+    unread_result = False
+    # Sem cache de instruções preparadas: o sqlite3 já reaproveita as
+    # instruções compiladas por conexão (`cached_statements`)
+    preparadas = None
+
+    def __init__(self, pool, leitura):
+        self._pool = pool
+        self._leitura = leitura
+        self._escrita = None
+
+    @property
+    def in_transaction(self):
+        return self._escrita is not None
+
+    def _conexao_para(self, escrita):
+        if self._escrita is not None:
+            return self._escrita
+        if not escrita:
+            return self._leitura
+        conn = self._pool.obter_escritor()
+        try:
+            conn.execute("BEGIN IMMEDIATE")
+        except Exception:
+            self._pool.devolver_escritor(conn)
+            raise
+        self._escrita = conn
+        return conn
+
+    def cursor(self, *args, **kwargs):
+        return CursorSQLite(self, **kwargs)
+
+    def _encerrar(self, comando):
+        if self._escrita is None:
+            return
+        conn, self._escrita = self._escrita, None
+        try:
+            with _traduzindo_erros():
+                conn.execute(comando)
+        finally:
+            self._pool.devolver_escritor(conn)
+
+    def commit(self):
+        self._encerrar("COMMIT")
+
+    def rollback(self):
+        self._encerrar("ROLLBACK")
+
+    def consume_results(self):
+        pass
+
+    def is_connected(self):
+        return True
+
+    def ping(self, *args, **kwargs):
+        pass
+
+    def close(self):
+        self.rollback()
+        self._leitura.close()
+
+
+class PoolSQLite(ConnectionPool):
+    """Pool de leitores SQLite com um único escritor compartilhado.
+
+    Os leitores seguem `tamanho`/`max_overflow` como no MySQL. Quem precisa
+    escrever espera até `timeout` segundos pelo escritor, que fica com a
+    transação até o commit; com um só escritor por processo as transações
+    nunca recebem `SQLITE_BUSY` umas das outras.
+    """
+
+    backend = "sqlite"
+    Erro = sqlite3.Error
+
+    def __init__(self, caminho, tamanho=5, max_overflow=10, timeout=30.0, validar_apos=30.0,
+                 max_preparadas=64):
+        super().__init__({"caminho": caminho}, tamanho, max_overflow, timeout, validar_apos,
+                         max_preparadas)
+        self.caminho = caminho
+        self._escritor_lock = threading.Lock()
+        self._escritor = self._abrir(somente_leitura=False)
+        # Persistente no arquivo; os leitores passam a usar o WAL também
+        self._escritor.execute("PRAGMA journal_mode=WAL")
+
+        self._escritas = 0
+        self._timeouts_escrita = 0
+        self._espera_escrita_total = 0.0
+        self._espera_escrita_max = 0.0
+
+    def _abrir(self, somente_leitura):
+        conn = sqlite3.connect(
+            self.caminho, timeout=self.timeout, isolation_level=None,
+            detect_types=sqlite3.PARSE_DECLTYPES, check_same_thread=False,
+            # O sqlite3 já reaproveita as instruções compiladas por texto do SQL
+            cached_statements=max(self.max_preparadas, 256),
+        )
+        conn.execute("PRAGMA synchronous=NORMAL")
+        if somente_leitura:
+            conn.execute("PRAGMA query_only=ON")
+        return conn
+
+    def _conectar(self):
+        return ConexaoSQLite(self, self._abrir(somente_leitura=True))
+
+    def _validar(self, conn, ociosa_desde):
+        # Arquivo local: conexões ociosas não caem como as de rede
+        return conn
+
+    def obter_escritor(self):
+        inicio = time.monotonic()
+        if not self._escritor_lock.acquire(timeout=self.timeout):
+            with self._cond:
+                self._timeouts_escrita += 1
+            raise PoolError(f"Escritor SQLite ocupado após {self.timeout}s")
+        if self._escritor is None:
+            self._escritor_lock.release()
+            raise PoolError("Pool de conexões encerrado")
+        espera = time.monotonic() - inicio
+        with self._cond:
+            self._escritas += 1
+            self._espera_escrita_total += espera
+            self._espera_escrita_max = max(self._espera_escrita_max, espera)
+        return self._escritor
+
+    def devolver_escritor(self, conn):
+        try:
+            if conn.in_transaction:
+                conn.rollback()
+        finally:
+            self._escritor_lock.release()
+
+    def fechar(self):
+        super().fechar()
+        with self._escritor_lock:
+            if self._escritor is not None:
+                self._escritor.close()
+                self._escritor = None
+
+    def estatisticas(self):
+        estatisticas = super().estatisticas()
+        with self._cond:
+            estatisticas.update({
+                "backend": self.backend,
+                "caminho": self.caminho,
+                "escritas": self._escritas,
+                "timeouts_escrita": self._timeouts_escrita,
+                "espera_escrita_media_ms":
+                    (self._espera_escrita_total / self._escritas * 1000) if self._escritas else 0.0,
+                "espera_escrita_max_ms": self._espera_escrita_max * 1000,
+            })
+        return estatisticas
@@ -0,0 +1,197 @@
+"""Cache read-through para leituras por id.
+
+O backend padrão é um LRU em memória com TTL, por processo. Em implantações
+com vários workers use o backend `redis` (requer o pacote `redis`), para que
+as invalidações feitas por um worker valham para todos.
+"""
+import pickle
+import threading
+import time
+from collections import OrderedDict
+
+from database.config import get_cache_config
+
+
+class LRUCache:
+    def __init__(self, max_itens=10000, ttl=60.0):
+        self.max_itens = max_itens
+        self.ttl = ttl
+        self._itens = OrderedDict()
+        self._lock = threading.Lock()
+        # Incrementado a cada invalidação; um carregamento iniciado antes de
+        # uma invalidação não grava o valor (que pode estar desatualizado).
+        self._geracao = 0
+
+        self._hits = 0
+        self._misses = 0
+        self._evictions = 0
+        self._expiracoes = 0
+        self._invalidacoes = 0
+
+    def geracao(self):
+        return self._geracao
+
+    def obter(self, chave):
+        with self._lock:
+            item = self._itens.get(chave)
+            if item is None:
+                self._misses += 1
+                return None
+            valor, expira_em = item
+            if expira_em <= time.monotonic():
+                del self._itens[chave]
+                self._expiracoes += 1
+                self._misses += 1
+                return None
+            self._itens.move_to_end(chave)
+            self._hits += 1
+            return valor
+
+    def gravar(self, chave, valor, geracao=None):
+        with self._lock:
+            if geracao is not None and geracao != self._geracao:
+                return
+            self._itens[chave] = (valor, time.monotonic() + self.ttl)
+            self._itens.move_to_end(chave)
+            while len(self._itens) > self.max_itens:
+                self._itens.popitem(last=False)
+                self._evictions += 1
+
+    def remover(self, chave):
+        with self._lock:
+            self._geracao += 1
+            self._invalidacoes += 1
+            self._itens.pop(chave, None)
+
+    def limpar(self):
+        with self._lock:
+            self._geracao += 1
+            self._itens.clear()
+
+    def estatisticas(self):
+        with self._lock:
+            return {
+                "backend": "memoria",
+                "itens": len(self._itens),
+                "max_itens": self.max_itens,
+                "ttl": self.ttl,
+                "hits": self._hits,
+                "misses": self._misses,
+                "evictions": self._evictions,
+                "expiracoes": self._expiracoes,
+                "invalidacoes": self._invalidacoes,
+            }
+
+
+class RedisCache:
+    def __init__(self, url, ttl=60.0, prefixo="cache:"):
+        try:
+            import redis
+        except ImportError:
+            raise RuntimeError("CACHE_BACKEND=redis requer o pacote 'redis' instalado")
+        self._redis = redis.Redis.from_url(url)
+        self.ttl = ttl
+        self.prefixo = prefixo
+        self._hits = 0
+        self._misses = 0
+        self._invalidacoes = 0
+
+    def geracao(self):
+        return None
+
+    def obter(self, chave):
+        dados = self._redis.get(self.prefixo + chave)
+        if dados is None:
+            self._misses += 1
+            return None
+        self._hits += 1
+        return pickle.loads(dados)
+
+    def gravar(self, chave, valor, geracao=None):
+        self._redis.set(self.prefixo + chave, pickle.dumps(valor), px=int(self.ttl * 1000))
+
+    def remover(self, chave):
+        self._invalidacoes += 1
+        self._redis.delete(self.prefixo + chave)
+
+    def limpar(self):
+        chaves = list(self._redis.scan_iter(self.prefixo + "*"))
+        if chaves:
+            self._redis.delete(*chaves)
+
+    def estatisticas(self):
+        info = self._redis.info("stats")
+        return {
+            "backend": "redis",
+            "ttl": self.ttl,
+            "hits": self._hits,
+            "misses": self._misses,
+            "invalidacoes": self._invalidacoes,
+            "evictions": info.get("evicted_keys"),
+            "expiracoes": info.get("expired_keys"),
+        }
+
+
+class SemCache:
+    def geracao(self):
+        return None
+
+    def obter(self, chave):
+        return None
+
+    def gravar(self, chave, valor, geracao=None):
+        pass
+
+    def remover(self, chave):
+        pass
+
+    def limpar(self):
+        pass
+
+    def estatisticas(self):
+        return {"backend": "desativado"}
+
+
+_cache = None
+_cache_lock = threading.Lock()
+
+
+def get_cache():
+    global _cache
+    if _cache is None:
+        with _cache_lock:
+            if _cache is None:
+                config = get_cache_config()
+                if config['backend'] == 'redis':
+                    _cache = RedisCache(config['redis_url'], config['ttl'])
+                elif config['backend'] == 'desativado':
+                    _cache = SemCache()
+                else:
+                    _cache = LRUCache(config['max_itens'], config['ttl'])
+    return _cache
+
+
+def obter_ou_carregar(chave, carregar):
+    """Retorna o valor em cache ou chama `carregar()` e guarda o resultado.
+
+    Resultados vazios (registro inexistente) não são guardados.
+    """
+    cache = get_cache()
+    valor = cache.obter(chave)
+    if valor is not None:
+        return dict(valor)
+    geracao = cache.geracao()
+    valor = carregar()
+    if valor is not None:
+        cache.gravar(chave, dict(valor), geracao)
+    return valor
+
+
+def invalidar(chave):
+    get_cache().remover(chave)
+
+
+def get_cache_stats():
+    if _cache is None:
+        return {}
+    return _cache.estatisticas()
@@ -0,0 +1,140 @@
+"""Compressão negociada (brotli ou gzip) das respostas HTML, JSON e texto.
+
+`CompressaoMiddleware` escolhe a codificação pelo `Accept-Encoding` e
+comprime as respostas de tipos textuais a partir de `minimo_bytes`. Respostas
+em streaming (páginas com `stream=1`, exportações) são comprimidas parte a
+parte, com um flush a cada parte para não segurar o envio progressivo.
+Respostas que já têm `Content-Encoding` (arquivos estáticos pré-comprimidos,
+exportações com `gzip=1`) passam intactas.
+
+O brotli requer o pacote `brotli`; sem ele apenas gzip é oferecido.
+"""
+import zlib
+from functools import lru_cache
+
+from starlette.datastructures import Headers, MutableHeaders
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+# Em ordem de preferência, em caso de empate no `q`
+CODIFICACOES = ("br", "gzip") if brotli is not None else ("gzip",)
+
+TIPOS_COMPRIMIVEIS = (
+    "text/", "application/json", "application/javascript", "application/x-ndjson",
+    "application/xml", "image/svg+xml",
+)
+
+
+@lru_cache(maxsize=256)
+def negociar(accept_encoding, disponiveis=CODIFICACOES):
+    """Retorna a codificação de `disponiveis` preferida pelo cliente, ou None."""
+    pesos = {}
+    for parte in accept_encoding.lower().split(","):
+        nome, _, parametros = parte.partition(";")
+        nome = nome.strip()
+        if not nome:
+            continue
+        peso = 1.0
+        parametros = parametros.strip()
+        if parametros.startswith("q="):
+            try:
+                peso = float(parametros[2:])
+            except ValueError:
+                peso = 0.0
+        pesos[nome] = peso
+    escolhida, maior = None, 0.0
+    for codificacao in disponiveis:
+        peso = pesos.get(codificacao, pesos.get("*", 0.0))
+        if peso > maior:
+            escolhida, maior = codificacao, peso
+    return escolhida
+
+
+class _Compressor:
+    def __init__(self, codificacao, nivel_gzip, nivel_brotli):
+        if codificacao == "br":
+            self._objeto = brotli.Compressor(quality=nivel_brotli)
+            self.comprimir = self._objeto.process
+            self.descarregar = self._objeto.flush
+            self.finalizar = self._objeto.finish
+        else:
+            self._objeto = zlib.compressobj(nivel_gzip, zlib.DEFLATED, 31)  # wbits 31: formato gzip
+            self.comprimir = self._objeto.compress
+            self.descarregar = lambda: self._objeto.flush(zlib.Z_SYNC_FLUSH)
+            self.finalizar = self._objeto.flush
+
+
+def _comprimivel(status, headers):
+    if status < 200 or status in (204, 206, 304) or "content-encoding" in headers:
+        return False
+    if "no-transform" in headers.get("cache-control", ""):
+        return False
+    return headers.get("content-type", "").startswith(TIPOS_COMPRIMIVEIS)
+
+
+class CompressaoMiddleware:
+    def __init__(self, app, minimo_bytes=1024, nivel_gzip=6, nivel_brotli=4):
+        self.app = app
+        self.minimo_bytes = minimo_bytes
+        self.nivel_gzip = nivel_gzip
+        self.nivel_brotli = nivel_brotli
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or scope["method"] == "HEAD":
+            await self.app(scope, receive, send)
+            return
+        codificacao = negociar(Headers(scope=scope).get("accept-encoding", ""))
+        if codificacao is None:
+            await self.app(scope, receive, send)
+            return
+
+        inicio = None
+        compressor = None
+        intacta = False
+
+        async def enviar(message):
+            nonlocal inicio, compressor, intacta
+            if message["type"] == "http.response.start":
+                # Os cabeçalhos dependem do tamanho da primeira parte do corpo
+                inicio = message
+                return
+            if message["type"] != "http.response.body" or intacta:
+                await send(message)
+                return
+
+            corpo = message.get("body", b"")
+            mais = message.get("more_body", False)
+            if compressor is None:
+                headers = MutableHeaders(raw=inicio["headers"])
+                if not _comprimivel(inicio["status"], headers) or (not mais and len(corpo) < self.minimo_bytes):
+                    intacta = True
+                    await send(inicio)
+                    await send(message)
+                    return
+                compressor = _Compressor(codificacao, self.nivel_gzip, self.nivel_brotli)
+                headers["content-encoding"] = codificacao
+                headers.add_vary_header("Accept-Encoding")
+                etag = headers.get("etag")
+                if etag and not etag.startswith("W/"):
+                    # O corpo enviado não é mais idêntico byte a byte (o
+                    # FileResponse do Starlette manda o ETag sem aspas)
+                    headers["etag"] = "W/" + (etag if etag.startswith('"') else f'"{etag}"')
+                dados = compressor.comprimir(corpo)
+                if mais:
+                    del headers["content-length"]
+                    dados += compressor.descarregar()
+                else:
+                    dados += compressor.finalizar()
+                    headers["content-length"] = str(len(dados))
+                await send(inicio)
+                await send({"type": "http.response.body", "body": dados, "more_body": mais})
+                return
+
+            dados = compressor.comprimir(corpo)
+            dados += compressor.descarregar() if mais else compressor.finalizar()
+            await send({"type": "http.response.body", "body": dados, "more_body": mais})
+
+        await self.app(scope, receive, enviar)
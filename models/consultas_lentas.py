@@ -0,0 +1,265 @@
+"""Log de consultas lentas com captura automática do plano de execução.
+
+O cursor instrumentado (`models.metricas.CursorMedido`) chama `registrar`
+para toda instrução que passa de `CONSULTAS_LENTAS_LIMITE_MS`, contando o
+`execute` e a leitura das linhas, depois que o resultado foi lido. Cada registro
+traz o SQL normalizado (literais e listas de marcadores trocados por `?`), a
+forma dos parâmetros, a duração, as linhas examinadas (no MySQL, lidas do
+`performance_schema`) e a rota da requisição. O plano (`EXPLAIN FORMAT=JSON`
+no MySQL, `EXPLAIN QUERY PLAN` no SQLite) é capturado só na primeira vez que
+cada SQL normalizado fica lento.
+
+Os registros vão, um JSON por linha, para um arquivo local com rotação por
+tamanho; o agregado por SQL normalizado fica em memória para a página
+`/diagnostico/consultas-lentas`.
+"""
+import json
+import logging
+import re
+import threading
+from contextvars import ContextVar
+from datetime import datetime
+from functools import lru_cache
+from logging.handlers import RotatingFileHandler
+
+from database.config import get_consultas_lentas_config
+
+logger = logging.getLogger(__name__)
+
+_RE_ESPACOS = re.compile(r"\s+")
+_RE_LITERAIS = re.compile(r"'(?:[^'\\]|\\.)*'|\b\d+(?:\.\d+)?\b")
+_RE_LISTAS = re.compile(r"\(\s*\?(?:\s*,\s*\?)+\s*\)")
+
+# Escopo ASGI da requisição em andamento; `run_db` e o threadpool do
+# Starlette copiam o contexto, então ele chega às threads do banco.
+requisicao_atual = ContextVar("requisicao_atual", default=None)
+
+
+@lru_cache(maxsize=1024)
+def normalizar_sql(sql):
+    """SQL em uma linha, com literais e listas de marcadores trocados por `?`."""
+    sql = _RE_ESPACOS.sub(" ", sql).strip().replace("%s", "?")
+    sql = _RE_LITERAIS.sub("?", sql)
+    return _RE_LISTAS.sub("(?, ...)", sql)
+
+
+def forma_parametros(params, lote=False):
+    """Tipos dos parâmetros, sem os valores (que podem ter dados pessoais)."""
+    if lote:
+        linhas = params if isinstance(params, (list, tuple)) else []
+        return {"linhas": len(linhas), "colunas": forma_parametros(linhas[0]) if linhas else []}
+    if not params:
+        return []
+    if isinstance(params, dict):
+        return {chave: type(valor).__name__ for chave, valor in params.items()}
+    return [type(valor).__name__ for valor in params]
+
+
+def _rota_atual():
+    scope = requisicao_atual.get()
+    if scope is None:
+        return None
+    rota = scope.get("route")
+    return f"{scope.get('method')} {getattr(rota, 'path', None) or scope.get('path')}"
+
+
+def resultado_pendente(conexao):
+    """Se a conexão ainda tem linhas de uma instrução por ler.
+
+    No mysql.connector com a extensão C, `unread_result` só cobre as
+    instruções de texto; o resultado de uma instrução preparada fica em
+    `_unread_result` (que é o próprio estado na implementação em Python).
+    """
+    return bool(getattr(conexao, "unread_result", False) or getattr(conexao, "_unread_result", False))
+
+
+def _consultar(conexao, sql, params=()):
+    cursor = conexao.cursor()
+    try:
+        cursor.execute(sql, params)
+        return cursor.fetchall()
+    finally:
+        cursor.close()
+
+
+def _linhas_examinadas(conexao):
+    # Última instrução da própria sessão; precisa do performance_schema
+    # (ativo por padrão no MySQL 8).
+    linhas = _consultar(conexao, """
+        SELECT ROWS_EXAMINED FROM performance_schema.events_statements_history
+        WHERE THREAD_ID = PS_CURRENT_THREAD_ID()
+        ORDER BY EVENT_ID DESC LIMIT 1
+    """)
+    return linhas[0][0] if linhas else None
+
+
+def _explicar(conexao, backend, sql, params):
+    if backend == "sqlite":
+        linhas = _consultar(conexao, "EXPLAIN QUERY PLAN " + sql, params)
+        return [linha[-1] for linha in linhas]
+    linhas = _consultar(conexao, "EXPLAIN FORMAT=JSON " + sql, params)
+    return json.loads(linhas[0][0]) if linhas else None
+
+
+class RegistroConsultasLentas:
+    def __init__(self, limite_ms=200.0, arquivo="consultas_lentas.ndjson", tamanho_max_mb=10,
+                 arquivos_backup=5, explain=True, max_consultas=500):
+        self.limite = limite_ms / 1000
+        self.explain = explain
+        self.max_consultas = max_consultas
+        self._consultas = {}
+        self._lock = threading.Lock()
+        self._descartadas = 0
+
+        self._arquivo = logging.getLogger("consultas_lentas.arquivo")
+        self._arquivo.propagate = False
+        self._arquivo.setLevel(logging.INFO)
+        if arquivo and not self._arquivo.handlers:
+            handler = RotatingFileHandler(
+                arquivo, maxBytes=int(tamanho_max_mb * 1024 * 1024),
+                backupCount=arquivos_backup, encoding="utf-8", delay=True)
+            handler.setFormatter(logging.Formatter("%(message)s"))
+            self._arquivo.addHandler(handler)
+
+    def _agregado(self, normalizado, pode_explicar):
+        """Retorna o agregado do SQL e se cabe a esta chamada capturar o plano."""
+        with self._lock:
+            agregado = self._consultas.get(normalizado)
+            if agregado is None:
+                agregado = self._novo_agregado(normalizado)
+            capturar = pode_explicar and self.explain and not agregado["plano_capturado"]
+            if capturar:
+                agregado["plano_capturado"] = True
+            return agregado, capturar
+
+    def _novo_agregado(self, normalizado):
+        if len(self._consultas) >= self.max_consultas:
+            menor = min(self._consultas, key=lambda sql: self._consultas[sql]["total_s"])
+            del self._consultas[menor]
+            self._descartadas += 1
+        agregado = self._consultas[normalizado] = {
+            "sql": normalizado, "execucoes": 0, "total_s": 0.0, "max_s": 0.0,
+            "linhas_examinadas_max": None, "rotas": {}, "forma_parametros": None,
+            "plano": None, "plano_capturado": False, "ultima_em": None,
+        }
+        return agregado
+
+    def registrar(self, conexao, cursor, sql, params, duracao, lote=False):
+        from models.database import get_backend
+
+        backend = get_backend()
+        # O `CursorMedido` só chama aqui depois de o resultado ser lido; a
+        # conexão só continua ocupada se o cursor foi fechado com linhas
+        # pendentes, e aí o plano fica para a próxima execução lenta.
+        livre = not resultado_pendente(conexao)
+        normalizado = normalizar_sql(sql)
+        agregado, capturar_plano = self._agregado(normalizado, livre and not lote)
+
+        linhas_examinadas = None
+        if livre and backend == "mysql":
+            try:
+                linhas_examinadas = _linhas_examinadas(conexao)
+            except Exception as e:
+                logger.debug(f"Linhas examinadas indisponíveis: {str(e)}")
+
+        plano = None
+        if capturar_plano:
+            try:
+                plano = _explicar(conexao, backend, sql, params or ())
+            except Exception as e:
+                plano = {"erro": str(e)}
+
+        rota = _rota_atual()
+        registro = {
+            "data": datetime.now().isoformat(timespec="milliseconds"),
+            "sql": normalizado,
+            "forma_parametros": forma_parametros(params, lote),
+            "duracao_ms": round(duracao * 1000, 3),
+            "linhas_examinadas": linhas_examinadas,
+            "linhas": cursor.rowcount if getattr(cursor, "rowcount", -1) >= 0 else None,
+            "rota": rota,
+        }
+        if plano is not None:
+            registro["plano"] = plano
+
+        with self._lock:
+            agregado["execucoes"] += 1
+            agregado["total_s"] += duracao
+            agregado["max_s"] = max(agregado["max_s"], duracao)
+            agregado["ultima_em"] = registro["data"]
+            agregado["forma_parametros"] = registro["forma_parametros"]
+            if linhas_examinadas is not None:
+                agregado["linhas_examinadas_max"] = max(agregado["linhas_examinadas_max"] or 0, linhas_examinadas)
+            if rota is not None:
+                agregado["rotas"][rota] = agregado["rotas"].get(rota, 0) + 1
+            if plano is not None:
+                agregado["plano"] = plano
+
+        self._arquivo.info(json.dumps(registro, default=str, ensure_ascii=False))
+
+    def mais_lentas(self, limite=50):
+        """SQLs normalizados ordenados pelo tempo total acumulado."""
+        with self._lock:
+            consultas = [dict(agregado, rotas=dict(agregado["rotas"])) for agregado in self._consultas.values()]
+        consultas.sort(key=lambda agregado: agregado["total_s"], reverse=True)
+        for agregado in consultas:
+            agregado["media_ms"] = agregado["total_s"] / agregado["execucoes"] * 1000 if agregado["execucoes"] else 0.0
+        return consultas[:limite]
+
+    def estatisticas(self):
+        with self._lock:
+            return {
+                "limite_ms": self.limite * 1000,
+                "consultas": len(self._consultas),
+                "descartadas": self._descartadas,
+                "execucoes": sum(agregado["execucoes"] for agregado in self._consultas.values()),
+            }
+
+
+_registro = None
+_registro_lock = threading.Lock()
+
+
+def get_registro_consultas():
+    """Registro do processo, ou None com `CONSULTAS_LENTAS_ATIVAS=false`."""
+    global _registro
+    if _registro is None:
+        with _registro_lock:
+            if _registro is None:
+                config = get_consultas_lentas_config()
+                if not config.pop('ativas'):
+                    return None
+                _registro = RegistroConsultasLentas(**config)
+    return _registro
+
+
+@lru_cache(maxsize=None)
+def limite_segundos():
+    """Duração a partir da qual uma instrução é registrada (infinita se desativado)."""
+    registro = get_registro_consultas()
+    return registro.limite if registro is not None else float("inf")
+
+
+def registrar(conexao, cursor, sql, params, duracao, lote=False):
+    """Registra a instrução lenta; falhas aqui nunca afetam a consulta."""
+    try:
+        get_registro_consultas().registrar(conexao, cursor, sql, params, duracao, lote)
+    except Exception as e:
+        logger.error(f"Falha ao registrar consulta lenta: {str(e)}")
+
+
+class RotaAtualMiddleware:
+    """Guarda o escopo da requisição para os registros saberem a rota."""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        token = requisicao_atual.set(scope)
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            requisicao_atual.reset(token)
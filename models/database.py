@@ -1,61 +1,379 @@
+import asyncio
+import contextvars
+import functools
+import sqlite3
+import threading
+import time
+from collections import OrderedDict, deque
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+
 import mysql.connector
-from database.config import get_db_config
+from mysql.connector.errors import PoolError
+from database.config import get_db_config, get_pool_config, get_executor_config
+from models.metricas import medir_conexao, observar_espera_pool
 
+# Erros de banco de qualquer backend; os do SQLite trazem `errno` e `msg`
+# como os do mysql.connector (ver `models.banco_sqlite.ErroSQLite`).
+ErroBanco = (mysql.connector.Error, sqlite3.Error)
+ER_DUP_ENTRY = 1062
 
 
+class ConnectionPool:
+    """Pool de conexões MySQL compartilhado pelo processo.
 
-def get_db():
-    config = get_db_config()
+    Mantém até `tamanho` conexões ociosas e permite abrir mais `max_overflow`
+    conexões em picos; as conexões de overflow são fechadas ao serem devolvidas.
+    Conexões ociosas há mais de `validar_apos` segundos são validadas com ping
+    antes de serem entregues. Cada conexão carrega até `max_preparadas`
+    instruções preparadas no servidor (ver `InstrucoesPreparadas`).
+    """
+
+    backend = "mysql"
+    Erro = mysql.connector.Error
+
+    def __init__(self, db_config, tamanho=5, max_overflow=10, timeout=30.0, validar_apos=30.0,
+                 max_preparadas=64):
+        self._db_config = db_config
+        self.tamanho = tamanho
+        self.max_overflow = max_overflow
+        self.timeout = timeout
+        self.validar_apos = validar_apos
+        self.max_preparadas = max_preparadas
+
+        self._ociosas = deque()
+        self._cond = threading.Condition()
+        self._abertas = 0
+        self._em_uso = 0
+        self._aguardando = 0
+        self._fechado = False
+
+        self._checkouts = 0
+        self._timeouts = 0
+        self._descartadas = 0
+        self._espera_total = 0.0
+        self._espera_max = 0.0
+
+    def _conectar(self):
+        conn = mysql.connector.connect(**self._db_config)
+        if self.max_preparadas:
+            conn.preparadas = InstrucoesPreparadas(conn, self.max_preparadas)
+        return conn
+
+    def _validar(self, conn, ociosa_desde):
+        if time.monotonic() - ociosa_desde < self.validar_apos:
+            return conn
+        try:
+            sessao = conn.connection_id
+            conn.ping(reconnect=True, attempts=1)
+            if conn.connection_id != sessao and self.max_preparadas:
+                # As instruções preparadas morrem com a sessão anterior
+                conn.preparadas.descartar()
+            return conn
+        except self.Erro:
+            with self._cond:
+                self._descartadas += 1
+            self._fechar(conn)
+            return self._conectar()
+
+    def _fechar(self, conn):
+        try:
+            conn.close()
+        except self.Erro:
+            pass
+
+    def obter(self):
+        inicio = time.monotonic()
+        prazo = inicio + self.timeout
+        conn = None
+        with self._cond:
+            if self._fechado:
+                raise PoolError("Pool de conexões encerrado")
+            while True:
+                if self._ociosas:
+                    conn, ociosa_desde = self._ociosas.pop()
+                    break
+                if self._abertas < self.tamanho + self.max_overflow:
+                    self._abertas += 1
+                    break
+                restante = prazo - time.monotonic()
+                if restante <= 0:
+                    self._timeouts += 1
+                    raise PoolError(
+                        f"Nenhuma conexão disponível após {self.timeout}s")
+                self._aguardando += 1
+                try:
+                    self._cond.wait(restante)
+                finally:
+                    self._aguardando -= 1
+            self._em_uso += 1
+
+        try:
+            if conn is None:
+                conn = self._conectar()
+            else:
+                conn = self._validar(conn, ociosa_desde)
+        except Exception:
+            with self._cond:
+                self._abertas -= 1
+                self._em_uso -= 1
+                self._cond.notify()
+            raise
+
+        espera = time.monotonic() - inicio
+        observar_espera_pool(espera)
+        with self._cond:
+            self._checkouts += 1
+            self._espera_total += espera
+            self._espera_max = max(self._espera_max, espera)
+        return conn
+
+    def devolver(self, conn):
+        reutilizavel = True
+        try:
+            if conn.unread_result:
+                conn.consume_results()
+            if conn.in_transaction:
+                conn.rollback()
+        except self.Erro:
+            reutilizavel = False
+
+        with self._cond:
+            self._em_uso -= 1
+            if reutilizavel and not self._fechado and len(self._ociosas) < self.tamanho:
+                self._ociosas.append((conn, time.monotonic()))
+                conn = None
+            else:
+                self._abertas -= 1
+                if not reutilizavel:
+                    self._descartadas += 1
+            self._cond.notify()
+
+        if conn is not None:
+            self._fechar(conn)
+
+    def fechar(self):
+        with self._cond:
+            self._fechado = True
+            ociosas = [conn for conn, _ in self._ociosas]
+            self._ociosas.clear()
+            self._abertas -= len(ociosas)
+            self._cond.notify_all()
+        for conn in ociosas:
+            self._fechar(conn)
+
+    def estatisticas(self):
+        with self._cond:
+            return {
+                "tamanho": self.tamanho,
+                "max_overflow": self.max_overflow,
+                "abertas": self._abertas,
+                "em_uso": self._em_uso,
+                "ociosas": len(self._ociosas),
+                "aguardando": self._aguardando,
+                "checkouts": self._checkouts,
+                "timeouts": self._timeouts,
+                "descartadas": self._descartadas,
+                "espera_media_ms": (self._espera_total / self._checkouts * 1000) if self._checkouts else 0.0,
+                "espera_max_ms": self._espera_max * 1000,
+            }
+
+
+class InstrucoesPreparadas:
+    """Cursores com instrução preparada no servidor, por texto do SQL.
+
+    Pertence a uma conexão do pool e vive enquanto ela viver: a instrução é
+    preparada na primeira execução e as seguintes só enviam os parâmetros,
+    sem o servidor analisar o SQL de novo. Além de `maximo` instruções a
+    menos usada recentemente é fechada (`max_prepared_stmt_count` do MySQL é
+    global ao servidor).
+
+    O cursor do mysql.connector só reaproveita a instrução quando recebe o
+    mesmo objeto `str` da preparação, então `obter` devolve o SQL guardado.
+    """
+
+    def __init__(self, conexao, maximo=64):
+        self._conexao = conexao
+        self.maximo = maximo
+        self._cursores = OrderedDict()
+
+    def obter(self, sql, dictionary=False):
+        chave = (sql, dictionary)
+        item = self._cursores.get(chave)
+        if item is not None:
+            self._cursores.move_to_end(chave)
+            return item
+        if len(self._cursores) >= self.maximo:
+            _, (antigo, _) = self._cursores.popitem(last=False)
+            try:
+                antigo.close()
+            except mysql.connector.Error:
+                pass
+        item = self._cursores[chave] = (
+            self._conexao.cursor(prepared=True, dictionary=dictionary), sql)
+        return item
+
+    def esquecer(self, sql, dictionary=False):
+        """Remove a instrução após um erro; a próxima execução prepara de novo."""
+        self._cursores.pop((sql, dictionary), None)
+
+    def descartar(self):
+        self._cursores.clear()
+
+    def __len__(self):
+        return len(self._cursores)
+
+
+_pool = None
+_pool_lock = threading.Lock()
+_executor = None
+_backend = "mysql"
+
+
+def init_pool():
+    """Cria o pool do backend escolhido em `DB_BACKEND` (`mysql` ou `sqlite`)."""
+    global _pool, _backend
+    with _pool_lock:
+        if _pool is not None:
+            return _pool
+        config = get_db_config()
+        _backend = config.pop('backend')
+        if _backend == 'sqlite':
+            from models.banco_sqlite import PoolSQLite
+            _pool = PoolSQLite(config['caminho'], **get_pool_config())
+        else:
+            _pool = ConnectionPool(config, **get_pool_config())
+        return _pool
+
+
+def get_backend():
+    """Backend do pool em uso, para os poucos trechos com SQL específico."""
+    return _backend
+
+
+def close_pool():
+    global _pool
+    with _pool_lock:
+        if _pool is not None:
+            _pool.fechar()
+            _pool = None
+
+
+def get_pool():
+    if _pool is None:
+        return init_pool()
+    return _pool
+
+
+def init_executor():
+    global _executor
+    with _pool_lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(
+                thread_name_prefix="db", **get_executor_config())
+        return _executor
+
+
+def close_executor():
+    global _executor
+    with _pool_lock:
+        if _executor is not None:
+            _executor.shutdown(wait=True)
+            _executor = None
+
+
+async def run_db(func, *args, **kwargs):
+    """Executa uma função bloqueante de acesso ao banco fora do event loop.
+
+    Usa um executor dedicado e limitado, dimensionado pelo tamanho do pool,
+    para que consultas lentas não bloqueiem as demais requisições do worker.
+    """
+    executor = _executor or init_executor()
+    loop = asyncio.get_running_loop()
+    contexto = contextvars.copy_context()
+    return await loop.run_in_executor(
+        executor, functools.partial(contexto.run, func, *args, **kwargs))
+
+
+def get_pool_stats():
+    if _pool is None:
+        return {}
+    return _pool.estatisticas()
+
+
+@contextmanager
+def get_connection():
+    pool = get_pool()
+    conn = pool.obter()
     try:
-        # Initial connection without database
-        conn = mysql.connector.connect(
-            host=config['host'],
-            user=config['user'],
-            password=config['password']
-        )
-
-        cursor = conn.cursor()
-        cursor.execute(f"CREATE DATABASE IF NOT EXISTS {config['database']}")
-        cursor.execute(f"USE {config['database']}")
-
-        cursor.execute("""
-        CREATE TABLE IF NOT EXISTS produtos (
-            id INT AUTO_INCREMENT PRIMARY KEY,
-            nome VARCHAR(100) NOT NULL,
-            descricao TEXT,
-            preco DECIMAL(10, 2) NOT NULL,
-            estoque INT NOT NULL,
-            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-            updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP
-        )
-        """)
-
-        cursor.execute("""
-        CREATE TABLE IF NOT EXISTS usuarios (
-            id INT AUTO_INCREMENT PRIMARY KEY,
-            nome VARCHAR(50) NOT NULL,
-            email VARCHAR(100) UNIQUE NOT NULL,
-            senha VARCHAR(255) NOT NULL,
-            data_criacao TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-            data_atualizacao TIMESTAMP DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP
-        )
-        """)
-        conn.commit()
-        cursor.close()
-        conn.close()
-
-        conn = mysql.connector.connect(
-            host=config['host'],
-            user=config['user'],
-            password=config['password'],
-            database=config['database'],
-            port=config['port']
-            )
+        yield medir_conexao(conn)
+    finally:
+        pool.devolver(conn)
+
+
+def get_db():
+    with get_connection() as conn:
         yield conn
 
-    except Exception as e:
-        print(f"Erro ao configurar banco de dados:  {e}")
+
+def _executar_preparada(db, sql, params, dictionary=False):
+    # Conexões sem `preparadas` (SQLite, que já guarda as instruções
+    # compiladas por conexão, e as simuladas) usam um cursor comum.
+    preparadas = getattr(db, "preparadas", None)
+    if preparadas is None:
+        cursor = db.cursor(dictionary=dictionary)
+        cursor.execute(sql, params)
+        return cursor
+    cursor, sql = preparadas.obter(sql, dictionary)
+    # Os cursores guardados são da conexão crua; quem envolve a conexão
+    # (métricas, contagem dos benchmarks) envolve também o cursor
+    envolver = getattr(db, "envolver_cursor", None)
+    if envolver is not None:
+        cursor = envolver(cursor)
+    try:
+        cursor.execute(sql, params)
+    except mysql.connector.Error:
+        preparadas.esquecer(sql, dictionary)
         raise
+    return cursor
+
+
+def executar(db, sql, params=()):
+    """Executa uma escrita com instrução preparada e devolve o cursor.
+
+    Use para `INSERT`/`UPDATE`/`DELETE` de forma fixa; o cursor é da conexão,
+    então leia `rowcount`/`lastrowid` e não o feche.
+    """
+    return _executar_preparada(db, sql, params)
+
+
+def consultar_um(db, sql, params=()):
+    """Primeira linha (dict) de uma consulta de forma fixa, ou None."""
+    linhas = _executar_preparada(db, sql, params, dictionary=True).fetchall()
+    return linhas[0] if linhas else None
+
+
+def consultar_todos(db, sql, params=()):
+    """Todas as linhas (dicts) de uma consulta de forma fixa."""
+    return _executar_preparada(db, sql, params, dictionary=True).fetchall()
+
+
+def iterar_consulta(db, sql, params=(), lote=500):
+    """Itera o resultado de `sql` em lotes de `fetchmany` sem materializá-lo.
+
+    Usa um cursor não bufferizado: as linhas são lidas do servidor à medida
+    que o consumidor avança, então a memória fica constante para qualquer
+    tamanho de tabela. A conexão fica ocupada até o gerador terminar.
+    """
+    cursor = db.cursor(dictionary=True, buffered=False)
+    try:
+        cursor.execute(sql, params)
+        while True:
+            linhas = cursor.fetchmany(lote)
+            if not linhas:
+                return
+            yield from linhas
     finally:
-        if 'conn' in locals() and conn.is_connected():
-            conn.close()
+        if db.unread_result:
+            db.consume_results()
+        cursor.close()
@@ -0,0 +1,164 @@
+"""Arquivos estáticos com impressão digital do conteúdo e variantes pré-comprimidas.
+
+A etapa de build copia cada arquivo de `static/` para `static/dist/` com o
+hash do conteúdo no nome (`css/base.css` -> `css/base.3f2a9c0d41be.css`),
+grava `.gz` e `.br` dos tipos textuais e um `manifest.json` com o mapa
+nome lógico -> nome final:
+
+    python -m models.estaticos
+
+(também executada na inicialização, a menos que
+`ESTATICOS_GERAR_NA_INICIALIZACAO=false`). Nos templates,
+`{{ url_estatico('css/base.css') }}` devolve a URL com hash; sem manifesto
+(ou para arquivos fora dele) devolve a URL comum em `/static/`.
+
+Como o nome muda junto com o conteúdo, `ArquivosEstaticos` serve o que está
+em `dist/` com `Cache-Control: public, max-age=31536000, immutable` e, quando
+o cliente aceita, a variante pré-comprimida. Arquivos antigos de `dist/` não
+são apagados, para que páginas já em cache continuem achando o que
+referenciam; remova a pasta para limpar.
+"""
+import gzip
+import hashlib
+import json
+import os
+import stat
+from functools import lru_cache
+
+from starlette.datastructures import Headers
+from starlette.staticfiles import StaticFiles
+
+from models.compressao import brotli, negociar
+
+DIRETORIO = "static"
+SUBDIRETORIO_DIST = "dist"
+MANIFESTO = "manifest.json"
+URL_BASE = "/static/"
+
+EXTENSOES_COMPRIMIVEIS = {".css", ".js", ".svg", ".json", ".txt", ".html", ".map", ".xml"}
+# Codificação -> sufixo da variante, em ordem de preferência
+VARIANTES = (("br", ".br"), ("gzip", ".gz"))
+CACHE_IMUTAVEL = "public, max-age=31536000, immutable"
+
+
+def _gravar(caminho, dados):
+    # Grava em um temporário e troca: outro worker gerando ao mesmo tempo
+    # nunca lê um arquivo pela metade
+    os.makedirs(os.path.dirname(caminho), exist_ok=True)
+    temporario = f"{caminho}.{os.getpid()}.tmp"
+    with open(temporario, "wb") as arquivo:
+        arquivo.write(dados)
+    os.replace(temporario, caminho)
+
+
+def _ignorar(nome):
+    return nome.startswith(".") or nome.endswith((".py", ".pyc"))
+
+
+def gerar_estaticos(diretorio=DIRETORIO):
+    """Gera `dist/` e o manifesto; retorna o manifesto."""
+    destino = os.path.join(diretorio, SUBDIRETORIO_DIST)
+    manifesto = {}
+    for raiz, pastas, arquivos in os.walk(diretorio):
+        if raiz == diretorio:
+            pastas[:] = [p for p in pastas if p != SUBDIRETORIO_DIST]
+        pastas[:] = [p for p in pastas if p != "__pycache__" and not p.startswith(".")]
+        for nome in sorted(arquivos):
+            if _ignorar(nome):
+                continue
+            relativo = os.path.relpath(os.path.join(raiz, nome), diretorio).replace(os.sep, "/")
+            with open(os.path.join(raiz, nome), "rb") as arquivo:
+                dados = arquivo.read()
+            base, extensao = os.path.splitext(relativo)
+            final = f"{base}.{hashlib.sha256(dados).hexdigest()[:12]}{extensao}"
+            manifesto[relativo] = final
+
+            alvo = os.path.join(destino, final)
+            if not os.path.exists(alvo):
+                _gravar(alvo, dados)
+            if extensao not in EXTENSOES_COMPRIMIVEIS:
+                continue
+            if not os.path.exists(alvo + ".gz"):
+                comprimido = gzip.compress(dados, compresslevel=9, mtime=0)
+                if len(comprimido) < len(dados):
+                    _gravar(alvo + ".gz", comprimido)
+            if brotli is not None and not os.path.exists(alvo + ".br"):
+                comprimido = brotli.compress(dados, quality=11)
+                if len(comprimido) < len(dados):
+                    _gravar(alvo + ".br", comprimido)
+
+    _gravar(os.path.join(destino, MANIFESTO),
+            json.dumps(manifesto, indent=2, sort_keys=True).encode())
+    _manifesto.cache_clear()
+    return manifesto
+
+
+@lru_cache(maxsize=None)
+def _manifesto():
+    try:
+        with open(os.path.join(DIRETORIO, SUBDIRETORIO_DIST, MANIFESTO), encoding="utf-8") as arquivo:
+            return json.load(arquivo)
+    except FileNotFoundError:
+        return {}
+
+
+def url_estatico(caminho):
+    final = _manifesto().get(caminho)
+    if final is None:
+        return URL_BASE + caminho
+    return f"{URL_BASE}{SUBDIRETORIO_DIST}/{final}"
+
+
+def registrar_url_estatico(templates):
+    """Disponibiliza `url_estatico` nos templates deste `Jinja2Templates`."""
+    templates.env.globals["url_estatico"] = url_estatico
+    return templates
+
+
+@lru_cache(maxsize=1024)
+def _variantes(caminho):
+    # Só consultado para arquivos de dist/, que nunca mudam de conteúdo
+    encontradas = []
+    for codificacao, sufixo in VARIANTES:
+        try:
+            resultado = os.stat(caminho + sufixo)
+        except OSError:
+            continue
+        if stat.S_ISREG(resultado.st_mode):
+            encontradas.append((codificacao, caminho + sufixo, resultado))
+    return tuple(encontradas)
+
+
+class ArquivosEstaticos(StaticFiles):
+    """`StaticFiles` que serve `dist/` como imutável e com as variantes pré-comprimidas."""
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._dist = os.path.realpath(os.path.join(self.directory, SUBDIRETORIO_DIST)) + os.sep
+
+    def file_response(self, full_path, stat_result, scope, status_code=200):
+        if not os.path.realpath(full_path).startswith(self._dist):
+            return super().file_response(full_path, stat_result, scope, status_code)
+
+        variantes = _variantes(str(full_path))
+        codificacao = None
+        if variantes:
+            aceitas = Headers(scope=scope).get("accept-encoding", "")
+            codificacao = negociar(aceitas, tuple(v[0] for v in variantes))
+        if codificacao is None:
+            resposta = super().file_response(full_path, stat_result, scope, status_code)
+        else:
+            _, caminho, resultado = next(v for v in variantes if v[0] == codificacao)
+            # O tipo vem do nome (`base.css.br` -> text/css); o ETag, da variante
+            resposta = super().file_response(caminho, resultado, scope, status_code)
+            if resposta.status_code != 304:
+                resposta.headers["content-encoding"] = codificacao
+        resposta.headers["cache-control"] = CACHE_IMUTAVEL
+        if variantes:
+            resposta.headers.add_vary_header("Accept-Encoding")
+        return resposta
+
+
+if __name__ == "__main__":
+    gerados = gerar_estaticos()
+    print(f"{len(gerados)} arquivo(s) em {os.path.join(DIRETORIO, SUBDIRETORIO_DIST)}")
@@ -0,0 +1,218 @@
+"""Importação em massa de produtos a partir de CSV ou NDJSON.
+
+O arquivo é lido linha a linha; cada linha é validada com `ProdutoValidator`
+e `ProdutoCreate` e as válidas são inseridas com `executemany` em lotes.
+Cada lote é uma transação que inclui um único registro de auditoria com o
+resumo do lote. Linhas inválidas não interrompem a importação; elas entram
+no relatório de erros.
+
+    python -m models.importacao produtos.csv [--lote 1000] [--relatorio erros.ndjson]
+"""
+import argparse
+import csv
+import io
+import json
+import logging
+import sys
+import time
+
+from pydantic import ValidationError
+
+from models.database import get_connection
+from models.produto_model import ProdutoCreate
+from models.indice_busca import get_indice_produtos
+from models.log_model import inserir_log_na_transacao
+from validators.produto_validator import ProdutoValidator
+from database.config import get_importacao_config
+
+logger = logging.getLogger(__name__)
+
+SQL_INSERIR_PRODUTO = "INSERT INTO produtos (nome, descricao, preco, estoque) VALUES (%s, %s, %s, %s)"
+FORMATOS = ("csv", "ndjson")
+
+
+def detectar_formato(nome_arquivo, formato=None):
+    if formato:
+        formato = formato.lower()
+    elif nome_arquivo and nome_arquivo.lower().endswith((".ndjson", ".jsonl")):
+        formato = "ndjson"
+    else:
+        formato = "csv"
+    if formato not in FORMATOS:
+        raise ValueError(f"Formato inválido: {formato}")
+    return formato
+
+
+def _texto(arquivo):
+    if isinstance(arquivo, io.TextIOBase):
+        return arquivo
+    return io.TextIOWrapper(arquivo, encoding="utf-8-sig", newline="")
+
+
+def ler_csv(arquivo):
+    """Gera `(numero_da_linha, dados, erro)` para cada registro do CSV."""
+    leitor = csv.DictReader(_texto(arquivo))
+    for dados in leitor:
+        yield leitor.line_num, dados, None
+
+
+def ler_ndjson(arquivo):
+    for numero, linha in enumerate(_texto(arquivo), start=1):
+        if not linha.strip():
+            continue
+        try:
+            dados = json.loads(linha)
+        except ValueError as e:
+            yield numero, None, f"JSON inválido: {e}"
+            continue
+        if not isinstance(dados, dict):
+            yield numero, None, "Cada linha deve ser um objeto JSON"
+            continue
+        yield numero, dados, None
+
+
+def _mensagens(erros):
+    return [f"{'.'.join(map(str, erro['loc']))}: {erro['msg']}" for erro in erros]
+
+
+def validar_linha(dados):
+    """Retorna `(ProdutoCreate, None)` ou `(None, [mensagens de erro])`."""
+    dados = {campo: dados.get(campo) for campo in ("nome", "descricao", "preco", "estoque")}
+    if dados["descricao"] is None:
+        dados["descricao"] = ""
+    resultado = ProdutoValidator.validate(dados)
+    if not resultado["valid"]:
+        return None, _mensagens(resultado["errors"])
+    try:
+        return ProdutoCreate(**dados), None
+    except ValidationError as e:
+        return None, _mensagens(e.errors())
+
+
+class Importacao:
+    def __init__(self, db, tamanho_lote=1000, id_usuario=None, ip_origem=None,
+                 relatorio=None, max_erros=1000):
+        self.db = db
+        self.tamanho_lote = tamanho_lote
+        self.id_usuario = id_usuario
+        self.ip_origem = ip_origem
+        self.relatorio = relatorio
+        self.max_erros = max_erros
+
+        self.lidas = 0
+        self.importadas = 0
+        self.lotes = 0
+        self.total_erros = 0
+        self.erros = []
+
+    def _erro(self, linha, mensagens):
+        self.total_erros += 1
+        erro = {"linha": linha, "erros": mensagens}
+        if len(self.erros) < self.max_erros:
+            self.erros.append(erro)
+        if self.relatorio is not None:
+            self.relatorio.write(json.dumps(erro, ensure_ascii=False) + "\n")
+
+    def _gravar_lote(self, lote):
+        valores = [(p.nome, p.descricao, p.preco, p.estoque) for _, p in lote]
+        cursor = self.db.cursor()
+        try:
+            cursor.executemany(SQL_INSERIR_PRODUTO, valores)
+            # Em INSERTs de várias linhas o MySQL devolve o id da primeira;
+            # os demais são consecutivos.
+            primeiro_id = cursor.lastrowid
+            inserir_log_na_transacao(
+                self.db, "IMPORT", "produtos",
+                dados_novos={
+                    "quantidade": len(lote),
+                    "primeiro_id": primeiro_id,
+                    "ultimo_id": primeiro_id + len(lote) - 1 if primeiro_id else None,
+                    "linhas": [lote[0][0], lote[-1][0]],
+                },
+                id_usuario=self.id_usuario, ip_origem=self.ip_origem,
+            )
+            self.db.commit()
+        except Exception as e:
+            self.db.rollback()
+            logger.error(f"Falha ao importar lote de {len(lote)} produtos: {str(e)}")
+            for linha, _ in lote:
+                self._erro(linha, [f"Erro ao gravar lote: {str(e)}"])
+            return
+        finally:
+            cursor.close()
+
+        self.lotes += 1
+        self.importadas += len(lote)
+        indice = get_indice_produtos()
+        if indice is not None and primeiro_id:
+            for deslocamento, (_, produto) in enumerate(lote):
+                indice.adicionar(primeiro_id + deslocamento, produto.nome, produto.descricao)
+
+    def executar(self, registros):
+        inicio = time.perf_counter()
+        lote = []
+        for linha, dados, erro in registros:
+            self.lidas += 1
+            if erro is not None:
+                self._erro(linha, [erro])
+                continue
+            produto, mensagens = validar_linha(dados)
+            if mensagens:
+                self._erro(linha, mensagens)
+                continue
+            lote.append((linha, produto))
+            if len(lote) >= self.tamanho_lote:
+                self._gravar_lote(lote)
+                lote = []
+        if lote:
+            self._gravar_lote(lote)
+
+        segundos = time.perf_counter() - inicio
+        return {
+            "lidas": self.lidas,
+            "importadas": self.importadas,
+            "lotes": self.lotes,
+            "total_erros": self.total_erros,
+            "erros": self.erros,
+            "segundos": round(segundos, 3),
+            "linhas_por_segundo": round(self.lidas / segundos, 1) if segundos > 0 else None,
+        }
+
+
+def importar_produtos(arquivo, db, formato="csv", tamanho_lote=None, id_usuario=None,
+                      ip_origem=None, relatorio=None, max_erros=1000):
+    """Importa os produtos de `arquivo` (binário ou texto) e retorna o resumo."""
+    tamanho_lote = tamanho_lote or get_importacao_config()['tamanho_lote']
+    leitor = ler_ndjson if formato == "ndjson" else ler_csv
+    importacao = Importacao(db, tamanho_lote, id_usuario, ip_origem, relatorio, max_erros)
+    return importacao.executar(leitor(arquivo))
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Importa produtos de um arquivo CSV ou NDJSON")
+    parser.add_argument("arquivo")
+    parser.add_argument("--formato", choices=FORMATOS)
+    parser.add_argument("--lote", type=int)
+    parser.add_argument("--relatorio", help="grava todos os erros neste arquivo NDJSON")
+    args = parser.parse_args(argv)
+
+    formato = detectar_formato(args.arquivo, args.formato)
+    relatorio = open(args.relatorio, "w", encoding="utf-8") if args.relatorio else None
+    try:
+        with open(args.arquivo, "rb") as arquivo, get_connection() as db:
+            resultado = importar_produtos(arquivo, db, formato, args.lote, relatorio=relatorio, max_erros=20)
+    finally:
+        if relatorio is not None:
+            relatorio.close()
+
+    for erro in resultado["erros"]:
+        print(f"Linha {erro['linha']}: {'; '.join(erro['erros'])}", file=sys.stderr)
+    print(f"Linhas lidas: {resultado['lidas']}")
+    print(f"Importadas: {resultado['importadas']} em {resultado['lotes']} lotes")
+    print(f"Com erro: {resultado['total_erros']}")
+    print(f"Tempo: {resultado['segundos']}s ({resultado['linhas_por_segundo']} linhas/s)")
+    return 1 if resultado["total_erros"] else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
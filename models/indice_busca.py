@@ -0,0 +1,207 @@
+"""Índice invertido em memória para a busca de produtos.
+
+Alternativa ao índice FULLTEXT do MySQL para implantações com um único
+processo: o índice é carregado na inicialização e mantido incrementalmente
+por `create_produto`, `update_produto` e `delete_produto`. Com vários workers
+cada processo teria sua própria cópia, que não veria as escritas dos outros;
+nesse caso use `BUSCA_BACKEND=mysql`.
+
+A relevância é um TF-IDF simples; todos os termos precisam estar presentes e
+o último termo também casa por prefixo, como na busca do MySQL.
+"""
+import bisect
+import heapq
+import logging
+import math
+import re
+import threading
+import unicodedata
+from collections import Counter
+
+from models.database import get_connection, iterar_consulta
+from database.config import get_busca_config
+
+logger = logging.getLogger(__name__)
+
+PADRAO_TOKEN = re.compile(r"\w+")
+# Igual ao innodb_ft_min_token_size padrão: termos menores não são indexados
+# pelo MySQL e, obrigatórios no modo booleano, zerariam o resultado.
+TAMANHO_MINIMO_TOKEN = 3
+
+
+def tokenizar(texto):
+    """Normaliza (minúsculas, sem acentos) e divide o texto em termos."""
+    if not texto:
+        return []
+    texto = unicodedata.normalize("NFKD", texto.lower())
+    texto = "".join(c for c in texto if not unicodedata.combining(c))
+    return [t for t in PADRAO_TOKEN.findall(texto) if len(t) >= TAMANHO_MINIMO_TOKEN]
+
+
+class IndiceInvertido:
+    def __init__(self):
+        self._postagens = {}
+        self._documentos = {}
+        self._vocabulario = []
+        self._lock = threading.RLock()
+        self.pronto = False
+        # Ids alterados enquanto a carga inicial está em andamento; a carga
+        # não sobrescreve essas versões mais novas.
+        self._alterados = None
+
+    def _remover(self, id):
+        termos = self._documentos.pop(id, None)
+        if not termos:
+            return
+        for termo in termos:
+            ids = self._postagens.get(termo)
+            if ids is None:
+                continue
+            ids.pop(id, None)
+            if not ids:
+                del self._postagens[termo]
+                posicao = bisect.bisect_left(self._vocabulario, termo)
+                if posicao < len(self._vocabulario) and self._vocabulario[posicao] == termo:
+                    del self._vocabulario[posicao]
+
+    def _adicionar(self, id, nome, descricao):
+        frequencias = Counter(tokenizar(nome) + tokenizar(descricao))
+        if not frequencias:
+            return
+        total = sum(frequencias.values())
+        self._documentos[id] = tuple(frequencias)
+        for termo, quantidade in frequencias.items():
+            ids = self._postagens.get(termo)
+            if ids is None:
+                ids = self._postagens[termo] = {}
+                bisect.insort(self._vocabulario, termo)
+            ids[id] = quantidade / total
+
+    def adicionar(self, id, nome, descricao):
+        with self._lock:
+            if self._alterados is not None:
+                self._alterados.add(id)
+            self._remover(id)
+            self._adicionar(id, nome, descricao)
+
+    def remover(self, id):
+        with self._lock:
+            if self._alterados is not None:
+                self._alterados.add(id)
+            self._remover(id)
+
+    def carregar(self, db, lote=5000):
+        """Indexa todos os produtos lendo a tabela em streaming."""
+        with self._lock:
+            self._alterados = set()
+        try:
+            pendentes = []
+            for linha in iterar_consulta(db, "SELECT id, nome, descricao FROM produtos", lote=lote):
+                pendentes.append(linha)
+                if len(pendentes) >= lote:
+                    self._carregar_lote(pendentes)
+                    pendentes = []
+            self._carregar_lote(pendentes)
+        finally:
+            with self._lock:
+                self._alterados = None
+        self.pronto = True
+
+    def _carregar_lote(self, linhas):
+        with self._lock:
+            for linha in linhas:
+                if linha["id"] not in self._alterados:
+                    self._remover(linha["id"])
+                    self._adicionar(linha["id"], linha["nome"], linha["descricao"])
+
+    def _ids_com_prefixo(self, prefixo):
+        ids = {}
+        posicao = bisect.bisect_left(self._vocabulario, prefixo)
+        while posicao < len(self._vocabulario) and self._vocabulario[posicao].startswith(prefixo):
+            for id, peso in self._postagens[self._vocabulario[posicao]].items():
+                ids[id] = max(peso, ids.get(id, 0.0))
+            posicao += 1
+        return ids
+
+    def buscar(self, termo, quantidade, chave=None, desc=True):
+        """Retorna até `quantidade` ids estritamente após `chave` por relevância.
+
+        Cada item é um dict com `relevancia` e `id`; a ordem é (`relevancia`,
+        `id`) decrescente ou crescente conforme `desc`.
+        """
+        termos = tokenizar(termo)
+        if not termos:
+            return []
+        with self._lock:
+            total_documentos = max(len(self._documentos), 1)
+            listas = [self._postagens.get(t, {}) for t in termos[:-1]]
+            listas.append(self._ids_com_prefixo(termos[-1]))
+            listas.sort(key=len)
+            if not listas[0]:
+                return []
+
+            pesos = [math.log(1 + total_documentos / len(ids)) for ids in listas]
+            resultados = []
+            for id in listas[0]:
+                relevancia = 0.0
+                for ids, peso in zip(listas, pesos):
+                    frequencia = ids.get(id)
+                    if frequencia is None:
+                        break
+                    relevancia += frequencia * peso
+                else:
+                    resultados.append((relevancia, id))
+
+        if chave is not None:
+            chave = (float(chave[0]), int(chave[1]))
+            if desc:
+                resultados = [r for r in resultados if r < chave]
+            else:
+                resultados = [r for r in resultados if r > chave]
+        selecionar = heapq.nlargest if desc else heapq.nsmallest
+        return [{"relevancia": r, "id": id} for r, id in selecionar(quantidade, resultados)]
+
+    def estatisticas(self):
+        with self._lock:
+            return {
+                "backend": "memoria",
+                "pronto": self.pronto,
+                "documentos": len(self._documentos),
+                "termos": len(self._vocabulario),
+            }
+
+
+_indice = None
+
+
+def iniciar_indice():
+    """Cria o índice em memória e o carrega em segundo plano, se configurado.
+
+    Até a carga terminar as buscas continuam sendo feitas no MySQL.
+    """
+    global _indice
+    config = get_busca_config()
+    if config['backend'] != 'memoria' or _indice is not None:
+        return _indice
+    _indice = IndiceInvertido()
+
+    def carregar():
+        try:
+            with get_connection() as db:
+                _indice.carregar(db, config['lote_carga'])
+            logger.info(f"Índice de busca carregado: {_indice.estatisticas()['documentos']} produtos")
+        except Exception as e:
+            logger.error(f"Falha ao carregar índice de busca: {str(e)}")
+
+    threading.Thread(target=carregar, name="indice-busca", daemon=True).start()
+    return _indice
+
+
+def get_indice_produtos():
+    return _indice
+
+
+def get_busca_stats():
+    if _indice is None:
+        return {"backend": "mysql"}
+    return _indice.estatisticas()
@@ -1,11 +1,40 @@
-from models.database import get_db
+from models.database import get_connection, iterar_consulta, executar
+from models.log_writer import SQL_INSERIR_LOG, montar_registro, get_audit_writer
 import mysql.connector
 from fastapi import Request
 from typing import Optional
+from datetime import datetime
+from pydantic import BaseModel
+from models.paginacao import (
+    buscar_por_chave, montar_pagina, decodificar_cursor, normalizar_limite, LIMITE_PADRAO
+)
+from models.log_retencao import ler_arquivados, iterar_arquivados, obter_log_arquivado
 import logging
 
 logger = logging.getLogger(__name__)
 
+def obter_ip_origem(request: Optional[Request]):
+    return request.client.host if request and request.client else None
+
+
+def inserir_log_na_transacao(
+    db,
+    tipo_operacao: str,
+    tabela_afetada: str,
+    id_registro: Optional[int] = None,
+    dados_anteriores: Optional[dict] = None,
+    dados_novos: Optional[dict] = None,
+    id_usuario: Optional[int] = None,
+    ip_origem: Optional[str] = None
+):
+    """Insere o log na transação em andamento da conexão, sem commit.
+
+    O registro é confirmado ou desfeito junto com a operação auditada.
+    """
+    executar(db, SQL_INSERIR_LOG, montar_registro(
+        tipo_operacao, tabela_afetada, id_registro, dados_anteriores, dados_novos, id_usuario, ip_origem))
+
+
 def registrar_log(
     tipo_operacao: str,
     tabela_afetada: str,
@@ -17,50 +46,126 @@ def registrar_log(
     db: mysql.connector.MySQLConnection = None
 ):
     try:
+        ip_origem = obter_ip_origem(request)
+        registro = montar_registro(tipo_operacao, tabela_afetada, id_registro,
+                                   dados_anteriores, dados_novos, id_usuario, ip_origem)
+
+        writer = get_audit_writer()
+        if writer is not None:
+            writer.enviar(registro)
+            return
+
         if db is None:
-            db = next(get_db())
-        
-        ip_origem = request.client.host if request else None
-        
-        cursor = db.cursor()
-        cursor.execute(
-            """
-            INSERT INTO logs (
-                tipo_operacao,
-                tabela_afetada,
-                id_registro,
-                dados_anteriores,
-                dados_novos,
-                id_usuario,
-                ip_origem
-            ) VALUES (%s, %s, %s, %s, %s, %s, %s)
-            """,
-            (
-                tipo_operacao,
-                tabela_afetada,
-                id_registro,
-                str(dados_anteriores) if dados_anteriores else None,
-                str(dados_novos) if dados_novos else None,
-                id_usuario,
-                ip_origem
-            )
-        )
-        db.commit()
-        cursor.close()
+            with get_connection() as conn:
+                _inserir_log(conn, registro)
+        else:
+            _inserir_log(db, registro)
     except Exception as e:
         logger.error(f"Falha ao registrar log: {str(e)}")
         # Não falha a operação principal se o log falhar
 
-def obter_logs(db: mysql.connector.MySQLConnection = None):
-    try:
-        if db is None:
-            db = next(get_db())
-        
-        cursor = db.cursor(dictionary=True)
-        cursor.execute("SELECT * FROM logs ORDER BY data_operacao DESC")
-        logs = cursor.fetchall()
-        cursor.close()
-        return logs
-    except Exception as e:
-        logger.error(f"Erro ao obter logs: {str(e)}")
-        return []
\ No newline at end of file
+def _inserir_log(db, registro):
+    cursor = db.cursor()
+    cursor.execute(SQL_INSERIR_LOG, registro)
+    db.commit()
+    cursor.close()
+
+class FiltrosLog(BaseModel):
+    tabela_afetada: Optional[str] = None
+    id_registro: Optional[int] = None
+    tipo_operacao: Optional[str] = None
+    id_usuario: Optional[int] = None
+    ip_origem: Optional[str] = None
+    data_inicio: Optional[datetime] = None
+    data_fim: Optional[datetime] = None
+    arquivados: bool = False
+
+    def condicoes(self):
+        condicoes, params = [], []
+        for campo in ("tabela_afetada", "id_registro", "tipo_operacao", "id_usuario", "ip_origem"):
+            valor = getattr(self, campo)
+            if valor is not None and valor != "":
+                condicoes.append(f"{campo} = %s")
+                params.append(valor)
+        if self.data_inicio:
+            condicoes.append("data_operacao >= %s")
+            params.append(self.data_inicio)
+        if self.data_fim:
+            condicoes.append("data_operacao < %s")
+            params.append(self.data_fim)
+        return condicoes, params
+
+    def ativos(self):
+        return {campo: valor for campo, valor in self.dict().items() if valor not in (None, "", False)}
+
+
+COLUNAS_LISTA_LOG = "id, tipo_operacao, tabela_afetada, id_registro, id_usuario, ip_origem, data_operacao"
+ORDEM_LOG = ["data_operacao", "id"]
+
+
+def consultar_logs(db: mysql.connector.MySQLConnection, filtros: Optional[FiltrosLog] = None,
+                   limite: int = LIMITE_PADRAO, apos: Optional[str] = None, antes: Optional[str] = None):
+    """Lista os logs do mais recente para o mais antigo, paginados por chave.
+
+    Os campos volumosos (`dados_anteriores`/`dados_novos`) ficam de fora da
+    listagem e são carregados sob demanda por `obter_log_by_id`. Com
+    `filtros.arquivados`, a paginação continua pelos arquivos gerados pela
+    retenção, que são sempre mais antigos que as linhas ainda na tabela.
+    """
+    filtros = filtros or FiltrosLog()
+    limite = normalizar_limite(limite)
+    voltando = antes is not None
+    token = antes if voltando else apos
+    chave = decodificar_cursor(token, len(ORDEM_LOG)) if token else None
+    condicoes, params = filtros.condicoes()
+
+    cursor = db.cursor(dictionary=True)
+
+    def buscar_na_tabela(quantidade):
+        return buscar_por_chave(
+            cursor, f"SELECT {COLUNAS_LISTA_LOG} FROM logs", ORDEM_LOG, quantidade, chave,
+            desc=not voltando, condicoes=condicoes, params=params,
+        )
+
+    if not filtros.arquivados:
+        linhas = buscar_na_tabela(limite + 1)
+    elif voltando:
+        linhas = ler_arquivados(filtros, limite + 1, chave, desc=False)
+        if len(linhas) <= limite:
+            linhas += buscar_na_tabela(limite + 1 - len(linhas))
+    else:
+        linhas = buscar_na_tabela(limite + 1)
+        if len(linhas) <= limite:
+            linhas += ler_arquivados(filtros, limite + 1 - len(linhas), chave, desc=True)
+    cursor.close()
+    return montar_pagina(linhas, limite, ORDEM_LOG, voltando, bool(token))
+
+
+def iterar_logs(db: mysql.connector.MySQLConnection, filtros: Optional[FiltrosLog] = None, lote: int = 1000):
+    """Percorre todos os logs filtrados em ordem cronológica, sem materializá-los.
+
+    Com `filtros.arquivados`, os logs arquivados vêm antes das linhas da tabela.
+    """
+    filtros = filtros or FiltrosLog()
+    if filtros.arquivados:
+        yield from iterar_arquivados(filtros)
+    condicoes, params = filtros.condicoes()
+    sql = "SELECT * FROM logs"
+    if condicoes:
+        sql += " WHERE " + " AND ".join(condicoes)
+    sql += " ORDER BY data_operacao, id"
+    yield from iterar_consulta(db, sql, params, lote=lote)
+
+
+def obter_log_by_id(id: int, db: mysql.connector.MySQLConnection, data_operacao: Optional[datetime] = None):
+    cursor = db.cursor(dictionary=True)
+    if data_operacao is None:
+        cursor.execute("SELECT * FROM logs WHERE id = %s", (id,))
+    else:
+        # Com a data, o MySQL consulta apenas a partição do mês
+        cursor.execute("SELECT * FROM logs WHERE id = %s AND data_operacao = %s", (id, data_operacao))
+    log = cursor.fetchone()
+    cursor.close()
+    if log is None and data_operacao is not None:
+        log = obter_log_arquivado(id, data_operacao)
+    return log
@@ -0,0 +1,378 @@
+"""Retenção, particionamento e arquivamento da tabela `logs`.
+
+A tabela é particionada por mês em `data_operacao` (`p202401`, `p202402`, ...,
+mais `pmax`). A manutenção periódica cria as partições dos próximos meses e,
+para cada partição mais antiga que o período de retenção, exporta as linhas
+para `logs-AAAA-MM.ndjson.gz` no diretório de arquivo e remove a partição com
+`DROP PARTITION`, que é instantâneo. Se o mês já tem arquivo (linhas antigas
+gravadas depois do arquivamento, ou retenção reduzida), as novas linhas vão
+para `logs-AAAA-MM.partN.ndjson.gz`, sem sobrescrever o existente.
+`ler_arquivados` lê todas as partes de cada mês para que a consulta de logs
+possa incluir períodos já arquivados.
+
+No SQLite, que não tem partições, os meses expirados são exportados para os
+mesmos arquivos e removidos com `DELETE` por intervalo de datas.
+
+    python -m models.log_retencao      # executa a manutenção uma vez
+"""
+import gzip
+import heapq
+import json
+import logging
+import os
+import re
+import threading
+from collections import deque
+from datetime import date, datetime
+
+from models.database import get_connection, iterar_consulta, get_backend
+from database.config import get_retencao_config
+
+logger = logging.getLogger(__name__)
+
+PADRAO_ARQUIVO = re.compile(r"^logs-(\d{4})-(\d{2})(?:\.part(\d+))?\.ndjson\.gz$")
+CAMPOS_FILTRO = ("tabela_afetada", "id_registro", "tipo_operacao", "id_usuario", "ip_origem")
+
+
+def _somar_meses(ano, mes, meses):
+    total = ano * 12 + (mes - 1) + meses
+    return total // 12, total % 12 + 1
+
+
+def _nome_particao(ano, mes):
+    return f"p{ano:04d}{mes:02d}"
+
+
+def _mes_da_particao(nome):
+    return int(nome[1:5]), int(nome[5:7])
+
+
+def listar_particoes(db):
+    cursor = db.cursor()
+    cursor.execute("""
+        SELECT PARTITION_NAME FROM information_schema.PARTITIONS
+        WHERE TABLE_SCHEMA = DATABASE() AND TABLE_NAME = 'logs' AND PARTITION_NAME IS NOT NULL
+        ORDER BY PARTITION_ORDINAL_POSITION
+    """)
+    nomes = [row[0] for row in cursor.fetchall()]
+    cursor.close()
+    return nomes
+
+
+def garantir_particoes(db, meses_adiante=3):
+    """Divide `pmax` em partições mensais até `meses_adiante` meses à frente.
+
+    Na primeira execução as partições começam no mês do log mais antigo, de
+    modo que o histórico existente também fique particionado.
+    """
+    mensais = [nome for nome in listar_particoes(db) if nome != "pmax"]
+    hoje = date.today()
+    cursor = db.cursor()
+    if mensais:
+        ano, mes = _somar_meses(*_mes_da_particao(mensais[-1]), 1)
+    else:
+        cursor.execute("SELECT MIN(data_operacao) FROM logs")
+        mais_antigo = cursor.fetchone()[0]
+        ano, mes = (mais_antigo.year, mais_antigo.month) if mais_antigo else (hoje.year, hoje.month)
+
+    fim = _somar_meses(hoje.year, hoje.month, meses_adiante)
+    definicoes = []
+    novas = []
+    while (ano, mes) <= fim:
+        limite = _somar_meses(ano, mes, 1)
+        definicoes.append(
+            f"PARTITION {_nome_particao(ano, mes)} VALUES LESS THAN "
+            f"(UNIX_TIMESTAMP('{limite[0]:04d}-{limite[1]:02d}-01 00:00:00'))"
+        )
+        novas.append(_nome_particao(ano, mes))
+        ano, mes = limite
+
+    if definicoes:
+        cursor.execute(
+            "ALTER TABLE logs REORGANIZE PARTITION pmax INTO ("
+            + ", ".join(definicoes)
+            + ", PARTITION pmax VALUES LESS THAN MAXVALUE)"
+        )
+    cursor.close()
+    return novas
+
+
+def _caminho_arquivo(diretorio, ano, mes, parte=1):
+    sufixo = f".part{parte}" if parte > 1 else ""
+    return os.path.join(diretorio, f"logs-{ano:04d}-{mes:02d}{sufixo}.ndjson.gz")
+
+
+def _caminho_livre(diretorio, ano, mes):
+    # A manutenção roda um processo por vez (GET_LOCK / FOR UPDATE), então
+    # ninguém ocupa o nome entre a escolha e o `os.replace`
+    parte = 1
+    while os.path.exists(_caminho_arquivo(diretorio, ano, mes, parte)):
+        parte += 1
+    return _caminho_arquivo(diretorio, ano, mes, parte)
+
+
+def _arquivar_linhas(linhas, diretorio):
+    """Exporta as linhas em um arquivo NDJSON comprimido por mês de dados.
+
+    Um mês que já tem arquivo ganha uma nova parte; os anteriores são mantidos.
+    """
+    os.makedirs(diretorio, exist_ok=True)
+    gerados = []
+    atual = None
+
+    def fechar(atual):
+        arquivo, temporario, final = atual
+        arquivo.close()
+        os.replace(temporario, final)
+        gerados.append(final)
+
+    for linha in linhas:
+        mes = (linha["data_operacao"].year, linha["data_operacao"].month)
+        if atual is None or atual[0] != mes:
+            if atual is not None:
+                fechar(atual[1])
+            final = _caminho_livre(diretorio, *mes)
+            temporario = final + ".tmp"
+            atual = (mes, (gzip.open(temporario, "wt", encoding="utf-8"), temporario, final))
+        atual[1][0].write(json.dumps(linha, default=str, ensure_ascii=False) + "\n")
+    if atual is not None:
+        fechar(atual[1])
+    return gerados
+
+
+def _arquivar_particao(db, nome, diretorio):
+    linhas = iterar_consulta(db, f"SELECT * FROM logs PARTITION ({nome}) ORDER BY data_operacao, id")
+    return _arquivar_linhas(linhas, diretorio)
+
+
+def arquivar_expirados(db, retencao_meses=12, diretorio="arquivo_logs"):
+    hoje = date.today()
+    corte = _somar_meses(hoje.year, hoje.month, -retencao_meses)
+    arquivos = []
+    cursor = db.cursor()
+    for nome in listar_particoes(db):
+        if nome == "pmax" or _mes_da_particao(nome) >= corte:
+            break
+        arquivos.extend(_arquivar_particao(db, nome, diretorio))
+        cursor.execute(f"ALTER TABLE logs DROP PARTITION {nome}")
+        logger.info(f"Partição {nome} arquivada e removida")
+    cursor.close()
+    return arquivos
+
+
+def arquivar_expirados_sqlite(db, retencao_meses=12, diretorio="arquivo_logs"):
+    """Arquiva e remove os logs dos meses expirados no backend SQLite.
+
+    O `FOR UPDATE` toma o escritor antes da leitura: só um processo arquiva
+    por vez e nada é gravado em `logs` entre a exportação e o `DELETE`.
+    """
+    hoje = date.today()
+    corte = datetime(*_somar_meses(hoje.year, hoje.month, -retencao_meses), 1)
+    cursor = db.cursor()
+    try:
+        cursor.execute("SELECT COUNT(*) FROM logs WHERE data_operacao < %s FOR UPDATE", (corte,))
+        if not cursor.fetchone()[0]:
+            db.rollback()
+            return []
+        arquivos = _arquivar_linhas(iterar_consulta(
+            db, "SELECT * FROM logs WHERE data_operacao < %s ORDER BY data_operacao, id", (corte,)), diretorio)
+        cursor.execute("DELETE FROM logs WHERE data_operacao < %s", (corte,))
+        db.commit()
+    except Exception:
+        db.rollback()
+        raise
+    finally:
+        cursor.close()
+    logger.info(f"Logs anteriores a {corte:%Y-%m} arquivados e removidos")
+    return arquivos
+
+
+def executar_manutencao():
+    """Executa uma rodada de manutenção; apenas um worker por vez a executa."""
+    config = get_retencao_config()
+    with get_connection() as db:
+        if get_backend() == 'sqlite':
+            return arquivar_expirados_sqlite(db, config['meses'], config['diretorio_arquivo'])
+        cursor = db.cursor()
+        cursor.execute("SELECT GET_LOCK('logs_retencao', 0)")
+        if cursor.fetchone()[0] != 1:
+            cursor.close()
+            return None
+        try:
+            garantir_particoes(db, config['particoes_adiante'])
+            return arquivar_expirados(db, config['meses'], config['diretorio_arquivo'])
+        finally:
+            cursor.execute("SELECT RELEASE_LOCK('logs_retencao')")
+            cursor.fetchall()
+            cursor.close()
+
+
+def _converter_linha(linha):
+    linha["data_operacao"] = datetime.fromisoformat(linha["data_operacao"])
+    linha["arquivado"] = True
+    return linha
+
+
+def _ler_arquivo(caminho):
+    with gzip.open(caminho, "rt", encoding="utf-8") as arquivo:
+        for linha in arquivo:
+            if linha.strip():
+                yield _converter_linha(json.loads(linha))
+
+
+def _ler_mes(caminhos):
+    # Cada parte está em ordem (`data_operacao`, `id`) e o merge mantém a ordem
+    # no mês. Uma rodada interrompida entre a gravação do arquivo e a remoção
+    # das linhas as exporta de novo na parte seguinte; as repetidas são puladas.
+    if len(caminhos) == 1:
+        yield from _ler_arquivo(caminhos[0])
+        return
+    anterior = None
+    for linha in heapq.merge(*map(_ler_arquivo, caminhos),
+                             key=lambda linha: (linha["data_operacao"], linha["id"])):
+        chave = (linha["data_operacao"], linha["id"])
+        if chave != anterior:
+            yield linha
+        anterior = chave
+
+
+def _arquivos_por_mes(diretorio):
+    """Mapa (ano, mês) -> caminhos das partes do mês, na ordem em que foram gravadas."""
+    if not os.path.isdir(diretorio):
+        return {}
+    partes = {}
+    for nome in os.listdir(diretorio):
+        encontrado = PADRAO_ARQUIVO.match(nome)
+        if encontrado:
+            mes = (int(encontrado.group(1)), int(encontrado.group(2)))
+            partes.setdefault(mes, []).append((int(encontrado.group(3) or 1), os.path.join(diretorio, nome)))
+    return {mes: [caminho for _, caminho in sorted(lista)] for mes, lista in partes.items()}
+
+
+def _corresponde(linha, filtros):
+    for campo in CAMPOS_FILTRO:
+        valor = getattr(filtros, campo)
+        if valor is not None and valor != "" and linha.get(campo) != valor:
+            return False
+    if filtros.data_inicio and linha["data_operacao"] < filtros.data_inicio:
+        return False
+    if filtros.data_fim and linha["data_operacao"] >= filtros.data_fim:
+        return False
+    return True
+
+
+def ler_arquivados(filtros, quantidade, chave=None, desc=True, diretorio=None):
+    """Lê até `quantidade` logs arquivados estritamente após `chave`.
+
+    Segue a mesma ordem (`data_operacao`, `id`) da consulta na tabela; cada
+    arquivo mensal é percorrido em streaming e apenas os arquivos dentro do
+    período filtrado são abertos.
+    """
+    diretorio = diretorio or get_retencao_config()['diretorio_arquivo']
+    if chave is not None:
+        chave = (datetime.fromisoformat(str(chave[0])), int(chave[1]))
+    inicio = (filtros.data_inicio.year, filtros.data_inicio.month) if filtros.data_inicio else None
+    fim = (filtros.data_fim.year, filtros.data_fim.month) if filtros.data_fim else None
+    mes_chave = (chave[0].year, chave[0].month) if chave else None
+
+    resultado = []
+    for mes, caminhos in sorted(_arquivos_por_mes(diretorio).items(), reverse=desc):
+        if (inicio and mes < inicio) or (fim and mes > fim):
+            continue
+        if mes_chave and (mes > mes_chave if desc else mes < mes_chave):
+            continue
+
+        faltam = quantidade - len(resultado)
+        if desc:
+            ultimas = deque(maxlen=faltam)
+            for linha in _ler_mes(caminhos):
+                if chave and (linha["data_operacao"], linha["id"]) >= chave:
+                    break
+                if _corresponde(linha, filtros):
+                    ultimas.append(linha)
+            resultado.extend(reversed(ultimas))
+        else:
+            for linha in _ler_mes(caminhos):
+                if chave and (linha["data_operacao"], linha["id"]) <= chave:
+                    continue
+                if _corresponde(linha, filtros):
+                    resultado.append(linha)
+                    if len(resultado) >= quantidade:
+                        break
+        if len(resultado) >= quantidade:
+            break
+    return resultado
+
+
+def iterar_arquivados(filtros, diretorio=None):
+    """Percorre todos os logs arquivados que atendem aos filtros, do mais antigo ao mais novo."""
+    diretorio = diretorio or get_retencao_config()['diretorio_arquivo']
+    inicio = (filtros.data_inicio.year, filtros.data_inicio.month) if filtros.data_inicio else None
+    fim = (filtros.data_fim.year, filtros.data_fim.month) if filtros.data_fim else None
+    for mes, caminhos in sorted(_arquivos_por_mes(diretorio).items()):
+        if (inicio and mes < inicio) or (fim and mes > fim):
+            continue
+        for linha in _ler_mes(caminhos):
+            if _corresponde(linha, filtros):
+                yield linha
+
+
+def obter_log_arquivado(id, data_operacao, diretorio=None):
+    diretorio = diretorio or get_retencao_config()['diretorio_arquivo']
+    for caminho in _arquivos_por_mes(diretorio).get((data_operacao.year, data_operacao.month), ()):
+        for linha in _ler_arquivo(caminho):
+            if linha["id"] == id:
+                return linha
+    return None
+
+
+_parar = threading.Event()
+_thread = None
+
+
+def _executar_periodicamente(intervalo):
+    while not _parar.is_set():
+        try:
+            executar_manutencao()
+        except Exception as e:
+            logger.error(f"Falha na manutenção dos logs: {str(e)}")
+        _parar.wait(intervalo)
+
+
+def iniciar_retencao():
+    global _thread
+    config = get_retencao_config()
+    if not config['ativa'] or _thread is not None:
+        return
+    _parar.clear()
+    _thread = threading.Thread(
+        target=_executar_periodicamente, args=(config['intervalo'],),
+        name="logs-retencao", daemon=True)
+    _thread.start()
+
+
+def encerrar_retencao(timeout=10.0):
+    """Sinaliza a parada e espera no máximo `timeout` segundos pela rodada em curso.
+
+    A thread é daemon: se uma exportação longa não terminar a tempo, o
+    encerramento segue e ela é interrompida junto com o processo; a partição
+    só é removida depois do arquivo gravado, então a rodada é refeita na
+    próxima inicialização.
+    """
+    global _thread
+    if _thread is not None:
+        _parar.set()
+        _thread.join(timeout)
+        if _thread.is_alive():
+            logger.warning("Manutenção dos logs ainda em andamento no encerramento; não aguardada")
+        _thread = None
+
+
+if __name__ == "__main__":
+    arquivos = executar_manutencao()
+    if arquivos is None:
+        print("Manutenção já em execução em outro processo")
+    else:
+        for caminho in arquivos:
+            print(f"Arquivado: {caminho}")
+        print("Manutenção concluída")
@@ -0,0 +1,291 @@
+"""Gravação assíncrona e em lote dos registros de auditoria.
+
+`registrar_log` apenas enfileira o registro; uma thread dedicada esvazia a
+fila e grava com `executemany` em lotes de até `tamanho_lote` registros ou a
+cada `intervalo` segundos, o que vier primeiro. Quando a fila enche, a
+política configurada decide entre esperar (`block`), descartar (`drop`) ou
+gravar em um arquivo NDJSON local (`spill`), que é reprocessado na próxima
+inicialização.
+"""
+import json
+import logging
+import os
+import queue
+import threading
+import time
+from datetime import datetime
+from itertools import chain, islice
+
+from models.database import get_connection, get_backend
+from database.config import get_auditoria_config
+
+logger = logging.getLogger(__name__)
+
+SQL_INSERIR_LOG = """
+    INSERT INTO logs (
+        tipo_operacao,
+        tabela_afetada,
+        id_registro,
+        dados_anteriores,
+        dados_novos,
+        id_usuario,
+        ip_origem,
+        data_operacao
+    ) VALUES (%s, %s, %s, %s, %s, %s, %s, %s)
+"""
+
+
+def _serializar(valor):
+    # Mesmo formato das datas no SQLite (sempre com microssegundos), para que
+    # os registros reprocessados ordenem e paginem junto com os demais
+    if isinstance(valor, datetime):
+        return valor.isoformat(" ", "microseconds")
+    return str(valor)
+
+
+class AuditWriter:
+    def __init__(self, tamanho_fila=10000, tamanho_lote=200, intervalo=1.0,
+                 politica="block", timeout_bloqueio=0.5, arquivo_spill="audit_spill.ndjson"):
+        self.tamanho_lote = tamanho_lote
+        self.intervalo = intervalo
+        self.politica = politica
+        self.timeout_bloqueio = timeout_bloqueio
+        self.arquivo_spill = arquivo_spill
+
+        self._fila = queue.Queue(maxsize=tamanho_fila)
+        self._parar = threading.Event()
+        self._thread = None
+        self._spill_lock = threading.Lock()
+        # Os contadores são atualizados pelas requisições e pela thread de gravação
+        self._lock = threading.Lock()
+
+        self._enfileirados = 0
+        self._gravados = 0
+        self._lotes = 0
+        self._descartados = 0
+        self._derramados = 0
+        self._falhas = 0
+
+    def iniciar(self):
+        if self._thread is not None:
+            return
+        self._reprocessar_spill()
+        self._parar.clear()
+        self._thread = threading.Thread(target=self._executar, name="audit-writer", daemon=True)
+        self._thread.start()
+
+    def parar(self, timeout=10.0):
+        """Para a thread depois de gravar tudo o que ainda está na fila.
+
+        O que não for gravado em `timeout` segundos vai para o arquivo de
+        spill (reprocessado na próxima inicialização) ou, sem ele, é contado
+        como descartado e registrado no log.
+        """
+        if self._thread is None:
+            return
+        self._parar.set()
+        self._thread.join(timeout)
+        if self._thread.is_alive():
+            logger.warning("Gravação de logs de auditoria ainda em andamento no encerramento")
+        self._thread = None
+
+        restantes = []
+        while True:
+            try:
+                restantes.append(self._fila.get_nowait())
+            except queue.Empty:
+                break
+        if not restantes:
+            return
+        if self.arquivo_spill:
+            self._derramar(restantes)
+            logger.warning(f"{len(restantes)} logs de auditoria não gravados no encerramento; "
+                           f"salvos em {self.arquivo_spill}")
+        else:
+            with self._lock:
+                self._descartados += len(restantes)
+            logger.error(f"{len(restantes)} logs de auditoria não gravados no encerramento foram perdidos")
+
+    def enviar(self, registro):
+        try:
+            self._fila.put_nowait(registro)
+            with self._lock:
+                self._enfileirados += 1
+            return True
+        except queue.Full:
+            pass
+
+        if self.politica == "block":
+            try:
+                self._fila.put(registro, timeout=self.timeout_bloqueio)
+                with self._lock:
+                    self._enfileirados += 1
+                return True
+            except queue.Full:
+                logger.warning("Fila de auditoria cheia; registro descartado")
+        elif self.politica == "spill":
+            self._derramar([registro])
+            return True
+
+        with self._lock:
+            self._descartados += 1
+        return False
+
+    def _coletar_lote(self):
+        try:
+            lote = [self._fila.get(timeout=self.intervalo)]
+        except queue.Empty:
+            return []
+        prazo = time.monotonic() + self.intervalo
+        while len(lote) < self.tamanho_lote:
+            restante = prazo - time.monotonic()
+            try:
+                if restante <= 0 or self._parar.is_set():
+                    lote.append(self._fila.get_nowait())
+                else:
+                    lote.append(self._fila.get(timeout=restante))
+            except queue.Empty:
+                break
+        return lote
+
+    def _executar(self):
+        while not (self._parar.is_set() and self._fila.empty()):
+            lote = self._coletar_lote()
+            if lote:
+                self._gravar(lote)
+
+    def _inserir(self, lote):
+        with get_connection() as conn:
+            cursor = conn.cursor()
+            cursor.executemany(SQL_INSERIR_LOG, lote)
+            conn.commit()
+            cursor.close()
+        with self._lock:
+            self._gravados += len(lote)
+            self._lotes += 1
+
+    def _gravar(self, lote):
+        try:
+            self._inserir(lote)
+        except Exception as e:
+            with self._lock:
+                self._falhas += 1
+            logger.error(f"Falha ao gravar lote de {len(lote)} logs: {str(e)}")
+            if self.politica == "spill":
+                self._derramar(lote)
+            else:
+                with self._lock:
+                    self._descartados += len(lote)
+
+    def _anexar_spill(self, linhas):
+        with self._spill_lock:
+            with open(self.arquivo_spill, "a", encoding="utf-8") as arquivo:
+                arquivo.writelines(linhas)
+
+    def _derramar(self, registros):
+        self._anexar_spill(json.dumps(registro, default=_serializar) + "\n" for registro in registros)
+        with self._lock:
+            self._derramados += len(registros)
+
+    def _regravar(self, linhas):
+        lote = []
+        for linha in linhas:
+            *campos, data_operacao = json.loads(linha)
+            lote.append((*campos, datetime.fromisoformat(data_operacao)))
+        try:
+            self._inserir(lote)
+            return True
+        except Exception as e:
+            with self._lock:
+                self._falhas += 1
+            logger.error(f"Falha ao regravar logs de {self.arquivo_spill}; mantidos para a próxima "
+                         f"inicialização: {str(e)}")
+            return False
+
+    def _reprocessar_spill(self):
+        """Grava os registros derramados em execuções anteriores.
+
+        Independe da política: no primeiro lote que falhar (banco ainda fora
+        do ar, por exemplo) ele e o restante voltam para o arquivo de spill.
+        """
+        if not self.arquivo_spill or not os.path.exists(self.arquivo_spill):
+            return
+        processando = self.arquivo_spill + ".processando"
+        with self._spill_lock:
+            os.replace(self.arquivo_spill, processando)
+        with open(processando, encoding="utf-8") as arquivo:
+            linhas = (linha for linha in arquivo if linha.strip())
+            for lote in iter(lambda: list(islice(linhas, self.tamanho_lote)), []):
+                if not self._regravar(lote):
+                    self._anexar_spill(chain(lote, linhas))
+                    break
+        os.remove(processando)
+
+    def estatisticas(self):
+        with self._lock:
+            return {
+                "politica": self.politica,
+                "na_fila": self._fila.qsize(),
+                "capacidade": self._fila.maxsize,
+                "enfileirados": self._enfileirados,
+                "gravados": self._gravados,
+                "lotes": self._lotes,
+                "descartados": self._descartados,
+                "derramados": self._derramados,
+                "falhas": self._falhas,
+            }
+
+
+_writer = None
+
+
+def _data_operacao():
+    agora = datetime.now()
+    if get_backend() == "mysql":
+        # `logs.data_operacao` fica em TIMESTAMP sem fração no MySQL: a
+        # partição usa UNIX_TIMESTAMP(data_operacao), que precisa ser inteiro.
+        # O MySQL arredondaria (23:59:59.6 iria para o mês seguinte), então
+        # os microssegundos são descartados aqui.
+        return agora.replace(microsecond=0)
+    return agora
+
+
+def montar_registro(tipo_operacao, tabela_afetada, id_registro, dados_anteriores,
+                    dados_novos, id_usuario, ip_origem):
+    return (
+        tipo_operacao,
+        tabela_afetada,
+        id_registro,
+        str(dados_anteriores) if dados_anteriores else None,
+        str(dados_novos) if dados_novos else None,
+        id_usuario,
+        ip_origem,
+        _data_operacao(),
+    )
+
+
+def iniciar_auditoria():
+    global _writer
+    config = get_auditoria_config()
+    if not config.pop('assincrono') or _writer is not None:
+        return _writer
+    _writer = AuditWriter(**config)
+    _writer.iniciar()
+    return _writer
+
+
+def encerrar_auditoria():
+    global _writer
+    if _writer is not None:
+        _writer.parar()
+        _writer = None
+
+
+def get_audit_writer():
+    return _writer
+
+
+def get_auditoria_stats():
+    if _writer is None:
+        return {}
+    return _writer.estatisticas()
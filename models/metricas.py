@@ -0,0 +1,486 @@
+"""Métricas de requisições, consultas e templates no formato do Prometheus.
+
+Contadores e histogramas guardam os valores por thread: cada thread só
+incrementa a própria lista, então o caminho quente não usa lock, e a leitura
+(`gerar_texto`, servido em `/metrics`) soma as listas de todas as threads.
+As séries de cada combinação de rótulos são criadas uma única vez e ficam em
+cache pela tupla de valores; quem observa com frequência guarda a série.
+
+- `MetricasMiddleware`: latência por rota, requisições em andamento e status
+- `ConexaoMedida`: latência e linhas retornadas por instrução SQL, aplicada
+  em `models.database.get_connection`; a espera no pool é medida no próprio pool.
+  É também o ponto em que as instruções lentas vão para `models.consultas_lentas`
+- `instrumentar_templates`: tempo de renderização por template
+"""
+import bisect
+import logging
+import re
+import threading
+import time
+from functools import lru_cache
+
+import jinja2
+
+from database.config import get_metricas_config
+from models import consultas_lentas
+
+LIMITES_HTTP = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+LIMITES_DB = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5)
+
+
+def _escapar(valor):
+    return str(valor).replace("\\", "\\\\").replace("\"", "\\\"").replace("\n", "\\n")
+
+
+def _formatar_rotulos(nomes, valores, extra=""):
+    pares = [f'{nome}="{_escapar(valor)}"' for nome, valor in zip(nomes, valores)]
+    if extra:
+        pares.append(extra)
+    return "{" + ",".join(pares) + "}" if pares else ""
+
+
+def _formatar_numero(valor):
+    if isinstance(valor, float) and valor.is_integer():
+        return str(int(valor))
+    return repr(valor) if isinstance(valor, float) else str(valor)
+
+
+class _ValoresPorThread:
+    """Uma lista de valores por thread; a soma é feita só na leitura."""
+
+    def __init__(self, tamanho):
+        self._tamanho = tamanho
+        self._local = threading.local()
+        self._listas = []
+        self._encerradas = [0] * tamanho
+        # Só para registrar threads novas e recolher as que terminaram
+        self._lock = threading.Lock()
+
+    def local(self):
+        try:
+            return self._local.valores
+        except AttributeError:
+            valores = self._local.valores = [0] * self._tamanho
+            with self._lock:
+                self._listas.append((threading.current_thread(), valores))
+            return valores
+
+    def somar(self):
+        with self._lock:
+            vivas = []
+            for thread, valores in self._listas:
+                if thread.is_alive():
+                    vivas.append((thread, valores))
+                else:
+                    # Threads do pool do anyio terminam quando ociosas
+                    for i, valor in enumerate(valores):
+                        self._encerradas[i] += valor
+            self._listas = vivas
+            total = list(self._encerradas)
+            for _, valores in vivas:
+                for i, valor in enumerate(valores):
+                    total[i] += valor
+        return total
+
+
+class SerieContador:
+    def __init__(self, rotulos):
+        self.rotulos = rotulos
+        self._valores = _ValoresPorThread(1)
+
+    def incrementar(self, valor=1):
+        self._valores.local()[0] += valor
+
+    def valor(self):
+        return self._valores.somar()[0]
+
+
+class SerieHistograma:
+    def __init__(self, rotulos, limites):
+        self.rotulos = rotulos
+        self.limites = limites
+        # Uma posição por faixa, mais +Inf e a soma
+        self._valores = _ValoresPorThread(len(limites) + 2)
+
+    def observar(self, valor):
+        valores = self._valores.local()
+        valores[bisect.bisect_left(self.limites, valor)] += 1
+        valores[-1] += valor
+
+    def valores(self):
+        return self._valores.somar()
+
+
+class _Metrica:
+    tipo = None
+
+    def __init__(self, nome, ajuda, rotulos=()):
+        self.nome = nome
+        self.ajuda = ajuda
+        self.rotulos = tuple(rotulos)
+        self._series = {}
+        self._lock = threading.Lock()
+
+    def _criar_serie(self, valores):
+        raise NotImplementedError
+
+    def serie(self, *valores):
+        serie = self._series.get(valores)
+        if serie is None:
+            with self._lock:
+                serie = self._series.get(valores)
+                if serie is None:
+                    serie = self._series[valores] = self._criar_serie(valores)
+        return serie
+
+    def linhas(self):
+        yield f"# HELP {self.nome} {self.ajuda}"
+        yield f"# TYPE {self.nome} {self.tipo}"
+        for serie in list(self._series.values()):
+            yield from self._linhas_serie(serie)
+
+
+class Contador(_Metrica):
+    tipo = "counter"
+
+    def _criar_serie(self, valores):
+        return SerieContador(_formatar_rotulos(self.rotulos, valores))
+
+    def _linhas_serie(self, serie):
+        yield f"{self.nome}{serie.rotulos} {_formatar_numero(serie.valor())}"
+
+
+class Medidor(_Metrica):
+    """Valor que sobe e desce (`incrementar(-1)`), como requisições em andamento."""
+
+    tipo = "gauge"
+    _criar_serie = Contador._criar_serie
+    _linhas_serie = Contador._linhas_serie
+
+
+class Histograma(_Metrica):
+    tipo = "histogram"
+
+    def __init__(self, nome, ajuda, rotulos=(), limites=LIMITES_HTTP):
+        super().__init__(nome, ajuda, rotulos)
+        self.limites = tuple(limites)
+
+    def _criar_serie(self, valores):
+        serie = SerieHistograma(_formatar_rotulos(self.rotulos, valores), self.limites)
+        serie.rotulos_faixas = [
+            _formatar_rotulos(self.rotulos, valores, f'le="{_formatar_numero(float(limite))}"')
+            for limite in self.limites
+        ] + [_formatar_rotulos(self.rotulos, valores, 'le="+Inf"')]
+        return serie
+
+    def _linhas_serie(self, serie):
+        valores = serie.valores()
+        acumulado = 0
+        for rotulos, quantidade in zip(serie.rotulos_faixas, valores[:-1]):
+            acumulado += quantidade
+            yield f"{self.nome}_bucket{rotulos} {acumulado}"
+        yield f"{self.nome}_sum{serie.rotulos} {_formatar_numero(float(valores[-1]))}"
+        yield f"{self.nome}_count{serie.rotulos} {acumulado}"
+
+
+_metricas = []
+_coletores = []
+
+
+def registrar(metrica):
+    _metricas.append(metrica)
+    return metrica
+
+
+def registrar_coletor(funcao):
+    """Registra uma função chamada a cada leitura que devolve linhas prontas."""
+    _coletores.append(funcao)
+    return funcao
+
+
+def gerar_texto():
+    linhas = []
+    for metrica in _metricas:
+        linhas.extend(metrica.linhas())
+    for coletor in _coletores:
+        linhas.extend(coletor())
+    return "\n".join(linhas) + "\n"
+
+
+REQUISICOES_ANDAMENTO = registrar(Medidor(
+    "http_requisicoes_em_andamento", "Requisições HTTP sendo atendidas"))
+REQUISICAO_DURACAO = registrar(Histograma(
+    "http_requisicao_duracao_segundos", "Latência das requisições por rota",
+    ("metodo", "rota")))
+RESPOSTAS = registrar(Contador(
+    "http_respostas_total", "Respostas por rota e status", ("metodo", "rota", "status")))
+CONSULTA_DURACAO = registrar(Histograma(
+    "db_consulta_duracao_segundos", "Latência por instrução SQL (comando e tabela)",
+    ("consulta",), LIMITES_DB))
+LINHAS_RETORNADAS = registrar(Contador(
+    "db_linhas_retornadas_total", "Linhas lidas por instrução SQL", ("consulta",)))
+ESPERA_POOL = registrar(Histograma(
+    "db_pool_espera_segundos", "Espera para obter uma conexão do pool", (), LIMITES_DB))
+RENDER_DURACAO = registrar(Histograma(
+    "template_render_duracao_segundos", "Tempo de renderização por template",
+    ("template",), LIMITES_DB))
+ERROS_REGISTRADOS = registrar(Contador(
+    "app_erros_registrados_total", "Mensagens de log com nível ERROR ou acima", ("logger",)))
+
+
+@registrar_coletor
+def _estado_pool():
+    from models.database import get_pool_stats
+
+    estatisticas = get_pool_stats()
+    for chave in ("abertas", "em_uso", "ociosas", "aguardando"):
+        if chave in estatisticas:
+            yield f"# TYPE db_pool_conexoes_{chave} gauge"
+            yield f"db_pool_conexoes_{chave} {estatisticas[chave]}"
+
+
+# --- Requisições -----------------------------------------------------------
+
+class MetricasMiddleware:
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        status = 500
+
+        async def enviar(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+            await send(message)
+
+        andamento = REQUISICOES_ANDAMENTO.serie()
+        andamento.incrementar()
+        inicio = time.perf_counter()
+        try:
+            await self.app(scope, receive, enviar)
+        finally:
+            duracao = time.perf_counter() - inicio
+            andamento.incrementar(-1)
+            # Só rotas conhecidas viram rótulo: caminhos com ids ou 404s
+            # criariam uma série por URL.
+            rota = scope.get("route")
+            rota = getattr(rota, "path", None) or "outras"
+            metodo = scope["method"]
+            REQUISICAO_DURACAO.serie(metodo, rota).observar(duracao)
+            RESPOSTAS.serie(metodo, rota, status).incrementar()
+
+
+# --- Banco -----------------------------------------------------------------
+
+_RE_TABELA = re.compile(r"\b(?:FROM|INTO|UPDATE|JOIN)\s+`?(\w+)", re.IGNORECASE)
+
+
+@lru_cache(maxsize=1024)
+def rotulo_consulta(sql):
+    """Comando e primeira tabela da instrução, como `SELECT produtos`."""
+    palavras = sql.split(None, 1)
+    comando = palavras[0].upper() if palavras else ""
+    tabela = _RE_TABELA.search(sql)
+    return f"{comando} {tabela.group(1)}" if tabela else comando
+
+
+class CursorMedido:
+    """Mede cada instrução do `execute` até o resultado ser lido por inteiro.
+
+    Com cursores não bufferizados (o padrão do mysql.connector) as linhas
+    chegam do servidor nos `fetch*`; a duração soma o `execute` e as leituras,
+    e a instrução só é concluída (histograma e log de consultas lentas)
+    quando a conexão não tem mais resultado pendente, ou no `close`/próximo
+    `execute`. Assim o log de consultas lentas encontra a conexão livre para
+    o `EXPLAIN` e para a consulta ao `performance_schema`.
+    """
+
+    def __init__(self, cursor, conexao):
+        self._cursor = cursor
+        self._conexao = conexao
+        self._linhas = None
+        self._pendente = None
+
+    def _concluir(self):
+        pendente, self._pendente = self._pendente, None
+        if pendente is None:
+            return
+        rotulo, sql, params, lote, duracao = pendente
+        CONSULTA_DURACAO.serie(rotulo).observar(duracao)
+        if duracao >= consultas_lentas.limite_segundos():
+            consultas_lentas.registrar(self._conexao, self._cursor, sql, params, duracao, lote)
+
+    def _executar(self, metodo, sql, args, kwargs, lote=False):
+        # Instrução anterior deste cursor que não foi lida até o fim
+        self._concluir()
+        rotulo = rotulo_consulta(sql)
+        inicio = time.perf_counter()
+        try:
+            return metodo(sql, *args, **kwargs)
+        finally:
+            params = args[0] if args else next(iter(kwargs.values()), None)
+            self._pendente = [rotulo, sql, params, lote, time.perf_counter() - inicio]
+            self._linhas = LINHAS_RETORNADAS.serie(rotulo)
+            if not consultas_lentas.resultado_pendente(self._conexao):
+                self._concluir()
+
+    def _ler(self, metodo, *args, **kwargs):
+        inicio = time.perf_counter()
+        try:
+            return metodo(*args, **kwargs)
+        finally:
+            if self._pendente is not None:
+                self._pendente[4] += time.perf_counter() - inicio
+                if not consultas_lentas.resultado_pendente(self._conexao):
+                    self._concluir()
+
+    def execute(self, sql, *args, **kwargs):
+        return self._executar(self._cursor.execute, sql, args, kwargs)
+
+    def executemany(self, sql, *args, **kwargs):
+        return self._executar(self._cursor.executemany, sql, args, kwargs, lote=True)
+
+    def _contar(self, quantidade):
+        if self._linhas is not None and quantidade:
+            self._linhas.incrementar(quantidade)
+
+    def fetchone(self):
+        linha = self._ler(self._cursor.fetchone)
+        self._contar(linha is not None)
+        return linha
+
+    def fetchmany(self, *args, **kwargs):
+        linhas = self._ler(self._cursor.fetchmany, *args, **kwargs)
+        self._contar(len(linhas))
+        return linhas
+
+    def fetchall(self):
+        linhas = self._ler(self._cursor.fetchall)
+        self._contar(len(linhas))
+        return linhas
+
+    def __iter__(self):
+        while True:
+            linha = self.fetchone()
+            if linha is None:
+                return
+            yield linha
+
+    def close(self):
+        try:
+            return self._cursor.close()
+        finally:
+            self._concluir()
+
+    def __getattr__(self, nome):
+        return getattr(self._cursor, nome)
+
+
+class ConexaoMedida:
+    def __init__(self, conexao):
+        self._conexao = conexao
+
+    def cursor(self, *args, **kwargs):
+        return CursorMedido(self._conexao.cursor(*args, **kwargs), self._conexao)
+
+    def envolver_cursor(self, cursor):
+        """Mede um cursor criado fora desta conexão (ver `models.database.executar`)."""
+        envolver = getattr(self._conexao, "envolver_cursor", None)
+        if envolver is not None:
+            cursor = envolver(cursor)
+        return CursorMedido(cursor, self._conexao)
+
+    def __getattr__(self, nome):
+        return getattr(self._conexao, nome)
+
+
+@lru_cache(maxsize=None)
+def _medir_conexoes():
+    return get_metricas_config()['ativas'] or consultas_lentas.get_registro_consultas() is not None
+
+
+def medir_conexao(conexao):
+    return ConexaoMedida(conexao) if _medir_conexoes() else conexao
+
+
+def observar_espera_pool(segundos):
+    ESPERA_POOL.serie().observar(segundos)
+
+
+# --- Templates -------------------------------------------------------------
+
+class TemplateMedido(jinja2.Template):
+    _serie_render = None
+
+    def _serie(self):
+        # O ambiente guarda o template em cache: a série é resolvida uma vez
+        if self._serie_render is None:
+            self._serie_render = RENDER_DURACAO.serie(self.name or "<string>")
+        return self._serie_render
+
+    def render(self, *args, **kwargs):
+        inicio = time.perf_counter()
+        try:
+            return super().render(*args, **kwargs)
+        finally:
+            self._serie().observar(time.perf_counter() - inicio)
+
+    def generate(self, *args, **kwargs):
+        # Em streaming mede só o trabalho do template, não a espera pelo cliente
+        serie = self._serie()
+        fragmentos = super().generate(*args, **kwargs)
+        total = 0.0
+        try:
+            while True:
+                inicio = time.perf_counter()
+                try:
+                    fragmento = next(fragmentos)
+                except StopIteration:
+                    total += time.perf_counter() - inicio
+                    return
+                total += time.perf_counter() - inicio
+                yield fragmento
+        finally:
+            serie.observar(total)
+
+
+def observar_render(template, segundos):
+    """Registra uma renderização feita fora de `render`/`generate` (ver `controllers.cache_http`)."""
+    if isinstance(template, TemplateMedido):
+        template._serie().observar(segundos)
+
+
+def instrumentar_templates(templates):
+    """Faz os templates carregados por este `Jinja2Templates` medirem a renderização."""
+    if get_metricas_config()['ativas']:
+        templates.env.template_class = TemplateMedido
+    return templates
+
+
+# --- Logs de erro ----------------------------------------------------------
+
+class ContadorErros(logging.Handler):
+    def __init__(self):
+        super().__init__(level=logging.ERROR)
+
+    def emit(self, record):
+        ERROS_REGISTRADOS.serie(record.name).incrementar()
+
+
+def iniciar_metricas():
+    if not get_metricas_config()['ativas']:
+        return
+    raiz = logging.getLogger()
+    if any(isinstance(handler, ContadorErros) for handler in raiz.handlers):
+        return
+    if not raiz.handlers:
+        # Sem handlers o logging escreve avisos e erros no stderr; com o
+        # contador instalado isso deixaria de acontecer.
+        raiz.addHandler(logging.StreamHandler())
+        raiz.handlers[0].setLevel(logging.WARNING)
+    raiz.addHandler(ContadorErros())
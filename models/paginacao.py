@@ -0,0 +1,109 @@
+"""Paginação por chave (keyset) compartilhada pelas listagens.
+
+Em vez de OFFSET, cada página continua a partir da chave de ordenação da
+última linha exibida (`WHERE (nome, id) > (%s, %s) ORDER BY nome, id LIMIT n`),
+de modo que o custo de cada página não cresce com a posição na tabela.
+A última coluna da ordenação deve ser única para que a ordem seja estável.
+"""
+import base64
+import json
+from datetime import datetime
+
+LIMITE_PADRAO = 20
+LIMITE_MAXIMO = 100
+
+
+def normalizar_limite(limite):
+    if not limite:
+        return LIMITE_PADRAO
+    return max(1, min(int(limite), LIMITE_MAXIMO))
+
+
+def _serializar(valor):
+    # Datas sempre com microssegundos, no mesmo formato gravado pelo SQLite,
+    # que compara o valor do cursor como texto; o MySQL converte para data.
+    if isinstance(valor, datetime):
+        return valor.isoformat(" ", "microseconds")
+    return str(valor)
+
+
+def codificar_cursor(valores):
+    dados = json.dumps(list(valores), default=_serializar, separators=(",", ":")).encode()
+    return base64.urlsafe_b64encode(dados).decode().rstrip("=")
+
+
+def decodificar_cursor(token, tamanho):
+    try:
+        dados = base64.urlsafe_b64decode(token + "=" * (-len(token) % 4))
+        valores = json.loads(dados)
+    except (ValueError, TypeError):
+        raise ValueError("Cursor de paginação inválido")
+    if not isinstance(valores, list) or len(valores) != tamanho:
+        raise ValueError("Cursor de paginação inválido")
+    return valores
+
+
+def buscar_por_chave(cursor, select, colunas_ordem, quantidade, chave=None, desc=False,
+                     condicoes=None, params=()):
+    """Busca até `quantidade` linhas estritamente após `chave` na ordem pedida."""
+    condicoes = list(condicoes or [])
+    valores = list(params)
+    if chave is not None:
+        colunas = ", ".join(colunas_ordem)
+        marcadores = ", ".join(["%s"] * len(colunas_ordem))
+        condicoes.append(f"({colunas}) {'<' if desc else '>'} ({marcadores})")
+        valores.extend(chave)
+
+    sql = select
+    if condicoes:
+        sql += " WHERE " + " AND ".join(condicoes)
+    direcao = "DESC" if desc else "ASC"
+    sql += " ORDER BY " + ", ".join(f"{c} {direcao}" for c in colunas_ordem)
+    sql += " LIMIT %s"
+    valores.append(quantidade)
+
+    cursor.execute(sql, valores)
+    return cursor.fetchall()
+
+
+def montar_pagina(linhas, limite, colunas_ordem, voltando, com_cursor):
+    """Monta a página a partir de até `limite + 1` linhas na ordem da busca."""
+    ha_mais = len(linhas) > limite
+    linhas = linhas[:limite]
+    if voltando:
+        linhas.reverse()
+
+    pagina = {"itens": linhas, "limite": limite, "proximo": None, "anterior": None}
+    if not linhas:
+        return pagina
+
+    def chave_de(linha):
+        return codificar_cursor(linha[c] for c in colunas_ordem)
+
+    if voltando:
+        pagina["proximo"] = chave_de(linhas[-1])
+        pagina["anterior"] = chave_de(linhas[0]) if ha_mais else None
+    else:
+        pagina["proximo"] = chave_de(linhas[-1]) if ha_mais else None
+        pagina["anterior"] = chave_de(linhas[0]) if com_cursor else None
+    return pagina
+
+
+def paginar(cursor, select, colunas_ordem, limite=LIMITE_PADRAO, apos=None, antes=None,
+            condicoes=None, params=(), descendente=False):
+    """Executa `select` paginado por `colunas_ordem` e retorna a página.
+
+    O retorno é um dict com `itens`, `limite` e os cursores `proximo` e
+    `anterior` (None quando não há página naquela direção).
+    """
+    limite = normalizar_limite(limite)
+    voltando = antes is not None
+    token = antes if voltando else apos
+    chave = decodificar_cursor(token, len(colunas_ordem)) if token else None
+
+    linhas = buscar_por_chave(
+        cursor, select, colunas_ordem, limite + 1, chave,
+        desc=descendente != voltando, condicoes=condicoes, params=params,
+    )
+    cursor.close()
+    return montar_pagina(linhas, limite, colunas_ordem, voltando, bool(token))
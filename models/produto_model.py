@@ -1,6 +1,11 @@
-from pydantic import BaseModel, Field
-from typing import Optional
-from models.database import get_db
+from pydantic import BaseModel, Field, validator
+from typing import List, Optional
+from datetime import datetime
+from models.database import get_db, iterar_consulta, get_backend, executar, consultar_um, consultar_todos
+from models.paginacao import paginar, montar_pagina, normalizar_limite, decodificar_cursor, LIMITE_PADRAO
+from models.cache import obter_ou_carregar, invalidar
+from models.indice_busca import get_indice_produtos, tokenizar
+from models.log_model import inserir_log_na_transacao
 import mysql.connector
 
 
@@ -22,40 +27,304 @@ class Produto(ProdutoBase):
         from_attributes = True
 
 
+class AjusteEstoque(BaseModel):
+    id: int
+    quantidade: int
+
+    @validator("quantidade")
+    def quantidade_diferente_de_zero(cls, valor):
+        if valor == 0:
+            raise ValueError("A quantidade do ajuste não pode ser zero")
+        return valor
+
+
+class EstoqueInsuficienteError(ValueError):
+    def __init__(self, id: int):
+        super().__init__(f"Estoque insuficiente ou produto inexistente: {id}")
+        self.id = id
+
+
+class ConflitoVersaoError(ValueError):
+    def __init__(self, id: int):
+        super().__init__(f"O produto {id} foi alterado por outra pessoa; recarregue e tente novamente")
+        self.id = id
+
+
+# Instruções de forma fixa, executadas como instruções preparadas
+# (`models.database.executar`); as de forma variável (paginação, busca,
+# listas de ids) continuam no protocolo de texto.
+SQL_PRODUTO_POR_ID = "SELECT * FROM produtos WHERE id = %s"
+SQL_TODOS_PRODUTOS = "SELECT * FROM produtos"
+SQL_INSERIR_PRODUTO = "INSERT INTO produtos (nome, descricao, preco, estoque) VALUES (%s, %s, %s, %s)"
+SQL_BLOQUEAR_PRODUTO = "SELECT nome, descricao, preco, estoque, updated_at FROM produtos WHERE id = %s FOR UPDATE"
+SQL_ATUALIZAR_PRODUTO = "UPDATE produtos SET nome=%s, descricao=%s, preco=%s, estoque=%s WHERE id=%s"
+SQL_RETIRAR_ESTOQUE = "UPDATE produtos SET estoque = estoque - %s WHERE id = %s AND estoque >= %s"
+SQL_REPOR_ESTOQUE = "UPDATE produtos SET estoque = estoque + %s WHERE id = %s"
+SQL_DELETAR_PRODUTO = "DELETE FROM produtos WHERE id = %s"
+
+
 def get_produto_by_id(id: int, db: mysql.connector.MySQLConnection):
-    cursor = db.cursor(dictionary=True)
-    cursor.execute("SELECT * FROM produtos WHERE id = %s", (id,))
-    return cursor.fetchone()
+    def carregar():
+        return consultar_um(db, SQL_PRODUTO_POR_ID, (id,))
+    return obter_ou_carregar(f"produto:{id}", carregar)
 
 
 def get_all_produtos(db: mysql.connector.MySQLConnection):
+    return consultar_todos(db, SQL_TODOS_PRODUTOS)
+
+
+ORDENACOES_PRODUTO = {
+    "id": ["id"],
+    "nome": ["nome", "id"],
+    "preco": ["preco", "id"],
+    "estoque": ["estoque", "id"],
+}
+
+
+def listar_produtos_paginado(db: mysql.connector.MySQLConnection, limite: int = LIMITE_PADRAO,
+                             apos: Optional[str] = None, antes: Optional[str] = None,
+                             ordem: str = "id", descendente: bool = False):
+    if ordem not in ORDENACOES_PRODUTO:
+        raise ValueError(f"Ordenação inválida: {ordem}")
     cursor = db.cursor(dictionary=True)
-    cursor.execute("SELECT * FROM produtos")
-    return cursor.fetchall()
+    return paginar(
+        cursor,
+        "SELECT id, nome, descricao, preco, estoque, updated_at FROM produtos",
+        ORDENACOES_PRODUTO[ordem],
+        limite=limite, apos=apos, antes=antes, descendente=descendente,
+    )
 
 
-def create_produto(produto: ProdutoCreate, db: mysql.connector.MySQLConnection):
-    cursor = db.cursor()
+def iterar_produtos(db: mysql.connector.MySQLConnection, ordem: str = "id",
+                    descendente: bool = False, lote: int = 500):
+    if ordem not in ORDENACOES_PRODUTO:
+        raise ValueError(f"Ordenação inválida: {ordem}")
+    direcao = "DESC" if descendente else "ASC"
+    colunas = ", ".join(f"{c} {direcao}" for c in ORDENACOES_PRODUTO[ordem])
+    return iterar_consulta(
+        db, f"SELECT id, nome, descricao, preco, estoque FROM produtos ORDER BY {colunas}", lote=lote)
+
+
+ORDEM_BUSCA = ["relevancia", "id"]
+
+
+SQL_BUSCA = {
+    "mysql": """
+        SELECT id, nome, descricao, preco, estoque, relevancia FROM (
+            SELECT id, nome, descricao, preco, estoque,
+                   MATCH (nome, descricao) AGAINST (%s IN BOOLEAN MODE) AS relevancia
+            FROM produtos
+            WHERE MATCH (nome, descricao) AGAINST (%s IN BOOLEAN MODE)
+        ) AS resultado
+        """,
+    # bm25 é menor para os mais relevantes; negado, ordena como no MySQL
+    "sqlite": """
+        SELECT id, nome, descricao, preco, estoque, relevancia FROM (
+            SELECT produtos.id, produtos.nome, produtos.descricao, produtos.preco,
+                   produtos.estoque, -bm25(produtos_fts) AS relevancia
+            FROM produtos_fts JOIN produtos ON produtos.id = produtos_fts.rowid
+            WHERE produtos_fts MATCH %s
+        ) AS resultado
+        """,
+}
+
+
+def _expressao_busca(termo, backend="mysql"):
+    # Todos os termos são obrigatórios e o último casa por prefixo.
+    # Operadores digitados pelo usuário são descartados.
+    termos = tokenizar(termo)
+    if not termos:
+        return None
+    if backend == "sqlite":
+        return " ".join(f'"{t}"' for t in termos) + "*"
+    return " ".join(f"+{t}" for t in termos) + "*"
+
+
+def _buscar_no_indice(indice, termo, db, limite, apos, antes):
+    limite = normalizar_limite(limite)
+    voltando = antes is not None
+    token = antes if voltando else apos
+    chave = decodificar_cursor(token, len(ORDEM_BUSCA)) if token else None
+
+    encontrados = indice.buscar(termo, limite + 1, chave, desc=not voltando)
+    pagina = montar_pagina(encontrados, limite, ORDEM_BUSCA, voltando, bool(token))
+    if not pagina["itens"]:
+        return pagina
+
+    relevancias = {item["id"]: item["relevancia"] for item in pagina["itens"]}
+    marcadores = ", ".join(["%s"] * len(relevancias))
+    cursor = db.cursor(dictionary=True)
     cursor.execute(
-        "INSERT INTO produtos (nome, descricao, preco, estoque) VALUES (%s, %s, %s, %s)",
-        (produto.nome, produto.descricao, produto.preco, produto.estoque),
+        f"SELECT id, nome, descricao, preco, estoque FROM produtos WHERE id IN ({marcadores})",
+        list(relevancias),
     )
-    db.commit()
-    return cursor.lastrowid
+    linhas = {linha["id"]: linha for linha in cursor.fetchall()}
+    cursor.close()
+    pagina["itens"] = [
+        dict(linhas[item["id"]], relevancia=item["relevancia"])
+        for item in pagina["itens"] if item["id"] in linhas
+    ]
+    return pagina
 
 
-def update_produto(id: int, produto: ProdutoBase, db: mysql.connector.MySQLConnection):
-    cursor = db.cursor()
-    cursor.execute(
-        "UPDATE produtos SET nome=%s, descricao=%s, preco=%s, estoque=%s WHERE id=%s",
-        (produto.nome, produto.descricao, produto.preco, produto.estoque, id),
+def buscar_produtos(db: mysql.connector.MySQLConnection, termo: str, limite: int = LIMITE_PADRAO,
+                    apos: Optional[str] = None, antes: Optional[str] = None):
+    """Busca em `nome` e `descricao`, ordenando por relevância.
+
+    Usa o índice em memória quando `BUSCA_BACKEND=memoria` e ele já foi
+    carregado; caso contrário, o índice FULLTEXT do MySQL ou o FTS5 do SQLite.
+    """
+    backend = get_backend()
+    expressao = _expressao_busca(termo, backend)
+    if expressao is None:
+        return {"itens": [], "limite": normalizar_limite(limite), "proximo": None, "anterior": None}
+
+    indice = get_indice_produtos()
+    if indice is not None and indice.pronto:
+        return _buscar_no_indice(indice, termo, db, limite, apos, antes)
+
+    sql = SQL_BUSCA[backend]
+    cursor = db.cursor(dictionary=True)
+    return paginar(
+        cursor, sql, ORDEM_BUSCA,
+        limite=limite, apos=apos, antes=antes, params=(expressao,) * sql.count("%s"), descendente=True,
     )
-    db.commit()
-    return cursor.rowcount
 
 
-def delete_produto(id: int, db: mysql.connector.MySQLConnection):
-    cursor = db.cursor()
-    cursor.execute("DELETE FROM produtos WHERE id = %s", (id,))
+def _indexar(id, produto):
+    indice = get_indice_produtos()
+    if indice is not None:
+        indice.adicionar(id, produto.nome, produto.descricao)
+
+
+def create_produto(produto: ProdutoCreate, db: mysql.connector.MySQLConnection):
+    id = executar(db, SQL_INSERIR_PRODUTO,
+                  (produto.nome, produto.descricao, produto.preco, produto.estoque)).lastrowid
     db.commit()
-    return cursor.rowcount
+    _indexar(id, produto)
+    return id
+
+
+def _estado_produto(linha):
+    return {
+        "nome": linha["nome"],
+        "descricao": linha["descricao"],
+        "preco": float(linha["preco"]),
+        "estoque": linha["estoque"],
+    }
+
+
+def _bloquear_produto(db, id: int):
+    # FOR UPDATE mantém a linha bloqueada até o commit: o estado registrado
+    # no log é exatamente o que a escrita sobrescreve.
+    return consultar_um(db, SQL_BLOQUEAR_PRODUTO, (id,))
+
+
+def update_produto(id: int, produto: ProdutoBase, db: mysql.connector.MySQLConnection,
+                   versao: Optional[datetime] = None, ip_origem: Optional[str] = None):
+    """Atualiza todas as colunas do produto e registra o log na mesma transação.
+
+    Com `versao` (o `updated_at` lido antes da edição) a escrita só acontece
+    se ninguém alterou o produto nesse meio tempo; caso contrário levanta
+    `ConflitoVersaoError`. Retorna 0 se o produto não existe.
+    """
+    try:
+        anterior = _bloquear_produto(db, id)
+        if anterior is None:
+            db.rollback()
+            return 0
+        if versao is not None and anterior["updated_at"] != versao:
+            raise ConflitoVersaoError(id)
+        executar(db, SQL_ATUALIZAR_PRODUTO,
+                 (produto.nome, produto.descricao, produto.preco, produto.estoque, id))
+        inserir_log_na_transacao(db, "UPDATE", "produtos", id, _estado_produto(anterior),
+                                 produto.dict(), ip_origem=ip_origem)
+        db.commit()
+    except Exception:
+        db.rollback()
+        raise
+    invalidar(f"produto:{id}")
+    _indexar(id, produto)
+    return 1
+
+
+def _executar_ajuste(db, id: int, quantidade: int):
+    if quantidade < 0:
+        return executar(db, SQL_RETIRAR_ESTOQUE, (-quantidade, id, -quantidade)).rowcount
+    return executar(db, SQL_REPOR_ESTOQUE, (quantidade, id)).rowcount
+
+
+def _registrar_ajuste(db, id: int, quantidade: int, id_usuario, ip_origem):
+    inserir_log_na_transacao(db, "UPDATE", "produtos", id, dados_novos={"ajuste_estoque": quantidade},
+                             id_usuario=id_usuario, ip_origem=ip_origem)
+
+
+def ajustar_estoque(id: int, quantidade: int, db: mysql.connector.MySQLConnection,
+                    id_usuario: Optional[int] = None, ip_origem: Optional[str] = None):
+    """Soma `quantidade` (negativa para saídas) ao estoque em uma única instrução.
+
+    A condição `estoque >= n` garante que saídas concorrentes nunca deixem o
+    estoque negativo; levanta `EstoqueInsuficienteError` quando não há saldo.
+    O log é gravado na mesma transação do ajuste.
+    """
+    try:
+        alteradas = _executar_ajuste(db, id, quantidade)
+        if not alteradas:
+            raise EstoqueInsuficienteError(id)
+        _registrar_ajuste(db, id, quantidade, id_usuario, ip_origem)
+        db.commit()
+    except Exception:
+        db.rollback()
+        raise
+    finally:
+        invalidar(f"produto:{id}")
+    return alteradas
+
+
+def ajustar_estoque_lote(ajustes: List[AjusteEstoque], db: mysql.connector.MySQLConnection,
+                         id_usuario: Optional[int] = None, ip_origem: Optional[str] = None):
+    """Aplica vários ajustes em uma transação: ou todos são aplicados, ou nenhum.
+
+    Os produtos são atualizados em ordem de id para que lotes concorrentes
+    bloqueiem as linhas na mesma ordem e não entrem em deadlock. Cada produto
+    ajustado ganha um log, confirmado junto com o lote.
+    """
+    totais = {}
+    for ajuste in ajustes:
+        totais[ajuste.id] = totais.get(ajuste.id, 0) + ajuste.quantidade
+    try:
+        for id in sorted(totais):
+            if not totais[id]:
+                continue
+            if not _executar_ajuste(db, id, totais[id]):
+                raise EstoqueInsuficienteError(id)
+            _registrar_ajuste(db, id, totais[id], id_usuario, ip_origem)
+        db.commit()
+    except Exception:
+        db.rollback()
+        raise
+    finally:
+        for id in totais:
+            invalidar(f"produto:{id}")
+    return totais
+
+
+def delete_produto(id: int, db: mysql.connector.MySQLConnection, ip_origem: Optional[str] = None):
+    """Remove o produto e registra o log na mesma transação."""
+    try:
+        anterior = _bloquear_produto(db, id)
+        if anterior is None:
+            db.rollback()
+            return 0
+        executar(db, SQL_DELETAR_PRODUTO, (id,))
+        inserir_log_na_transacao(db, "DELETE", "produtos", id, _estado_produto(anterior),
+                                 ip_origem=ip_origem)
+        db.commit()
+    except Exception:
+        db.rollback()
+        raise
+    invalidar(f"produto:{id}")
+    indice = get_indice_produtos()
+    if indice is not None:
+        indice.remover(id)
+    return 1
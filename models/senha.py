@@ -0,0 +1,163 @@
+"""Hash e verificação de senhas com bcrypt fora do event loop.
+
+Cada hash custa centenas de milissegundos de CPU; rodar isso dentro de um
+handler `async` travaria todas as outras requisições. As operações vão para
+um pool dedicado (threads, já que o bcrypt libera o GIL, ou processos) com
+limite de operações pendentes: acima dele `FilaSenhasCheiaError` é levantado
+em vez de deixar a fila crescer sem fim.
+"""
+import asyncio
+import hmac
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from functools import lru_cache
+
+from passlib.context import CryptContext
+
+from database.config import get_senha_config
+
+
+class FilaSenhasCheiaError(RuntimeError):
+    pass
+
+
+@lru_cache(maxsize=None)
+def _contexto(custo):
+    return CryptContext(schemes=["bcrypt"], deprecated="auto", bcrypt__rounds=custo)
+
+
+def gerar_hash(senha, custo):
+    return _contexto(custo).hash(senha)
+
+
+def verificar_hash(senha, hash_salvo, custo):
+    """Retorna `(confere, novo_hash)`; `novo_hash` só vem quando o custo mudou.
+
+    Senhas gravadas antes da adoção do bcrypt (texto puro) são aceitas uma
+    última vez e voltam com o hash novo, para serem regravadas.
+    """
+    contexto = _contexto(custo)
+    if not hash_salvo or contexto.identify(hash_salvo) is None:
+        if hash_salvo and hmac.compare_digest(senha.encode(), hash_salvo.encode()):
+            return True, contexto.hash(senha)
+        return False, None
+    return contexto.verify_and_update(senha, hash_salvo)
+
+
+class PoolSenhas:
+    def __init__(self, custo=12, tipo_pool="thread", max_workers=4, max_pendentes=64):
+        self.custo = custo
+        self.max_pendentes = max_pendentes
+        if tipo_pool == "processo":
+            self._executor = ProcessPoolExecutor(max_workers=max_workers)
+        else:
+            self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="senha")
+        self.tipo_pool = tipo_pool
+        self.max_workers = max_workers
+        self._lock = threading.Lock()
+        self._hash_ficticio = None
+
+        self._pendentes = 0
+        self._pico_pendentes = 0
+        self._concluidas = 0
+        self._rejeitadas = 0
+        self._rehashes = 0
+        self._tempo_total = 0.0
+        self._tempo_max = 0.0
+
+    async def _executar(self, func, *args):
+        with self._lock:
+            if self._pendentes >= self.max_pendentes:
+                self._rejeitadas += 1
+                raise FilaSenhasCheiaError("Muitas operações de senha em andamento; tente novamente")
+            self._pendentes += 1
+            self._pico_pendentes = max(self._pico_pendentes, self._pendentes)
+        inicio = time.perf_counter()
+        try:
+            loop = asyncio.get_running_loop()
+            return await loop.run_in_executor(self._executor, func, *args)
+        finally:
+            duracao = time.perf_counter() - inicio
+            with self._lock:
+                self._pendentes -= 1
+                self._concluidas += 1
+                self._tempo_total += duracao
+                self._tempo_max = max(self._tempo_max, duracao)
+
+    async def gerar_hash(self, senha):
+        return await self._executar(gerar_hash, senha, self.custo)
+
+    async def verificar(self, senha, hash_salvo):
+        if hash_salvo is None:
+            # Usuário inexistente: verifica contra um hash qualquer para que a
+            # resposta demore o mesmo que uma senha errada.
+            if self._hash_ficticio is None:
+                self._hash_ficticio = await self.gerar_hash("senha-ficticia")
+            await self._executar(verificar_hash, senha, self._hash_ficticio, self.custo)
+            return False, None
+        confere, novo_hash = await self._executar(verificar_hash, senha, hash_salvo, self.custo)
+        if novo_hash:
+            with self._lock:
+                self._rehashes += 1
+        return confere, novo_hash
+
+    def fechar(self):
+        self._executor.shutdown(wait=True)
+
+    def estatisticas(self):
+        with self._lock:
+            return {
+                "tipo_pool": self.tipo_pool,
+                "workers": self.max_workers,
+                "custo": self.custo,
+                "pendentes": self._pendentes,
+                "em_fila": max(0, self._pendentes - self.max_workers),
+                "pico_pendentes": self._pico_pendentes,
+                "max_pendentes": self.max_pendentes,
+                "concluidas": self._concluidas,
+                "rejeitadas": self._rejeitadas,
+                "rehashes": self._rehashes,
+                "tempo_medio_ms": round(self._tempo_total / self._concluidas * 1000, 1) if self._concluidas else None,
+                "tempo_max_ms": round(self._tempo_max * 1000, 1),
+            }
+
+
+_pool = None
+_pool_lock = threading.Lock()
+
+
+def init_senhas():
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            _pool = PoolSenhas(**get_senha_config())
+    return _pool
+
+
+def close_senhas():
+    global _pool
+    with _pool_lock:
+        if _pool is not None:
+            _pool.fechar()
+            _pool = None
+
+
+def get_pool_senhas():
+    if _pool is None:
+        return init_senhas()
+    return _pool
+
+
+def get_senhas_stats():
+    if _pool is None:
+        return {}
+    return _pool.estatisticas()
+
+
+async def hash_senha(senha):
+    return await get_pool_senhas().gerar_hash(senha)
+
+
+async def verificar_senha(senha, hash_salvo):
+    return await get_pool_senhas().verificar(senha, hash_salvo)
@@ -0,0 +1,219 @@
+"""Sessões guardadas no servidor, com o cookie levando apenas o id assinado.
+
+O backend padrão é um LRU em memória com TTL renovado a cada acesso (por
+processo). Com vários workers use o backend `redis` (requer o pacote
+`redis`), para que a sessão criada em um worker seja vista pelos outros.
+
+`SessaoMiddleware` expõe os dados em `request.session`, como o
+`SessionMiddleware` do Starlette, e só grava no backend quando a sessão foi
+alterada durante a requisição.
+"""
+import copy
+import hashlib
+import hmac
+import pickle
+import secrets
+import threading
+import time
+from collections import OrderedDict
+
+from starlette.concurrency import run_in_threadpool
+from starlette.datastructures import MutableHeaders
+from starlette.requests import HTTPConnection
+
+from database.config import get_sessao_config
+
+
+class MemoriaSessoes:
+    bloqueante = False
+
+    def __init__(self, max_sessoes=10000, ttl=1800.0):
+        self.max_sessoes = max_sessoes
+        self.ttl = ttl
+        self._sessoes = OrderedDict()
+        self._lock = threading.Lock()
+
+        self._hits = 0
+        self._misses = 0
+        self._evictions = 0
+        self._expiracoes = 0
+
+    def obter(self, sid):
+        with self._lock:
+            item = self._sessoes.get(sid)
+            if item is None:
+                self._misses += 1
+                return None
+            dados, expira_em = item
+            agora = time.monotonic()
+            if expira_em <= agora:
+                del self._sessoes[sid]
+                self._expiracoes += 1
+                self._misses += 1
+                return None
+            self._sessoes[sid] = (dados, agora + self.ttl)
+            self._sessoes.move_to_end(sid)
+            self._hits += 1
+        return pickle.loads(dados)
+
+    def gravar(self, sid, dados):
+        with self._lock:
+            self._sessoes[sid] = (pickle.dumps(dict(dados)), time.monotonic() + self.ttl)
+            self._sessoes.move_to_end(sid)
+            while len(self._sessoes) > self.max_sessoes:
+                self._sessoes.popitem(last=False)
+                self._evictions += 1
+
+    def remover(self, sid):
+        with self._lock:
+            self._sessoes.pop(sid, None)
+
+    def estatisticas(self):
+        with self._lock:
+            return {
+                "backend": "memoria",
+                "sessoes": len(self._sessoes),
+                "max_sessoes": self.max_sessoes,
+                "ttl": self.ttl,
+                "hits": self._hits,
+                "misses": self._misses,
+                "evictions": self._evictions,
+                "expiracoes": self._expiracoes,
+            }
+
+
+class RedisSessoes:
+    bloqueante = True
+
+    def __init__(self, url, ttl=1800.0, prefixo="sessao:"):
+        try:
+            import redis
+        except ImportError:
+            raise RuntimeError("SESSAO_BACKEND=redis requer o pacote 'redis' instalado")
+        self._redis = redis.Redis.from_url(url)
+        self.ttl = ttl
+        self.prefixo = prefixo
+        self._hits = 0
+        self._misses = 0
+
+    def obter(self, sid):
+        # GETEX renova o TTL na mesma ida ao Redis.
+        dados = self._redis.getex(self.prefixo + sid, px=int(self.ttl * 1000))
+        if dados is None:
+            self._misses += 1
+            return None
+        self._hits += 1
+        return pickle.loads(dados)
+
+    def gravar(self, sid, dados):
+        self._redis.set(self.prefixo + sid, pickle.dumps(dict(dados)), px=int(self.ttl * 1000))
+
+    def remover(self, sid):
+        self._redis.delete(self.prefixo + sid)
+
+    def estatisticas(self):
+        return {
+            "backend": "redis",
+            "ttl": self.ttl,
+            "hits": self._hits,
+            "misses": self._misses,
+        }
+
+
+_store = None
+_store_lock = threading.Lock()
+
+
+def get_store_sessoes():
+    global _store
+    if _store is None:
+        with _store_lock:
+            if _store is None:
+                config = get_sessao_config()
+                if config['backend'] == 'redis':
+                    _store = RedisSessoes(config['redis_url'], config['ttl'])
+                else:
+                    _store = MemoriaSessoes(config['max_sessoes'], config['ttl'])
+    return _store
+
+
+def get_sessoes_stats():
+    if _store is None:
+        return {}
+    return _store.estatisticas()
+
+
+def renovar_sessao(request):
+    """Troca o id da sessão na resposta, mantendo os dados (usar no login)."""
+    request.scope["sessao_renovar"] = True
+
+
+class SessaoMiddleware:
+    def __init__(self, app, chave_secreta, nome_cookie="sessao", max_age=None,
+                 https_only=False, same_site="lax"):
+        self.app = app
+        self._chave = chave_secreta.encode()
+        self.nome_cookie = nome_cookie
+        self.max_age = max_age
+        self.flags = "path=/; httponly; samesite=" + same_site
+        if https_only:
+            self.flags += "; secure"
+
+    def _assinar(self, sid):
+        return hmac.new(self._chave, sid.encode(), hashlib.sha256).hexdigest()[:32]
+
+    def _ler_cookie(self, valor):
+        # Ids forjados são descartados sem consultar o backend.
+        sid, _, assinatura = (valor or "").partition(".")
+        if sid and hmac.compare_digest(assinatura, self._assinar(sid)):
+            return sid
+        return None
+
+    async def _executar(self, store, func, *args):
+        if store.bloqueante:
+            return await run_in_threadpool(func, *args)
+        return func(*args)
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] not in ("http", "websocket"):
+            await self.app(scope, receive, send)
+            return
+
+        store = get_store_sessoes()
+        conexao = HTTPConnection(scope)
+        sid = self._ler_cookie(conexao.cookies.get(self.nome_cookie))
+        dados = None
+        if sid is not None:
+            dados = await self._executar(store, store.obter, sid)
+            if dados is None:
+                sid = None
+        scope["session"] = dados or {}
+        original = copy.deepcopy(scope["session"])
+
+        async def enviar(message):
+            nonlocal sid
+            if message["type"] == "http.response.start":
+                sessao = scope["session"]
+                renovar = scope.get("sessao_renovar", False)
+                cookie = None
+                if not sessao:
+                    if sid is not None:
+                        await self._executar(store, store.remover, sid)
+                        cookie = f"{self.nome_cookie}=null; {self.flags}; expires=Thu, 01 Jan 1970 00:00:00 GMT"
+                elif sid is None or renovar or sessao != original:
+                    if sid is not None and renovar:
+                        await self._executar(store, store.remover, sid)
+                        sid = None
+                    novo = sid is None
+                    if novo:
+                        sid = secrets.token_urlsafe(32)
+                    await self._executar(store, store.gravar, sid, sessao)
+                    if novo:
+                        cookie = f"{self.nome_cookie}={sid}.{self._assinar(sid)}; {self.flags}"
+                        if self.max_age:
+                            cookie += f"; Max-Age={self.max_age}"
+                if cookie is not None:
+                    MutableHeaders(scope=message).append("Set-Cookie", cookie)
+            await send(message)
+
+        await self.app(scope, receive, enviar)
@@ -0,0 +1,81 @@
+"""Limite de tentativas de login malsucedidas por e-mail e IP.
+
+Cada par (e-mail, IP) pode errar a senha `max_tentativas` vezes dentro de
+`janela` segundos; a partir daí o login desse par é recusado até a falha mais
+antiga sair da janela, sem nem verificar a senha. Um login bem-sucedido zera
+o contador. Os contadores ficam em memória, por processo, em um LRU limitado
+a `max_chaves` pares.
+"""
+import threading
+import time
+from collections import OrderedDict, deque
+
+from database.config import get_login_config
+
+
+class LimiteTentativas:
+    def __init__(self, max_tentativas=5, janela=900.0, max_chaves=100000):
+        self.max_tentativas = max_tentativas
+        self.janela = janela
+        self.max_chaves = max_chaves
+        # chave -> instantes das últimas `max_tentativas` falhas
+        self._falhas = OrderedDict()
+        self._lock = threading.Lock()
+
+        self._recusadas = 0
+
+    def espera(self, chave):
+        """Segundos até a chave poder tentar de novo (0 se está liberada)."""
+        with self._lock:
+            falhas = self._falhas.get(chave)
+            if falhas is None or len(falhas) < self.max_tentativas:
+                return 0.0
+            restante = falhas[0] + self.janela - time.monotonic()
+            if restante <= 0:
+                return 0.0
+            self._recusadas += 1
+            return restante
+
+    def falhou(self, chave):
+        with self._lock:
+            falhas = self._falhas.pop(chave, None) or deque(maxlen=self.max_tentativas)
+            falhas.append(time.monotonic())
+            self._falhas[chave] = falhas
+            while len(self._falhas) > self.max_chaves:
+                self._falhas.popitem(last=False)
+
+    def liberar(self, chave):
+        with self._lock:
+            self._falhas.pop(chave, None)
+
+    def estatisticas(self):
+        with self._lock:
+            return {
+                "max_tentativas": self.max_tentativas,
+                "janela": self.janela,
+                "chaves": len(self._falhas),
+                "recusadas": self._recusadas,
+            }
+
+
+_limite = None
+_limite_lock = threading.Lock()
+
+
+def get_limite_tentativas():
+    """O limitador do processo, ou None com `LOGIN_MAX_TENTATIVAS=0`."""
+    global _limite
+    if _limite is None:
+        with _limite_lock:
+            if _limite is None:
+                config = get_login_config()
+                if not config['max_tentativas']:
+                    return None
+                _limite = LimiteTentativas(**config)
+    return _limite
+
+
+def get_tentativas_stats():
+    if _limite is None:
+        return {}
+    return _limite.estatisticas()
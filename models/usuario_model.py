@@ -1,7 +1,13 @@
+from itertools import combinations
 from pydantic import BaseModel
-from models.database import get_db
+from typing import Optional
+from models.database import (
+    get_db, iterar_consulta, executar, consultar_um, consultar_todos, ErroBanco, ER_DUP_ENTRY
+)
+from models.paginacao import paginar, LIMITE_PADRAO
+from models.cache import obter_ou_carregar, invalidar
+from models.log_model import inserir_log_na_transacao
 import mysql.connector
-from passlib.context import CryptContext
 
 class UsuarioBase(BaseModel):
     nome: str
@@ -13,65 +19,145 @@ class UsuarioCreate(UsuarioBase):
 class Usuario(UsuarioBase):
     id: int
 
+# Instruções de forma fixa, executadas como instruções preparadas
+# (`models.database.executar`)
+SQL_INSERIR_USUARIO = "INSERT INTO usuarios (nome, email, senha) VALUES (%s, %s, %s)"
+SQL_USUARIO_POR_ID = "SELECT id, nome, email, data_atualizacao FROM usuarios WHERE id = %s"
+SQL_USUARIO_PARA_LOGIN = "SELECT id, nome, email, senha FROM usuarios WHERE email = %s"
+SQL_ATUALIZAR_HASH_SENHA = "UPDATE usuarios SET senha = %s WHERE id = %s"
+SQL_TODOS_USUARIOS = "SELECT id, nome, email FROM usuarios ORDER BY nome"
+SQL_BLOQUEAR_USUARIO = "SELECT nome, email FROM usuarios WHERE id = %s FOR UPDATE"
+SQL_DELETAR_USUARIO = "DELETE FROM usuarios WHERE id = %s"
+
+CAMPOS_ATUALIZAVEIS = ("nome", "email", "senha")
+# Um UPDATE por combinação de campos, sempre na ordem de CAMPOS_ATUALIZAVEIS:
+# a mesma combinação gera o mesmo texto e reaproveita a instrução preparada.
+SQL_ATUALIZAR_USUARIO = {
+    frozenset(campos): "UPDATE usuarios SET " + ", ".join(f"{campo} = %s" for campo in campos) + " WHERE id = %s"
+    for quantidade in range(1, len(CAMPOS_ATUALIZAVEIS) + 1)
+    for campos in combinations(CAMPOS_ATUALIZAVEIS, quantidade)
+}
+
 def create_usuario(usuario: UsuarioCreate, db: mysql.connector.MySQLConnection):
     try:
-        #usuario.hash_password()
-        cursor = db.cursor()
-        cursor.execute(
-            "INSERT INTO usuarios (nome, email, senha) VALUES (%s, %s, %s)",
-            (usuario.nome, usuario.email, usuario.senha),
-        )
+        id = executar(db, SQL_INSERIR_USUARIO, (usuario.nome, usuario.email, usuario.senha)).lastrowid
         db.commit()
-        return cursor.lastrowid
-    except mysql.connector.Error as err:
+        return id
+    except ErroBanco as err:
         db.rollback()
-        if err.errno == 1062: 
+        if err.errno == ER_DUP_ENTRY: 
             err.msg = "Este e-mail já está cadastrado"
         raise ValueError(f"Erro ao criar usuário: {err.msg}")
 
 def get_usuario_by_id(id: int, db: mysql.connector.MySQLConnection):
+    def carregar():
+        return consultar_um(db, SQL_USUARIO_POR_ID, (id,))
     try:
-        cursor = db.cursor(dictionary=True)
-        cursor.execute("SELECT id, nome, email FROM usuarios WHERE id = %s", (id,))
-        return cursor.fetchone()
-    except mysql.connector.Error as err:
+        return obter_ou_carregar(f"usuario:{id}", carregar)
+    except ErroBanco as err:
         raise ValueError(f"Erro ao buscar usuário: {err.msg}")
 
+def get_usuario_para_login(email: str, db: mysql.connector.MySQLConnection):
+    """Busca o usuário pelo e-mail incluindo o hash da senha (sem cache)."""
+    try:
+        return consultar_um(db, SQL_USUARIO_PARA_LOGIN, (email,))
+    except ErroBanco as err:
+        raise ValueError(f"Erro ao buscar usuário: {err.msg}")
+
+def atualizar_hash_senha(id: int, hash_senha: str, db: mysql.connector.MySQLConnection):
+    """Regrava o hash da senha (custo do bcrypt alterado); não altera a senha em si."""
+    try:
+        executar(db, SQL_ATUALIZAR_HASH_SENHA, (hash_senha, id))
+        db.commit()
+    except ErroBanco as err:
+        db.rollback()
+        raise ValueError(f"Erro ao atualizar senha: {err.msg}")
+
 def get_all_usuarios(db: mysql.connector.MySQLConnection):
     try:
-        cursor = db.cursor(dictionary=True)
-        cursor.execute("SELECT id, nome, email FROM usuarios ORDER BY nome")
-        return cursor.fetchall()
-    except mysql.connector.Error as err:
+        return consultar_todos(db, SQL_TODOS_USUARIOS)
+    except ErroBanco as err:
         raise ValueError(f"Erro ao listar usuários: {err.msg}")
 
-def update_usuario(id: int, update_data: dict, db: mysql.connector.MySQLConnection):
+ORDENACOES_USUARIO = {
+    "nome": ["nome", "id"],
+    "email": ["email"],
+    "id": ["id"],
+}
+
+def listar_usuarios_paginado(db: mysql.connector.MySQLConnection, limite: int = LIMITE_PADRAO,
+                             apos: Optional[str] = None, antes: Optional[str] = None,
+                             ordem: str = "nome", descendente: bool = False):
+    if ordem not in ORDENACOES_USUARIO:
+        raise ValueError(f"Ordenação inválida: {ordem}")
     try:
-        cursor = db.cursor()
-        
-        if 'senha' in update_data:
-            update_data['senha'] = update_data['senha']
-        
-        set_clause = ", ".join([f"{key} = %s" for key in update_data.keys()])
-        values = list(update_data.values())
-        values.append(id)
-        
-        cursor.execute(
-            f"UPDATE usuarios SET {set_clause} WHERE id = %s",
-            values
+        cursor = db.cursor(dictionary=True)
+        return paginar(
+            cursor,
+            "SELECT id, nome, email, data_atualizacao FROM usuarios",
+            ORDENACOES_USUARIO[ordem],
+            limite=limite, apos=apos, antes=antes, descendente=descendente,
         )
+    except ErroBanco as err:
+        raise ValueError(f"Erro ao listar usuários: {err.msg}")
+
+def iterar_usuarios(db: mysql.connector.MySQLConnection, ordem: str = "nome",
+                    descendente: bool = False, lote: int = 500):
+    if ordem not in ORDENACOES_USUARIO:
+        raise ValueError(f"Ordenação inválida: {ordem}")
+    direcao = "DESC" if descendente else "ASC"
+    colunas = ", ".join(f"{c} {direcao}" for c in ORDENACOES_USUARIO[ordem])
+    return iterar_consulta(
+        db, f"SELECT id, nome, email FROM usuarios ORDER BY {colunas}", lote=lote)
+
+def _bloquear_usuario(db, id: int):
+    # FOR UPDATE: o estado registrado no log é o que a escrita sobrescreve
+    return consultar_um(db, SQL_BLOQUEAR_USUARIO, (id,))
+
+def update_usuario(id: int, update_data: dict, db: mysql.connector.MySQLConnection,
+                   ip_origem: Optional[str] = None):
+    """Atualiza o usuário e registra o log na mesma transação; retorna 0 se ele não existe.
+
+    `update_data` tem um ou mais de `CAMPOS_ATUALIZAVEIS`.
+    """
+    sql = SQL_ATUALIZAR_USUARIO.get(frozenset(update_data))
+    if sql is None:
+        raise ValueError(f"Campos inválidos para atualizar usuário: {', '.join(update_data) or 'nenhum'}")
+    valores = [update_data[campo] for campo in CAMPOS_ATUALIZAVEIS if campo in update_data]
+    valores.append(id)
+    try:
+        anterior = _bloquear_usuario(db, id)
+        if anterior is None:
+            db.rollback()
+            return 0
+
+        executar(db, sql, valores)
+        dados_novos = {chave: valor for chave, valor in update_data.items() if chave != "senha"}
+        if "senha" in update_data:
+            dados_novos["senha_alterada"] = True
+        inserir_log_na_transacao(db, "UPDATE", "usuarios", id, anterior, dados_novos,
+                                 ip_origem=ip_origem)
         db.commit()
-        return cursor.rowcount
-    except mysql.connector.Error as err:
+        invalidar(f"usuario:{id}")
+        return 1
+    except ErroBanco as err:
         db.rollback()
+        if err.errno == ER_DUP_ENTRY:
+            err.msg = "Este e-mail já está cadastrado"
         raise ValueError(f"Erro ao atualizar usuário: {err.msg}")
 
-def delete_usuario(id: int, db: mysql.connector.MySQLConnection):
+def delete_usuario(id: int, db: mysql.connector.MySQLConnection, ip_origem: Optional[str] = None):
+    """Remove o usuário e registra o log na mesma transação; retorna 0 se ele não existe."""
     try:
-        cursor = db.cursor()
-        cursor.execute("DELETE FROM usuarios WHERE id = %s", (id,))
+        anterior = _bloquear_usuario(db, id)
+        if anterior is None:
+            db.rollback()
+            return 0
+        executar(db, SQL_DELETAR_USUARIO, (id,))
+        inserir_log_na_transacao(db, "DELETE", "usuarios", id, anterior, ip_origem=ip_origem)
         db.commit()
-        return cursor.rowcount
-    except mysql.connector.Error as err:
+        invalidar(f"usuario:{id}")
+        return 1
+    except ErroBanco as err:
         db.rollback()
-        raise ValueError(f"Erro ao deletar usuário: {err.msg}")
\ No newline at end of file
+        raise ValueError(f"Erro ao deletar usuário: {err.msg}")
@@ -0,0 +1,55 @@
+from fastapi import APIRouter, Depends, Query, Request
+from typing import Optional
+from models.database import get_db
+from models.paginacao import LIMITE_PADRAO, LIMITE_MAXIMO
+from controllers import api_controller
+
+router = APIRouter(prefix="/api/v1", tags=["api"])
+
+
+@router.get("/produtos")
+async def listar_produtos(
+    request: Request,
+    limite: int = Query(LIMITE_PADRAO, ge=1, le=LIMITE_MAXIMO),
+    apos: Optional[str] = None,
+    antes: Optional[str] = None,
+    ordem: str = "id",
+    direcao: str = Query("asc", regex="^(asc|desc)$"),
+    campos: Optional[str] = Query(None, description="Campos separados por vírgula"),
+    db=Depends(get_db),
+):
+    return await api_controller.listar_produtos(request, db, limite, apos, antes, ordem, direcao, campos)
+
+
+@router.post("/produtos/estoque")
+async def ajustar_estoque(request: Request, lote: api_controller.LoteAjusteEstoque, db=Depends(get_db)):
+    return await api_controller.ajustar_estoque(request, lote, db)
+
+
+@router.get("/produtos/{id}")
+async def obter_produto(request: Request, id: int, campos: Optional[str] = None, db=Depends(get_db)):
+    return await api_controller.obter_produto(request, id, db, campos)
+
+
+@router.get("/usuarios")
+async def listar_usuarios(
+    request: Request,
+    limite: int = Query(LIMITE_PADRAO, ge=1, le=LIMITE_MAXIMO),
+    apos: Optional[str] = None,
+    antes: Optional[str] = None,
+    ordem: str = "nome",
+    direcao: str = Query("asc", regex="^(asc|desc)$"),
+    campos: Optional[str] = Query(None, description="Campos separados por vírgula"),
+    db=Depends(get_db),
+):
+    return await api_controller.listar_usuarios(request, db, limite, apos, antes, ordem, direcao, campos)
+
+
+@router.get("/usuarios/{id}")
+async def obter_usuario(request: Request, id: int, campos: Optional[str] = None, db=Depends(get_db)):
+    return await api_controller.obter_usuario(request, id, db, campos)
+
+
+@router.post("/login")
+async def login(request: Request, credenciais: api_controller.Credenciais, db=Depends(get_db)):
+    return await api_controller.login(request, credenciais, db)
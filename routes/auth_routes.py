@@ -0,0 +1,31 @@
+from fastapi import APIRouter, Depends, Form, Request
+from fastapi.responses import HTMLResponse
+from models.database import get_db
+from controllers import auth_controller
+
+router = APIRouter(tags=["autenticacao"])
+
+
+@router.get("/login", response_class=HTMLResponse, name="form_login")
+async def form_login(request: Request):
+    return auth_controller.form_login(request)
+
+
+@router.post("/login", response_class=HTMLResponse, name="login")
+async def login(
+    request: Request,
+    email: str = Form(...),
+    senha: str = Form(...),
+    db=Depends(get_db),
+):
+    return await auth_controller.login(request, email, senha, db)
+
+
+@router.get("/perfil", response_class=HTMLResponse, name="perfil")
+async def perfil(request: Request, db=Depends(get_db)):
+    return await auth_controller.perfil(request, db)
+
+
+@router.post("/logout", name="logout")
+async def logout(request: Request):
+    return auth_controller.logout(request)
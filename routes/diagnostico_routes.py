@@ -0,0 +1,60 @@
+from fastapi import APIRouter, Depends, Query, Request
+from fastapi.responses import HTMLResponse
+from models.database import get_pool_stats
+from models.log_writer import get_auditoria_stats
+from models.cache import get_cache_stats
+from models.indice_busca import get_busca_stats
+from models.senha import get_senhas_stats
+from models.sessao import get_sessoes_stats
+from models.tentativas_login import get_tentativas_stats
+from controllers.cache_http import get_fragmentos_stats
+from controllers import diagnostico_controller
+from controllers.auth_controller import exigir_diagnostico
+
+# Expõem SQL, planos e rotas: só para os e-mails de DIAGNOSTICO_EMAILS
+router = APIRouter(prefix="/diagnostico", tags=["diagnostico"], dependencies=[Depends(exigir_diagnostico)])
+
+
+@router.get("/pool")
+def estatisticas_pool():
+    return get_pool_stats()
+
+
+@router.get("/auditoria")
+def estatisticas_auditoria():
+    return get_auditoria_stats()
+
+
+@router.get("/cache")
+def estatisticas_cache():
+    return get_cache_stats()
+
+
+@router.get("/fragmentos")
+def estatisticas_fragmentos():
+    return get_fragmentos_stats()
+
+
+@router.get("/busca")
+def estatisticas_busca():
+    return get_busca_stats()
+
+
+@router.get("/senhas")
+def estatisticas_senhas():
+    return get_senhas_stats()
+
+
+@router.get("/sessoes")
+def estatisticas_sessoes():
+    return get_sessoes_stats()
+
+
+@router.get("/login")
+def estatisticas_login():
+    return get_tentativas_stats()
+
+
+@router.get("/consultas-lentas", response_class=HTMLResponse, name="consultas_lentas")
+async def consultas_lentas(request: Request, limite: int = Query(50, ge=1, le=500)):
+    return await diagnostico_controller.consultas_lentas(request, limite)
@@ -0,0 +1,65 @@
+from fastapi import APIRouter, Depends, HTTPException, Query, Request
+from fastapi.responses import HTMLResponse
+from typing import Optional
+from pydantic import ValidationError
+from datetime import datetime
+from models.database import get_db
+from models.log_model import FiltrosLog
+from models.paginacao import LIMITE_PADRAO, LIMITE_MAXIMO
+from controllers import log_controller
+
+router = APIRouter(prefix="/logs", tags=["logs"])
+
+
+def filtros_log(
+    tabela_afetada: Optional[str] = None,
+    id_registro: Optional[str] = None,
+    tipo_operacao: Optional[str] = None,
+    id_usuario: Optional[str] = None,
+    ip_origem: Optional[str] = None,
+    data_inicio: Optional[str] = None,
+    data_fim: Optional[str] = None,
+    arquivados: bool = False,
+):
+    # Campos vazios do formulário de filtros chegam como "" e são ignorados
+    valores = {
+        "tabela_afetada": tabela_afetada,
+        "id_registro": id_registro,
+        "tipo_operacao": tipo_operacao,
+        "id_usuario": id_usuario,
+        "ip_origem": ip_origem,
+        "data_inicio": data_inicio,
+        "data_fim": data_fim,
+        "arquivados": arquivados,
+    }
+    try:
+        return FiltrosLog(**{campo: valor for campo, valor in valores.items() if valor})
+    except ValidationError as e:
+        raise HTTPException(status_code=400, detail=e.errors())
+
+
+@router.get("/", response_class=HTMLResponse, name="listar_logs")
+async def listar_logs(
+    request: Request,
+    filtros: FiltrosLog = Depends(filtros_log),
+    limite: int = Query(LIMITE_PADRAO, ge=1, le=LIMITE_MAXIMO),
+    apos: Optional[str] = None,
+    antes: Optional[str] = None,
+    db=Depends(get_db),
+):
+    return await log_controller.listar_logs(request, filtros, db, limite, apos, antes)
+
+
+@router.get("/export", name="exportar_logs")
+async def exportar_logs(
+    filtros: FiltrosLog = Depends(filtros_log),
+    formato: str = Query("csv", regex="^(csv|ndjson)$"),
+    gzip: bool = False,
+    db=Depends(get_db),
+):
+    return log_controller.exportar_logs(filtros, db, formato, gzip)
+
+
+@router.get("/{id}/detalhes", response_class=HTMLResponse, name="detalhes_log")
+async def detalhes_log(request: Request, id: int, data: Optional[datetime] = None, db=Depends(get_db)):
+    return await log_controller.detalhes_log(request, id, data, db)
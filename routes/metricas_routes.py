@@ -0,0 +1,10 @@
+from fastapi import APIRouter
+from fastapi.responses import PlainTextResponse
+from models.metricas import gerar_texto
+
+router = APIRouter(tags=["metricas"])
+
+
+@router.get("/metrics", response_class=PlainTextResponse)
+def metricas():
+    return PlainTextResponse(gerar_texto(), media_type="text/plain; version=0.0.4")
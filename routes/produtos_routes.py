@@ -1,4 +1,4 @@
-from fastapi import APIRouter, Depends, HTTPException, Form, Request
+from fastapi import APIRouter, Depends, HTTPException, File, Form, Query, Request, UploadFile
 from fastapi.responses import HTMLResponse, RedirectResponse
 from fastapi.templating import Jinja2Templates
 from pydantic import BaseModel
@@ -6,6 +6,7 @@ from typing import Optional
 from models.produto_model import ProdutoCreate, get_all_produtos, get_produto_by_id, create_produto, update_produto, delete_produto
 from models.database import get_db
 from models.log_model import registrar_log
+from models.paginacao import LIMITE_PADRAO, LIMITE_MAXIMO
 from controllers import produto_controller
 import mysql.connector
 
@@ -13,17 +14,64 @@ router = APIRouter()
 
 
 @router.get("/", response_class=HTMLResponse)
-def listar_produtos(request: Request, db=Depends(get_db)):
-    return produto_controller.listar_produtos(request, db)
+async def listar_produtos(
+    request: Request,
+    limite: int = Query(LIMITE_PADRAO, ge=1, le=LIMITE_MAXIMO),
+    apos: Optional[str] = None,
+    antes: Optional[str] = None,
+    ordem: str = "id",
+    direcao: str = Query("asc", regex="^(asc|desc)$"),
+    stream: bool = False,
+    db=Depends(get_db),
+):
+    return await produto_controller.listar_produtos(request, db, limite, apos, antes, ordem, direcao, stream)
+
+
+@router.get("/export")
+async def exportar_produtos(
+    formato: str = Query("csv", regex="^(csv|ndjson)$"),
+    gzip: bool = False,
+    ordem: str = "id",
+    direcao: str = Query("asc", regex="^(asc|desc)$"),
+    db=Depends(get_db),
+):
+    return produto_controller.exportar_produtos(db, formato, gzip, ordem, direcao)
+
+
+@router.get("/busca", response_class=HTMLResponse)
+async def buscar_produtos(
+    request: Request,
+    q: str = "",
+    limite: int = Query(LIMITE_PADRAO, ge=1, le=LIMITE_MAXIMO),
+    apos: Optional[str] = None,
+    antes: Optional[str] = None,
+    db=Depends(get_db),
+):
+    return await produto_controller.buscar(request, q, db, limite, apos, antes)
+
+
+@router.get("/importar", response_class=HTMLResponse)
+async def form_importar_produtos(request: Request):
+    return produto_controller.form_importar_produtos(request)
+
+
+@router.post("/importar", response_class=HTMLResponse)
+async def importar_produtos(
+    request: Request,
+    arquivo: UploadFile = File(...),
+    formato: Optional[str] = Form(None),
+    db=Depends(get_db),
+):
+    return await produto_controller.importar_produtos(request, arquivo, formato, db)
 
 
 @router.get("/cadastrar", response_class=HTMLResponse)
-def form_cadastrar_produto(request: Request):
+async def form_cadastrar_produto(request: Request):
     return produto_controller.form_cadastrar_produto(request)
 
 
 @router.post("/cadastrar")
-def cadastrar_produto(
+async def cadastrar_produto(
     request: Request,
     nome: str = Form(...),
     descricao: str = Form(""),
@@ -31,32 +79,38 @@ def cadastrar_produto(
     estoque: int = Form(...),
     db=Depends(get_db),
 ):
-    return produto_controller.cadastrar_produto(request, nome, descricao, preco, estoque, db)
+    return await produto_controller.cadastrar_produto(request, nome, descricao, preco, estoque, db)
 
 
 @router.get("/{id}", response_class=HTMLResponse)
-def obter_produto(request: Request, id: int, db=Depends(get_db)):
-    return produto_controller.obter_produto(request, id, db)
+async def obter_produto(request: Request, id: int, db=Depends(get_db)):
+    return await produto_controller.obter_produto(request, id, db)
 
 
 @router.get("/{id}/editar", response_class=HTMLResponse)
-def form_editar_produto(request: Request, id: int, db=Depends(get_db)):
-    return produto_controller.form_editar_produto(request, id, db)
+async def form_editar_produto(request: Request, id: int, db=Depends(get_db)):
+    return await produto_controller.form_editar_produto(request, id, db)
 
 
 @router.post("/{id}/editar")
-def editar_produto(
+async def editar_produto(
     request: Request,
     id: int,
     nome: str = Form(...),
     descricao: str = Form(""),
     preco: float = Form(...),
     estoque: int = Form(...),
+    versao: Optional[str] = Form(None),
     db=Depends(get_db),
 ):
-    return produto_controller.editar_produto(request, id, nome, descricao, preco, estoque, db)
+    return await produto_controller.editar_produto(request, id, nome, descricao, preco, estoque, db, versao)
+
+
+@router.post("/{id}/estoque")
+async def ajustar_estoque(request: Request, id: int, quantidade: int = Form(...), db=Depends(get_db)):
+    return await produto_controller.ajustar_estoque_produto(request, id, quantidade, db)
 
 
 @router.post("/{id}/deletar")
-def deletar_produto(request: Request, id: int, db=Depends(get_db)):
-    return produto_controller.deletar_produto(request, id, db)
+async def deletar_produto(request: Request, id: int, db=Depends(get_db)):
+    return await produto_controller.deletar_produto(request, id, db)
@@ -1,17 +1,38 @@
-from fastapi import APIRouter, Depends, HTTPException, Form, Request, status
+from fastapi import APIRouter, Depends, HTTPException, Form, Query, Request, status
 from fastapi.responses import HTMLResponse, RedirectResponse
 from fastapi.templating import Jinja2Templates
 from controllers.usuario_controller import get_db
 from typing import Optional
+from models.paginacao import LIMITE_PADRAO, LIMITE_MAXIMO
 from controllers import usuario_controller
 
 router = APIRouter(prefix="/usuarios", tags=["usuarios"])
 
 @router.get("/", response_class=HTMLResponse, name="listar_usuarios")
-async def listar_usuarios(request: Request, db = Depends(get_db)):
-    return usuario_controller.get_all_users_controllers(request,db)
+async def listar_usuarios(
+    request: Request,
+    limite: int = Query(LIMITE_PADRAO, ge=1, le=LIMITE_MAXIMO),
+    apos: Optional[str] = None,
+    antes: Optional[str] = None,
+    ordem: str = "nome",
+    direcao: str = Query("asc", regex="^(asc|desc)$"),
+    stream: bool = False,
+    db = Depends(get_db)
+):
+    return await usuario_controller.get_all_users_controllers(request, db, limite, apos, antes, ordem, direcao, stream)
     
     
+@router.get("/export", name="exportar_usuarios")
+async def exportar_usuarios(
+    formato: str = Query("csv", regex="^(csv|ndjson)$"),
+    gzip: bool = False,
+    ordem: str = "nome",
+    direcao: str = Query("asc", regex="^(asc|desc)$"),
+    db = Depends(get_db)
+):
+    return usuario_controller.exportar_usuarios(db, formato, gzip, ordem, direcao)
+
+
 @router.get("/cadastrar", response_class=HTMLResponse, name="form_cadastrar_usuario")
 async def form_cadastrar_usuario(request: Request):
     return usuario_controller.form_cadastrar_usuario(request)
@@ -0,0 +1,78 @@
+"""Fixtures compartilhadas: banco migrado em cada backend e estado global limpo.
+
+Os testes que usam `banco`/`db` rodam com `DB_BACKEND=sqlite` (arquivo
+temporário) e com `DB_BACKEND=mysql`. O MySQL usa as variáveis `DB_HOST`,
+`DB_PORT`, `DB_USER` e `DB_PASSWORD` e o banco `DB_NAME_TESTES` (padrão
+`fastapi_p1_testes`), recriado a cada teste; sem servidor acessível os casos
+do MySQL são pulados.
+"""
+import os
+
+import mysql.connector
+import pytest
+
+from models import cache, database, indice_busca, sessao
+
+BACKENDS = ("sqlite", "mysql")
+
+
+def _config_mysql():
+    if not (os.getenv("DB_USER") and os.getenv("DB_PASSWORD")):
+        pytest.skip("MySQL não configurado (DB_USER/DB_PASSWORD)")
+    config = {
+        "host": os.getenv("DB_HOST", "localhost"),
+        "port": int(os.getenv("DB_PORT", "3306")),
+        "user": os.getenv("DB_USER"),
+        "password": os.getenv("DB_PASSWORD"),
+    }
+    nome = os.getenv("DB_NAME_TESTES", "fastapi_p1_testes")
+    try:
+        conn = mysql.connector.connect(**config, connection_timeout=2)
+    except mysql.connector.Error as e:
+        pytest.skip(f"MySQL indisponível: {e.msg}")
+    try:
+        cursor = conn.cursor()
+        cursor.execute(f"DROP DATABASE IF EXISTS `{nome}`")
+        cursor.close()
+    finally:
+        conn.close()
+    return dict(config, database=nome)
+
+
+def _limpar_estado_global():
+    database.close_pool()
+    database.close_executor()
+    cache._cache = None
+    indice_busca._indice = None
+    sessao._store = None
+
+
+@pytest.fixture(params=BACKENDS)
+def banco(request, tmp_path, monkeypatch):
+    """Nome do backend, com o schema migrado e o pool apontando para ele."""
+    from database.migrations import aplicar_migracoes
+
+    backend = request.param
+    monkeypatch.setenv("DB_BACKEND", backend)
+    if backend == "sqlite":
+        monkeypatch.setenv("DB_SQLITE_CAMINHO", str(tmp_path / "testes.sqlite3"))
+    else:
+        config = _config_mysql()
+        monkeypatch.setenv("DB_HOST", config["host"])
+        monkeypatch.setenv("DB_PORT", str(config["port"]))
+        monkeypatch.setenv("DB_NAME", config["database"])
+    monkeypatch.setenv("LOG_ARQUIVO_DIR", str(tmp_path / "arquivo_logs"))
+    monkeypatch.setenv("CACHE_BACKEND", "memoria")
+
+    _limpar_estado_global()
+    aplicar_migracoes()
+    database.init_pool()
+    yield backend
+    _limpar_estado_global()
+
+
+@pytest.fixture
+def db(banco):
+    with database.get_connection() as conn:
+        yield conn
+
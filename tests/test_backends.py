@@ -0,0 +1,118 @@
+"""Os mesmos casos contra cada backend (`DB_BACKEND=sqlite|mysql`, ver conftest)."""
+from datetime import datetime, timedelta
+
+import pytest
+
+from models.log_model import FiltrosLog
+from models.log_retencao import executar_manutencao, ler_arquivados
+from models.log_writer import SQL_INSERIR_LOG, montar_registro
+from models.produto_model import (
+    ProdutoBase, ProdutoCreate, buscar_produtos, create_produto, delete_produto, get_produto_by_id,
+    listar_produtos_paginado, update_produto,
+)
+from models.usuario_model import (
+    UsuarioCreate, create_usuario, delete_usuario, get_usuario_by_id, get_usuario_para_login, update_usuario,
+)
+
+
+def _consultar(db, sql, params=()):
+    cursor = db.cursor(dictionary=True)
+    cursor.execute(sql, params)
+    linhas = cursor.fetchall()
+    cursor.close()
+    db.commit()
+    return linhas
+
+
+def _operacoes(db, tabela):
+    return [(linha["tipo_operacao"], linha["id_registro"]) for linha in _consultar(
+        db, "SELECT tipo_operacao, id_registro FROM logs WHERE tabela_afetada = %s ORDER BY id", (tabela,))]
+
+
+def test_crud_de_produtos(db):
+    id = create_produto(ProdutoCreate(nome="Caneta", descricao="azul", preco=2.5, estoque=10), db)
+    produto = get_produto_by_id(id, db)
+    assert (produto["nome"], float(produto["preco"]), produto["estoque"]) == ("Caneta", 2.5, 10)
+
+    assert update_produto(id, ProdutoBase(nome="Caneta", descricao="preta", preco=3, estoque=8), db) == 1
+    assert get_produto_by_id(id, db)["descricao"] == "preta"
+
+    assert delete_produto(id, db) == 1
+    assert get_produto_by_id(id, db) is None
+    assert update_produto(id, ProdutoBase(nome="Caneta", preco=3, estoque=8), db) == 0
+    assert delete_produto(id, db) == 0
+    assert _operacoes(db, "produtos") == [("UPDATE", id), ("DELETE", id)]
+
+
+def test_crud_de_usuarios(db):
+    id = create_usuario(UsuarioCreate(nome="Ana", email="ana@exemplo.com", senha="hash"), db)
+    outro = create_usuario(UsuarioCreate(nome="Bia", email="bia@exemplo.com", senha="hash"), db)
+    assert get_usuario_by_id(id, db)["email"] == "ana@exemplo.com"
+    with pytest.raises(ValueError, match="já está cadastrado"):
+        create_usuario(UsuarioCreate(nome="Ana 2", email="ana@exemplo.com", senha="hash"), db)
+
+    assert update_usuario(id, {"nome": "Ana Maria", "senha": "novo"}, db) == 1
+    assert get_usuario_by_id(id, db)["nome"] == "Ana Maria"
+    assert get_usuario_para_login("ana@exemplo.com", db)["senha"] == "novo"
+    with pytest.raises(ValueError, match="já está cadastrado"):
+        update_usuario(outro, {"email": "ana@exemplo.com"}, db)
+
+    assert delete_usuario(id, db) == 1
+    assert get_usuario_by_id(id, db) is None
+    assert delete_usuario(id, db) == 0
+    assert _operacoes(db, "usuarios") == [("UPDATE", id), ("DELETE", id)]
+
+
+def test_paginacao_por_cursor(db):
+    ids = [create_produto(ProdutoCreate(nome=f"Produto {n}", preco=n + 2, estoque=n), db) for n in range(5)]
+
+    paginas = []
+    pagina = listar_produtos_paginado(db, limite=2)
+    while True:
+        paginas.append([item["id"] for item in pagina["itens"]])
+        if pagina["proximo"] is None:
+            break
+        pagina = listar_produtos_paginado(db, limite=2, apos=pagina["proximo"])
+    assert paginas == [ids[0:2], ids[2:4], ids[4:]]
+
+    pagina = listar_produtos_paginado(db, limite=2, antes=pagina["anterior"])
+    assert [item["id"] for item in pagina["itens"]] == ids[2:4]
+
+    por_preco = listar_produtos_paginado(db, limite=3, ordem="preco", descendente=True)
+    assert [item["id"] for item in por_preco["itens"]] == ids[:-4:-1]
+
+
+def test_busca_por_prefixo_e_relevancia(db):
+    caneta = create_produto(ProdutoCreate(nome="Caneta azul", descricao="tinta azul azul", preco=3, estoque=1), db)
+    create_produto(ProdutoCreate(nome="Caderno", descricao="capa azul", preco=20, estoque=1), db)
+    create_produto(ProdutoCreate(nome="Borracha", descricao="branca", preco=2, estoque=1), db)
+
+    assert [item["id"] for item in buscar_produtos(db, "cane")["itens"]] == [caneta]
+    assert [item["nome"] for item in buscar_produtos(db, "azul")["itens"]][0] == "Caneta azul"
+    assert len(buscar_produtos(db, "azul")["itens"]) == 2
+    assert buscar_produtos(db, "caneta branca")["itens"] == []
+    assert buscar_produtos(db, "+-*")["itens"] == []
+
+    pagina = buscar_produtos(db, "azul", limite=1)
+    seguinte = buscar_produtos(db, "azul", limite=1, apos=pagina["proximo"])
+    assert [item["nome"] for item in seguinte["itens"]] == ["Caderno"]
+
+
+def test_retencao_arquiva_logs_expirados(db, tmp_path):
+    antigo = datetime.now().replace(microsecond=0) - timedelta(days=3 * 365)
+    recente = datetime.now().replace(microsecond=0)
+    cursor = db.cursor()
+    for data in (antigo, recente):
+        cursor.execute(SQL_INSERIR_LOG, montar_registro(
+            "UPDATE", "produtos", 1, None, {"estoque": 1}, None, None)[:-1] + (data,))
+    cursor.close()
+    db.commit()
+
+    arquivos = executar_manutencao()
+
+    assert len(arquivos) == 1
+    restantes = _consultar(db, "SELECT data_operacao FROM logs")
+    assert [linha["data_operacao"] for linha in restantes] == [recente]
+    arquivados = ler_arquivados(FiltrosLog(), 10, diretorio=str(tmp_path / "arquivo_logs"))
+    assert [(linha["data_operacao"], linha["id_registro"]) for linha in arquivados] == [(antigo, 1)]
+    assert executar_manutencao() in ([], None)
@@ -0,0 +1,40 @@
+import time
+
+from models.cache import LRUCache
+
+
+def test_carga_iniciada_antes_da_invalidacao_nao_e_gravada():
+    cache = LRUCache()
+    geracao = cache.geracao()
+    cache.remover("produto:1")
+    cache.gravar("produto:1", {"estoque": 5}, geracao)
+
+    assert cache.obter("produto:1") is None
+    cache.gravar("produto:1", {"estoque": 4}, cache.geracao())
+    assert cache.obter("produto:1") == {"estoque": 4}
+
+
+def test_remover_e_limpar_invalidam():
+    cache = LRUCache()
+    cache.gravar("a", 1)
+    cache.gravar("b", 2)
+    cache.remover("a")
+
+    assert (cache.obter("a"), cache.obter("b")) == (None, 2)
+    cache.limpar()
+    assert cache.obter("b") is None
+    assert cache.estatisticas()["invalidacoes"] == 1
+
+
+def test_lru_e_ttl():
+    cache = LRUCache(max_itens=2, ttl=0.05)
+    cache.gravar("a", 1)
+    cache.gravar("b", 2)
+    cache.obter("a")
+    cache.gravar("c", 3)
+
+    assert (cache.obter("a"), cache.obter("b"), cache.obter("c")) == (1, None, 3)
+    time.sleep(0.06)
+    assert cache.obter("a") is None
+    estatisticas = cache.estatisticas()
+    assert (estatisticas["evictions"], estatisticas["expiracoes"]) == (1, 1)
@@ -0,0 +1,90 @@
+import json
+
+import mysql.connector
+
+from models import consultas_lentas, database
+from models.consultas_lentas import RegistroConsultasLentas
+from models.metricas import CursorMedido
+
+PLANO = {"query_block": {"select_id": 1, "table": {"table_name": "produtos", "access_type": "ALL"}}}
+
+
+class CursorNaoBufferizado:
+    """Como o cursor padrão do mysql.connector: as linhas ficam no servidor até o fetch."""
+
+    rowcount = -1
+
+    def __init__(self, conexao):
+        self._conexao = conexao
+        self._linhas = []
+
+    def execute(self, sql, params=()):
+        if self._conexao.unread_result:
+            raise mysql.connector.errors.InternalError("Unread result found")
+        self._conexao.instrucoes.append(sql)
+        if sql.startswith("EXPLAIN FORMAT=JSON"):
+            self._linhas = [(json.dumps(PLANO),)]
+        elif "performance_schema" in sql:
+            self._linhas = [(5000,)]
+        else:
+            self._linhas = [(1,), (2,)]
+        self._conexao.unread_result = True
+
+    def fetchone(self):
+        if not self._linhas:
+            self._conexao.unread_result = False
+            return None
+        return self._linhas.pop(0)
+
+    def fetchall(self):
+        linhas, self._linhas = self._linhas, []
+        self._conexao.unread_result = False
+        return linhas
+
+    def close(self):
+        pass
+
+
+class ConexaoNaoBufferizada:
+    def __init__(self):
+        self.unread_result = False
+        self.instrucoes = []
+
+    def cursor(self, *args, **kwargs):
+        return CursorNaoBufferizado(self)
+
+
+def _registro(monkeypatch):
+    registro = RegistroConsultasLentas(limite_ms=0, arquivo=None)
+    monkeypatch.setattr(consultas_lentas, "get_registro_consultas", lambda: registro)
+    monkeypatch.setattr(consultas_lentas, "limite_segundos", lambda: 0.0)
+    monkeypatch.setattr(database, "get_backend", lambda: "mysql")
+    return registro
+
+
+def test_plano_capturado_para_select_em_cursor_nao_bufferizado(monkeypatch):
+    registro = _registro(monkeypatch)
+    conexao = ConexaoNaoBufferizada()
+    cursor = CursorMedido(conexao.cursor(), conexao)
+
+    cursor.execute("SELECT id FROM produtos WHERE preco > %s", (10,))
+    assert registro.mais_lentas() == []  # resultado ainda não lido
+
+    assert cursor.fetchall() == [(1,), (2,)]
+    [agregado] = registro.mais_lentas()
+    assert agregado["sql"] == "SELECT id FROM produtos WHERE preco > ?"
+    assert agregado["plano"] == PLANO
+    assert agregado["linhas_examinadas_max"] == 5000
+    assert any(sql.startswith("EXPLAIN FORMAT=JSON") for sql in conexao.instrucoes)
+
+
+def test_leitura_linha_a_linha_conclui_no_fim_do_resultado(monkeypatch):
+    registro = _registro(monkeypatch)
+    conexao = ConexaoNaoBufferizada()
+    cursor = CursorMedido(conexao.cursor(), conexao)
+
+    cursor.execute("SELECT id FROM produtos")
+    assert [linha for linha in cursor] == [(1,), (2,)]
+    [agregado] = registro.mais_lentas()
+    assert agregado["execucoes"] == 1
+    assert agregado["plano"] == PLANO
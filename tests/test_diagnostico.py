@@ -0,0 +1,34 @@
+from types import SimpleNamespace
+
+import pytest
+from fastapi import HTTPException
+
+from controllers.auth_controller import exigir_diagnostico
+
+
+def _request(email=None):
+    sessao = {}
+    if email is not None:
+        sessao = {"usuario_id": 1, "perfil": {"id": 1, "email": email}}
+    return SimpleNamespace(session=sessao)
+
+
+def _status(request):
+    with pytest.raises(HTTPException) as erro:
+        exigir_diagnostico(request)
+    return erro.value.status_code
+
+
+def test_desligado_sem_lista(monkeypatch):
+    monkeypatch.delenv("DIAGNOSTICO_EMAILS", raising=False)
+
+    assert _status(_request("admin@exemplo.com")) == 404
+
+
+def test_apenas_emails_da_lista(monkeypatch):
+    monkeypatch.setenv("DIAGNOSTICO_EMAILS", "admin@exemplo.com, Ops@Exemplo.com")
+
+    assert _status(_request()) == 401
+    assert _status(_request("cliente@exemplo.com")) == 403
+    exigir_diagnostico(_request("admin@exemplo.com"))
+    exigir_diagnostico(_request("ops@exemplo.com"))
@@ -0,0 +1,70 @@
+import ast
+
+import pytest
+
+from models.produto_model import (
+    AjusteEstoque, EstoqueInsuficienteError, ProdutoCreate, ajustar_estoque, ajustar_estoque_lote,
+    create_produto,
+)
+
+
+def _estoque(db, id):
+    cursor = db.cursor()
+    cursor.execute("SELECT estoque FROM produtos WHERE id = %s", (id,))
+    (estoque,) = cursor.fetchone()
+    cursor.close()
+    db.commit()
+    return estoque
+
+
+def _logs_ajuste(db):
+    cursor = db.cursor(dictionary=True)
+    cursor.execute("SELECT id_registro, id_usuario, ip_origem, dados_novos FROM logs "
+                   "WHERE tabela_afetada = 'produtos' ORDER BY id")
+    linhas = cursor.fetchall()
+    cursor.close()
+    db.commit()
+    return [dict(linha, dados_novos=ast.literal_eval(linha["dados_novos"])) for linha in linhas]
+
+
+@pytest.fixture
+def produtos(db):
+    return [create_produto(ProdutoCreate(nome=nome, preco=10, estoque=5), db)
+            for nome in ("Caneta", "Caderno")]
+
+
+def test_ajuste_grava_log_na_mesma_transacao(db, produtos):
+    ajustar_estoque(produtos[0], -3, db, id_usuario=7, ip_origem="10.0.0.2")
+
+    assert _estoque(db, produtos[0]) == 2
+    assert _logs_ajuste(db) == [{"id_registro": produtos[0], "id_usuario": 7, "ip_origem": "10.0.0.2",
+                                 "dados_novos": {"ajuste_estoque": -3}}]
+
+
+def test_ajuste_nao_deixa_estoque_negativo(db, produtos):
+    with pytest.raises(EstoqueInsuficienteError):
+        ajustar_estoque(produtos[0], -6, db)
+
+    assert _estoque(db, produtos[0]) == 5
+    assert _logs_ajuste(db) == []
+
+
+def test_lote_desfaz_tudo_se_um_ajuste_falha(db, produtos):
+    ajustes = [AjusteEstoque(id=produtos[0], quantidade=-2), AjusteEstoque(id=produtos[1], quantidade=-9)]
+    with pytest.raises(EstoqueInsuficienteError) as erro:
+        ajustar_estoque_lote(ajustes, db)
+
+    assert erro.value.id == produtos[1]
+    assert [_estoque(db, id) for id in produtos] == [5, 5]
+    assert _logs_ajuste(db) == []
+
+
+def test_lote_soma_ajustes_do_mesmo_produto(db, produtos):
+    ajustes = [AjusteEstoque(id=produtos[1], quantidade=4), AjusteEstoque(id=produtos[0], quantidade=-1),
+               AjusteEstoque(id=produtos[1], quantidade=-2)]
+    totais = ajustar_estoque_lote(ajustes, db, id_usuario=7)
+
+    assert totais == {produtos[1]: 2, produtos[0]: -1}
+    assert [_estoque(db, id) for id in produtos] == [4, 7]
+    assert [(log["id_registro"], log["dados_novos"]) for log in _logs_ajuste(db)] == [
+        (produtos[0], {"ajuste_estoque": -1}), (produtos[1], {"ajuste_estoque": 2})]
@@ -0,0 +1,53 @@
+import asyncio
+import gzip
+import json
+from decimal import Decimal
+
+import pytest
+from fastapi import HTTPException
+
+from controllers import exportacao
+from controllers.exportacao import resposta_exportacao
+
+LINHAS = [
+    {"id": 1, "nome": "Caneta, azul", "preco": Decimal("2.50"), "extra": "fora"},
+    {"id": 2, "nome": "Lápis", "preco": Decimal("1.90"), "extra": "fora"},
+]
+COLUNAS = ["id", "nome", "preco"]
+
+
+def _corpo(resposta):
+    async def ler():
+        return [bloco async for bloco in resposta.body_iterator]
+    return asyncio.run(ler())
+
+
+def test_csv():
+    resposta = resposta_exportacao(iter(LINHAS), COLUNAS, "produtos")
+
+    assert resposta.headers["content-disposition"] == 'attachment; filename="produtos.csv"'
+    assert resposta.media_type == "text/csv"
+    assert b"".join(_corpo(resposta)).decode() == 'id,nome,preco\r\n1,"Caneta, azul",2.50\r\n2,Lápis,1.90\r\n'
+
+
+def test_ndjson_em_blocos(monkeypatch):
+    monkeypatch.setattr(exportacao, "TAMANHO_BLOCO", 1)
+    blocos = _corpo(resposta_exportacao(iter(LINHAS), COLUNAS, "produtos", "ndjson"))
+
+    assert len(blocos) == 2
+    assert [json.loads(bloco) for bloco in blocos] == [
+        {"id": 1, "nome": "Caneta, azul", "preco": 2.5}, {"id": 2, "nome": "Lápis", "preco": 1.9}]
+
+
+def test_gzip():
+    resposta = resposta_exportacao(iter(LINHAS), COLUNAS, "logs", "ndjson", gzip=True)
+
+    assert resposta.headers["content-disposition"] == 'attachment; filename="logs.ndjson.gz"'
+    linhas = gzip.decompress(b"".join(_corpo(resposta))).decode().splitlines()
+    assert [json.loads(linha)["id"] for linha in linhas] == [1, 2]
+
+
+def test_formato_invalido():
+    with pytest.raises(HTTPException) as erro:
+        resposta_exportacao(iter(LINHAS), COLUNAS, "produtos", "xml")
+    assert erro.value.status_code == 400
@@ -0,0 +1,43 @@
+import io
+
+from models.importacao import importar_produtos
+
+
+def _logs_import(db):
+    cursor = db.cursor(dictionary=True)
+    cursor.execute("SELECT id_usuario, ip_origem, dados_novos FROM logs WHERE tipo_operacao = 'IMPORT'")
+    linhas = cursor.fetchall()
+    cursor.close()
+    db.commit()
+    return linhas
+
+
+def test_importa_csv_em_lotes_e_audita_cada_lote(db):
+    arquivo = io.BytesIO(
+        "nome,descricao,preco,estoque\n"
+        "Caneta azul,,2.50,10\n"
+        "X,curto demais,1,1\n"
+        "Caderno,capa dura,15,3\n"
+        "Lápis,,1.9,100\n".encode())
+    resultado = importar_produtos(arquivo, db, "csv", tamanho_lote=2, id_usuario=7, ip_origem="10.0.0.2")
+
+    assert (resultado["lidas"], resultado["importadas"], resultado["lotes"]) == (4, 3, 2)
+    assert [erro["linha"] for erro in resultado["erros"]] == [3]
+    cursor = db.cursor()
+    cursor.execute("SELECT nome FROM produtos ORDER BY id")
+    assert [linha[0] for linha in cursor.fetchall()] == ["Caneta azul", "Caderno", "Lápis"]
+    cursor.close()
+    logs = _logs_import(db)
+    assert len(logs) == 2
+    assert {(log["id_usuario"], log["ip_origem"]) for log in logs} == {(7, "10.0.0.2")}
+
+
+def test_importa_ndjson_com_linhas_invalidas(db):
+    arquivo = io.BytesIO(
+        b'{"nome": "Borracha", "preco": 1.5, "estoque": 4}\n'
+        b'nao e json\n'
+        b'[1, 2]\n'
+        b'{"nome": "Regua", "preco": -1, "estoque": 4}\n')
+    resultado = importar_produtos(arquivo, db, "ndjson")
+    assert resultado["importadas"] == 1
+    assert [erro["linha"] for erro in resultado["erros"]] == [2, 3, 4]
@@ -0,0 +1,90 @@
+from datetime import datetime
+
+from models import log_writer
+from models.database import get_connection
+from models.log_writer import AuditWriter, montar_registro
+
+
+def _registros(quantidade):
+    return [montar_registro("UPDATE", "produtos", id, None, {"id": id}, None, "10.0.0.1")
+            for id in range(1, quantidade + 1)]
+
+
+def _ids_gravados(db):
+    cursor = db.cursor()
+    cursor.execute("SELECT id_registro FROM logs WHERE tabela_afetada = 'produtos' ORDER BY id_registro")
+    ids = [linha[0] for linha in cursor.fetchall()]
+    cursor.close()
+    db.commit()
+    return ids
+
+
+def _linhas(caminho):
+    with open(caminho, encoding="utf-8") as arquivo:
+        return arquivo.readlines()
+
+
+def test_spill_volta_ao_arquivo_se_o_banco_falha(banco, tmp_path, monkeypatch):
+    spill = tmp_path / "spill.ndjson"
+    writer = AuditWriter(tamanho_lote=2, politica="drop", arquivo_spill=str(spill))
+    writer._derramar(_registros(5))
+
+    conexoes = []
+
+    def conexao_que_cai():
+        # O primeiro lote é gravado; o banco cai antes do segundo
+        if conexoes:
+            raise ConnectionError("banco fora do ar")
+        conexoes.append(1)
+        return get_connection()
+
+    monkeypatch.setattr(log_writer, "get_connection", conexao_que_cai)
+    writer._reprocessar_spill()
+
+    with get_connection() as db:
+        assert _ids_gravados(db) == [1, 2]
+    assert len(_linhas(spill)) == 3
+    assert not (tmp_path / "spill.ndjson.processando").exists()
+
+    monkeypatch.setattr(log_writer, "get_connection", get_connection)
+    writer._reprocessar_spill()
+    with get_connection() as db:
+        assert _ids_gravados(db) == [1, 2, 3, 4, 5]
+    assert not spill.exists()
+
+
+def test_spill_preserva_microssegundos(tmp_path):
+    spill = tmp_path / "spill.ndjson"
+    writer = AuditWriter(arquivo_spill=str(spill))
+    registro = montar_registro("CREATE", "produtos", 1, None, None, None, None)[:-1]
+    writer._derramar([registro + (datetime(2024, 5, 1, 10, 0, 0),),
+                      registro + (datetime(2024, 5, 1, 10, 0, 0, 123456),)])
+    datas = [linha.rsplit('"', 2)[-2] for linha in _linhas(spill)]
+    assert datas == ["2024-05-01 10:00:00.000000", "2024-05-01 10:00:00.123456"]
+
+
+def test_parar_derrama_o_que_ficou_na_fila(tmp_path, monkeypatch):
+    spill = tmp_path / "spill.ndjson"
+    writer = AuditWriter(arquivo_spill=str(spill))
+    # Thread de gravação travada: nada sai da fila até o encerramento
+    monkeypatch.setattr(writer, "_executar", lambda: writer._parar.wait())
+    writer.iniciar()
+    for registro in _registros(3):
+        assert writer.enviar(registro)
+    writer.parar(timeout=1)
+    assert len(_linhas(spill)) == 3
+    assert writer.estatisticas()["derramados"] == 3
+
+
+def test_data_operacao_truncada_apenas_no_mysql(monkeypatch):
+    class Relogio(datetime):
+        @classmethod
+        def now(cls, tz=None):
+            return datetime(2024, 1, 31, 23, 59, 59, 600000)
+
+    monkeypatch.setattr(log_writer, "datetime", Relogio)
+    monkeypatch.setattr(log_writer, "get_backend", lambda: "mysql")
+    # Arredondada pelo MySQL iria para fevereiro, outra partição
+    assert montar_registro("X", "t", 1, None, None, None, None)[-1] == datetime(2024, 1, 31, 23, 59, 59)
+    monkeypatch.setattr(log_writer, "get_backend", lambda: "sqlite")
+    assert montar_registro("X", "t", 1, None, None, None, None)[-1] == datetime(2024, 1, 31, 23, 59, 59, 600000)
@@ -0,0 +1,7 @@
+from routes.metricas_routes import metricas
+
+
+def test_content_type_sem_charset_duplicado():
+    resposta = metricas()
+
+    assert resposta.headers["content-type"] == "text/plain; version=0.0.4; charset=utf-8"
@@ -0,0 +1,72 @@
+import pytest
+
+from database import migrations
+from database.migrations import aplicar_migracoes, status_migracoes, _ja_aplicado
+
+
+def _lista(backend):
+    return "MIGRACOES_SQLITE" if backend == "sqlite" else "MIGRACOES"
+
+
+def test_reaplicar_nao_faz_nada(banco):
+    assert aplicar_migracoes() == []
+    assert all(aplicada for _, _, aplicada in status_migracoes())
+
+
+def test_versao_interrompida_e_retomada(banco, monkeypatch):
+    lista = getattr(migrations, _lista(banco))
+    quebrada = (99, "teste", [
+        "CREATE INDEX idx_teste_estoque ON produtos (estoque)",
+        "ALTER TABLE tabela_inexistente ADD COLUMN x INT",
+    ])
+    monkeypatch.setattr(migrations, _lista(banco), lista + [quebrada])
+    with pytest.raises(Exception):
+        aplicar_migracoes()
+    assert (99, "teste", False) in status_migracoes()
+
+    # No MySQL o CREATE INDEX já foi confirmado pelo commit implícito do DDL;
+    # a nova execução o pula em vez de falhar com índice duplicado
+    corrigida = (99, "teste", [
+        "CREATE INDEX idx_teste_estoque ON produtos (estoque)",
+        "CREATE INDEX idx_teste_preco ON produtos (preco)",
+    ])
+    monkeypatch.setattr(migrations, _lista(banco), lista + [corrigida])
+    assert aplicar_migracoes() == [99]
+    assert aplicar_migracoes() == []
+
+
+class CursorSchema:
+    """Responde às consultas ao information_schema com um schema fixo."""
+
+    def __init__(self, indices, particionada=False):
+        self.indices = indices
+        self.particionada = particionada
+        self._resultado = []
+
+    def execute(self, sql, params=()):
+        if "PARTITIONS" in sql:
+            self._resultado = [(1 if self.particionada else 0,)]
+        else:
+            self._resultado = [(coluna,) for coluna in self.indices.get(params, [])]
+
+    def fetchall(self):
+        return self._resultado
+
+    def fetchone(self):
+        return self._resultado[0]
+
+
+def test_ja_aplicado_consulta_o_schema():
+    cursor = CursorSchema({
+        ("produtos", "idx_produtos_nome_id"): ["nome", "id"],
+        ("logs", "PRIMARY"): ["id", "data_operacao"],
+    }, particionada=True)
+    assert _ja_aplicado(cursor, "CREATE INDEX idx_produtos_nome_id ON produtos (nome, id)")
+    assert not _ja_aplicado(cursor, "CREATE INDEX idx_produtos_preco_id ON produtos (preco, id)")
+    assert _ja_aplicado(cursor, "DROP INDEX idx_logs_data_operacao ON logs")
+    assert not _ja_aplicado(cursor, "DROP INDEX idx_produtos_nome_id ON produtos")
+    assert _ja_aplicado(cursor, "ALTER TABLE logs DROP PRIMARY KEY, ADD PRIMARY KEY (id, data_operacao)")
+    assert _ja_aplicado(cursor, "ALTER TABLE logs PARTITION BY RANGE (UNIX_TIMESTAMP(data_operacao)) "
+                                "(PARTITION pmax VALUES LESS THAN MAXVALUE)")
+    assert not _ja_aplicado(cursor, "ALTER TABLE logs MODIFY data_operacao TIMESTAMP NOT NULL")
+    assert not _ja_aplicado(CursorSchema({}), "ALTER TABLE logs DROP PRIMARY KEY, ADD PRIMARY KEY (id, data_operacao)")
@@ -0,0 +1,36 @@
+from datetime import datetime
+from decimal import Decimal
+
+import pytest
+
+from models.paginacao import codificar_cursor, decodificar_cursor, montar_pagina
+
+
+def test_cursor_ida_e_volta():
+    data = datetime(2024, 5, 1, 12, 30, 0, 250)
+    token = codificar_cursor([data, Decimal("9.90"), 42])
+
+    assert "=" not in token
+    assert decodificar_cursor(token, 3) == ["2024-05-01 12:30:00.000250", "9.90", 42]
+
+
+@pytest.mark.parametrize("token", ["nao-e-base64!", codificar_cursor([1]), "eyJ-"])
+def test_cursor_invalido(token):
+    with pytest.raises(ValueError, match="Cursor de paginação inválido"):
+        decodificar_cursor(token, 2)
+
+
+def test_pagina_voltando_fica_na_ordem_crescente():
+    linhas = [{"id": 5}, {"id": 4}, {"id": 3}]
+    pagina = montar_pagina(linhas, 2, ["id"], voltando=True, com_cursor=True)
+
+    assert [linha["id"] for linha in pagina["itens"]] == [4, 5]
+    assert decodificar_cursor(pagina["anterior"], 1) == [4]
+    assert decodificar_cursor(pagina["proximo"], 1) == [5]
+
+
+def test_ultima_pagina_sem_proximo():
+    pagina = montar_pagina([{"id": 7}], 2, ["id"], voltando=False, com_cursor=True)
+
+    assert pagina["proximo"] is None
+    assert decodificar_cursor(pagina["anterior"], 1) == [7]
@@ -0,0 +1,130 @@
+import threading
+import time
+
+import mysql.connector
+import pytest
+
+from models.database import ConnectionPool, PoolError
+
+
+class ConexaoFalsa:
+    def __init__(self, numero):
+        self.connection_id = numero
+        self.viva = True
+        self.quebrada = False
+        self.fechada = False
+        self.pings = 0
+        self.unread_result = False
+        self.in_transaction = False
+
+    def ping(self, reconnect=False, attempts=1):
+        self.pings += 1
+        if not self.viva:
+            raise mysql.connector.errors.OperationalError("MySQL server has gone away")
+
+    def rollback(self):
+        if self.quebrada:
+            raise mysql.connector.errors.OperationalError("Lost connection")
+        self.in_transaction = False
+
+    def close(self):
+        self.fechada = True
+
+
+class PoolFalso(ConnectionPool):
+    def __init__(self, **kwargs):
+        super().__init__({}, max_preparadas=0, **kwargs)
+        self.criadas = []
+
+    def _conectar(self):
+        conn = ConexaoFalsa(len(self.criadas) + 1)
+        self.criadas.append(conn)
+        return conn
+
+
+def test_reaproveita_conexao_ociosa_e_valida_com_ping():
+    pool = PoolFalso(tamanho=1, max_overflow=0, validar_apos=0)
+    conn = pool.obter()
+    pool.devolver(conn)
+
+    assert pool.obter() is conn
+    assert conn.pings == 1
+
+
+def test_nao_valida_conexao_usada_ha_pouco():
+    pool = PoolFalso(tamanho=1, max_overflow=0, validar_apos=60)
+    conn = pool.obter()
+    pool.devolver(conn)
+
+    assert pool.obter() is conn
+    assert conn.pings == 0
+
+
+def test_troca_conexao_que_falha_na_validacao():
+    pool = PoolFalso(tamanho=1, max_overflow=0, validar_apos=0)
+    conn = pool.obter()
+    pool.devolver(conn)
+    conn.viva = False
+
+    nova = pool.obter()
+    assert nova is not conn and conn.fechada
+    estatisticas = pool.estatisticas()
+    assert (estatisticas["descartadas"], estatisticas["abertas"]) == (1, 1)
+
+
+def test_esgotado_levanta_pool_error_apos_timeout():
+    pool = PoolFalso(tamanho=1, max_overflow=1, timeout=0.05)
+    conexoes = [pool.obter(), pool.obter()]
+
+    with pytest.raises(PoolError):
+        pool.obter()
+    assert pool.estatisticas()["timeouts"] == 1
+
+    pool.devolver(conexoes[0])
+    assert pool.obter() is conexoes[0]
+
+
+def test_quem_espera_recebe_a_conexao_devolvida():
+    pool = PoolFalso(tamanho=1, max_overflow=0, timeout=5)
+    conn = pool.obter()
+    obtidas = []
+    espera = threading.Thread(target=lambda: obtidas.append(pool.obter()))
+    espera.start()
+    while not pool.estatisticas()["aguardando"]:
+        time.sleep(0.001)
+
+    pool.devolver(conn)
+    espera.join(5)
+    assert obtidas == [conn]
+
+
+def test_overflow_e_fechada_na_devolucao():
+    pool = PoolFalso(tamanho=1, max_overflow=1)
+    fixa, extra = pool.obter(), pool.obter()
+    pool.devolver(fixa)
+    pool.devolver(extra)
+
+    assert extra.fechada and not fixa.fechada
+    assert pool.estatisticas()["abertas"] == 1
+
+
+def test_descarta_conexao_que_falha_no_rollback():
+    pool = PoolFalso(tamanho=1, max_overflow=0)
+    conn = pool.obter()
+    conn.in_transaction = conn.quebrada = True
+    pool.devolver(conn)
+
+    assert conn.fechada
+    assert pool.obter() is not conn
+    assert pool.estatisticas()["descartadas"] == 1
+
+
+def test_pool_encerrado_recusa_checkout():
+    pool = PoolFalso()
+    conn = pool.obter()
+    pool.devolver(conn)
+    pool.fechar()
+
+    assert conn.fechada
+    with pytest.raises(PoolError):
+        pool.obter()
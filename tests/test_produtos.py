@@ -0,0 +1,37 @@
+import pytest
+
+from models.produto_model import (
+    ConflitoVersaoError, ProdutoBase, ProdutoCreate, create_produto, get_produto_by_id, update_produto,
+)
+
+
+def _atualizar_por_fora(db, id, estoque):
+    cursor = db.cursor()
+    cursor.execute("UPDATE produtos SET estoque = %s WHERE id = %s", (estoque, id))
+    cursor.close()
+    db.commit()
+
+
+def test_leitura_por_id_usa_o_cache_ate_a_escrita(db):
+    id = create_produto(ProdutoCreate(nome="Caneta", preco=2.5, estoque=10), db)
+    assert get_produto_by_id(id, db)["estoque"] == 10
+
+    _atualizar_por_fora(db, id, 3)
+    assert get_produto_by_id(id, db)["estoque"] == 10
+
+    update_produto(id, ProdutoBase(nome="Caneta", preco=2.5, estoque=7), db)
+    assert get_produto_by_id(id, db)["estoque"] == 7
+
+
+def test_versao_desatualizada_gera_conflito(db):
+    id = create_produto(ProdutoCreate(nome="Caneta", preco=2.5, estoque=10), db)
+    versao = get_produto_by_id(id, db)["updated_at"]
+
+    assert update_produto(id, ProdutoBase(nome="Caneta", preco=3, estoque=10), db, versao=versao) == 1
+    with pytest.raises(ConflitoVersaoError):
+        update_produto(id, ProdutoBase(nome="Caneta", preco=4, estoque=10), db, versao=versao)
+
+    produto = get_produto_by_id(id, db)
+    assert float(produto["preco"]) == 3
+    atual = produto["updated_at"]
+    assert update_produto(id, ProdutoBase(nome="Caneta", preco=4, estoque=10), db, versao=atual) == 1
@@ -0,0 +1,106 @@
+import asyncio
+
+import pytest
+
+from models import sessao
+from models.sessao import SessaoMiddleware, renovar_sessao
+
+
+class Requisicao:
+    def __init__(self, scope):
+        self.scope = scope
+
+    @property
+    def session(self):
+        return self.scope["session"]
+
+
+def _app(acao):
+    async def app(scope, receive, send):
+        acao(Requisicao(scope))
+        await send({"type": "http.response.start", "status": 200, "headers": []})
+        await send({"type": "http.response.body", "body": b""})
+    return app
+
+
+def _chamar(middleware, cookie=None):
+    headers = [(b"cookie", f"sessao={cookie}".encode())] if cookie else []
+    scope = {"type": "http", "method": "GET", "path": "/", "headers": headers}
+    enviadas = []
+
+    async def receive():
+        return {"type": "http.request", "body": b""}
+
+    async def send(message):
+        enviadas.append(message)
+
+    asyncio.run(middleware(scope, receive, send))
+    for nome, valor in enviadas[0]["headers"]:
+        if nome.lower() == b"set-cookie":
+            return valor.decode().split(";")[0].partition("=")[2]
+    return None
+
+
+@pytest.fixture
+def memoria(monkeypatch):
+    monkeypatch.setenv("SESSAO_BACKEND", "memoria")
+    sessao._store = None
+    yield sessao.get_store_sessoes()
+    sessao._store = None
+
+
+def _middleware(acao, chave="segredo"):
+    return SessaoMiddleware(_app(acao), chave_secreta=chave)
+
+
+def test_cookie_assinado_leva_so_o_id(memoria):
+    cookie = _chamar(_middleware(lambda r: r.session.update(usuario_id=7)))
+    sid, _, assinatura = cookie.partition(".")
+
+    assert memoria.obter(sid) == {"usuario_id": 7}
+    assert len(assinatura) == 32
+    lidos = []
+    assert _chamar(_middleware(lambda r: lidos.append(dict(r.session))), cookie) is None
+    assert lidos == [{"usuario_id": 7}]
+
+
+@pytest.mark.parametrize("adulterar", [
+    lambda cookie: cookie[:-1] + ("0" if cookie[-1] != "0" else "1"),
+    lambda cookie: "outro" + cookie,
+])
+def test_assinatura_invalida_e_ignorada(memoria, adulterar):
+    cookie = _chamar(_middleware(lambda r: r.session.update(usuario_id=7)))
+    lidos = []
+
+    _chamar(_middleware(lambda r: lidos.append(dict(r.session))), adulterar(cookie))
+    assert lidos == [{}]
+
+
+def test_chave_diferente_nao_aceita_o_cookie(memoria):
+    cookie = _chamar(_middleware(lambda r: r.session.update(usuario_id=7)))
+    lidos = []
+
+    _chamar(_middleware(lambda r: lidos.append(dict(r.session)), chave="outra"), cookie)
+    assert lidos == [{}]
+
+
+def test_renovar_troca_o_id_e_mantem_os_dados(memoria):
+    cookie = _chamar(_middleware(lambda r: r.session.update(carrinho=[1])))
+    antigo = cookie.partition(".")[0]
+
+    def login(request):
+        renovar_sessao(request)
+        request.session["usuario_id"] = 7
+
+    novo_cookie = _chamar(_middleware(login), cookie)
+    novo = novo_cookie.partition(".")[0]
+    assert novo != antigo
+    assert memoria.obter(antigo) is None
+    assert memoria.obter(novo) == {"carrinho": [1], "usuario_id": 7}
+
+
+def test_sessao_esvaziada_apaga_o_cookie(memoria):
+    cookie = _chamar(_middleware(lambda r: r.session.update(usuario_id=7)))
+
+    assert _chamar(_middleware(lambda r: r.session.clear()), cookie) == "null"
+    assert memoria.obter(cookie.partition(".")[0]) is None